@@ -0,0 +1,68 @@
+import os, glob  # For walking directories and expanding glob patterns
+from file_loader.concrete_file_loader import SUPPORTED_FILE_TYPES  # Extensions the loader can handle
+
+
+def is_supported(file_path):
+    """Check whether the file has a .pdf, .docx or .pptx extension."""
+    return os.path.splitext(file_path)[1][1:].lower() in SUPPORTED_FILE_TYPES
+
+
+def read_manifest(manifest_path):
+    """
+    Read a manifest file with one path, directory or glob per line.
+    Blank lines and lines starting with '#' are ignored.
+
+    Args:
+        manifest_path (str): The path to the manifest file.
+
+    Returns:
+        list: The entries listed in the manifest.
+    """
+    with open(manifest_path, 'r', encoding='utf-8') as manifest:
+        return [line.strip() for line in manifest if line.strip() and not line.strip().startswith('#')]
+
+
+def expand_path(path):
+    """
+    Expand a directory (recursively), a glob pattern or a single file into supported file paths.
+
+    Args:
+        path (str): A directory, glob pattern or file path.
+
+    Returns:
+        list: The supported files found, in sorted order.
+    """
+    if os.path.isdir(path):
+        found = []
+        for root, dirs, files in os.walk(path):
+            dirs.sort()  # Walk sub-directories in a stable order
+            found.extend(os.path.join(root, name) for name in sorted(files) if is_supported(name))
+        return found
+    if glob.has_magic(path):
+        return [match for match in sorted(glob.glob(path, recursive=True)) if os.path.isfile(match) and is_supported(match)]
+    return [path]  # A single file; unsupported or missing files are reported by the loader
+
+
+def collect_files(paths, manifest_path=None):
+    """
+    Collect every document to process from directories, globs and an optional manifest file.
+
+    Args:
+        paths (list): Directories, glob patterns or file paths.
+        manifest_path (str, optional): A manifest file listing more paths.
+
+    Returns:
+        list: The unique file paths, in the order they were found.
+    """
+    entries = list(paths)
+    if manifest_path:
+        entries.extend(read_manifest(manifest_path))
+
+    files = []
+    seen = set()
+    for entry in entries:
+        for file_path in expand_path(entry):
+            if file_path not in seen:  # Skip files listed more than once
+                seen.add(file_path)
+                files.append(file_path)
+    return files
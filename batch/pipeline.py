@@ -0,0 +1,209 @@
+import itertools, queue, threading, traceback  # For the bounded queues and writer threads
+from instrumentation.stage_metrics import measure  # Per-stage timing
+from storage.storage import abort_document, storage_stage  # Failure handling and stage names of the storage steps
+
+# Default number of pages that may wait in each storage queue before extraction blocks
+DEFAULT_QUEUE_SIZE = 64
+
+# Marker put on the queues to stop the writer threads
+STOP = None
+
+
+# Counts the storages still writing a document, so the last one to finish can close it.
+# A ticket without an extractor tracks a flush of every storage.
+class DocumentTicket:
+    def __init__(self, extractor, storages):
+        self.extractor = extractor
+        self.remaining = storages
+        self.lock = threading.Lock()
+        self.errors = []  # (storage name, error) of every storage that failed to write the document
+        self.done = threading.Event()  # Set once every storage has finished or aborted the document
+
+    def finish(self):
+        """Mark one storage as done and close the extractor once every storage has finished."""
+        with self.lock:
+            self.remaining -= 1
+            done = self.remaining == 0
+        if done:
+            if self.extractor is not None:
+                self.extractor.close()  # Release the parsed document
+            self.done.set()
+
+
+# Producer/consumer pipeline: extraction runs in the caller's thread, each storage writes in its own thread,
+# or in storage.writer_threads threads that each take whole documents
+class StoragePipeline:
+    def __init__(self, storages, queue_size=DEFAULT_QUEUE_SIZE):
+        """
+        Initialize the StoragePipeline and start the writer threads of every storage.
+
+        Args:
+            storages (list): The Storage objects that receive the documents.
+            queue_size (int, optional): Pages buffered per writer thread; extraction blocks when a queue is full,
+                so memory stays bounded even if a storage is slower than extraction.
+        """
+        self.queues = {}  # Queue of each writer thread, per storage
+        self.next_queue = {}  # Cycles through the queues of each storage
+        self.locks = {}
+        self.threads = []
+        self.errors = []  # (file name, storage name, error) for documents a storage failed to write
+        self.lost_documents = []  # (file path, storage name, error) for finished documents a failed batch dropped
+        self.lost_lock = threading.Lock()
+        for storage in storages:
+            self.queues[id(storage)] = []
+            self.locks[id(storage)] = threading.Lock()
+            for _ in range(storage.writer_threads):
+                events = queue.Queue(maxsize=queue_size)
+                # A single writer shares the storage lock with is_processed; several writers only share
+                # a storage that keeps its document state per thread, so each has its own lock
+                lock = self.locks[id(storage)] if storage.writer_threads == 1 else threading.Lock()
+                thread = threading.Thread(target=self.write_loop, args=(storage, events, lock), daemon=True)
+                thread.start()
+                self.queues[id(storage)].append(events)
+                self.threads.append(thread)
+            self.next_queue[id(storage)] = itertools.cycle(self.queues[id(storage)])
+
+    def is_processed(self, storage, file_name, content_hash, extractor_version, file_path=None):
+        """Call storage.is_processed while no writer thread is using the storage's shared state."""
+        with self.locks[id(storage)]:
+            return storage.is_processed(file_name, content_hash, extractor_version, file_path)
+
+    def submit(self, extractor, storages):
+        """
+        Extract the document page by page and queue every page for the storages.
+        Returns as soon as the last page is queued, so the next document can be extracted
+        while the storages are still writing this one.
+
+        If extraction fails, the storages abort the document and the error is raised.
+
+        Args:
+            extractor (UniversalDataExtractor): The data extractor that provides the pages.
+            storages (list): The storages that should receive this document.
+
+        Returns:
+            DocumentTicket: Tracks the writes of the document; its done event is set once they finish.
+        """
+        ticket = DocumentTicket(extractor, len(storages))
+        # Every event of the document goes to one writer of each storage, taking the writers in turn
+        queues = [next(self.next_queue[id(storage)]) for storage in storages]
+        self.put(queues, ('begin', ticket))
+        try:
+            for page in extractor.iter_pages():
+                self.put(queues, ('page', page))
+            extractor.extract_metadata()  # Cached now, so writer threads never parse the document
+        except Exception:
+            self.put(queues, ('abort', ticket))  # The writers drop the document and close the extractor
+            raise
+        self.put(queues, ('end', ticket))
+        return ticket
+
+    def flush(self):
+        """Have every writer thread write what its storage still buffers, and wait until they are done."""
+        queues = [events for storage_queues in self.queues.values() for events in storage_queues]
+        ticket = DocumentTicket(None, len(queues))
+        self.put(queues, ('flush', ticket))
+        ticket.done.wait()
+
+    def put(self, queues, event):
+        """Queue an event for each writer thread, blocking while a queue is full."""
+        for events in queues:
+            events.put(event)
+
+    def write_loop(self, storage, events, lock):
+        """
+        Writer thread: apply the queued events to one storage until the pipeline is closed,
+        then write what the storage still buffers from this thread, which owns its per-thread state.
+
+        Args:
+            storage (Storage): The storage this thread writes to.
+            events (queue.Queue): The events of this thread.
+            lock (threading.Lock): Held while the storage is in use.
+        """
+        ticket = None
+        failed = False
+        while True:
+            event = events.get()
+            if event is STOP:
+                break
+            kind, payload = event
+            if kind in ('begin', 'flush'):
+                ticket, failed = payload, False
+            try:
+                if not failed and kind == 'flush':
+                    with lock:
+                        storage.flush()
+                elif not failed:
+                    metrics = ticket.extractor.metrics
+                    with lock:
+                        if kind == 'begin':
+                            storage.stage_metrics = metrics
+                            with measure(metrics, storage_stage(storage, 'begin_document')):
+                                storage.begin_document(ticket.extractor)
+                        elif kind == 'page':
+                            with measure(metrics, storage_stage(storage, 'store_page')) as counts:
+                                storage.store_page(payload)
+                                counts['items'] = 1
+                        elif kind == 'end':
+                            with measure(metrics, storage_stage(storage, 'end_document')):
+                                storage.end_document(ticket.extractor)
+                        else:
+                            storage.abort_document()  # Extraction failed partway
+            except Exception as e:
+                failed = True
+                if kind == 'flush':
+                    traceback.print_exc()  # The documents the storage dropped are recorded as lost below
+                else:
+                    # Drop the rest of this document for this storage, keep the pipeline running
+                    with lock:
+                        abort_document(storage)
+                    self.record_error(ticket, storage, e)
+            self.record_lost_documents(storage, lock)  # Before finishing, so they are reported with the ticket
+            if kind in ('end', 'abort', 'flush'):
+                ticket.finish()
+
+        with lock:
+            try:
+                storage.flush()
+            except Exception:
+                traceback.print_exc()
+        self.record_lost_documents(storage, lock)
+
+    def record_error(self, ticket, storage, error):
+        """Record a document a storage failed to write, on the pipeline and on the document's ticket."""
+        message = f"{type(error).__name__}: {error}"
+        ticket.errors.append((type(storage).__name__, message))
+        self.errors.append((ticket.extractor.get_file_name(), type(storage).__name__, message))
+        traceback.print_exc()
+
+    def record_lost_documents(self, storage, lock):
+        """Move the finished documents a storage dropped with a failed batch to lost_documents."""
+        with lock:
+            lost = storage.take_lost_documents()
+        with self.lost_lock:
+            self.lost_documents += [(file_path, type(storage).__name__, error) for file_path, error in lost]
+
+    def take_lost_documents(self):
+        """
+        Collect the finished documents the storages dropped with a failed batch since the last call.
+
+        Returns:
+            list: (file path, storage name, error) of every such document.
+        """
+        with self.lost_lock:
+            lost, self.lost_documents = self.lost_documents, []
+        return lost
+
+    def close(self):
+        """
+        Wait for every queued page to be written and stop the writer threads.
+
+        Returns:
+            list: The (file name, storage name, error) of every document that failed to store.
+        """
+        for storage_queues in self.queues.values():
+            self.put(storage_queues, STOP)
+        for thread in self.threads:
+            thread.join()
+        for file_name, storage_name, error in self.errors + self.lost_documents:
+            print(f"Error storing {file_name} in {storage_name}: {error}")
+        return self.errors
@@ -0,0 +1,203 @@
+import os, csv, time, threading, traceback  # Import necessary libraries
+from instrumentation.stage_metrics import StageMetrics, write_json, write_prometheus  # Per-stage timings
+from storage.jsonl_storage import check_stdout_writers  # Only one process may stream records to stdout
+
+# Main instance reused by every document processed in this worker process (set by scheduler.init_worker)
+worker_main = None
+
+# Whether process_document waits for the storage pipeline to write its document before reporting it.
+# Pool workers wait, so every failure reaches the parent; a single in-process worker lets the writes of
+# one document overlap with extracting the next and reports their failures with a later document.
+wait_for_storage = True
+
+# Barrier of the pool workers, so each of them runs one of the flush tasks (set by scheduler.init_worker)
+flush_barrier = None
+
+# Seconds a pool worker waits for the others to start flushing
+FLUSH_BARRIER_TIMEOUT = 60
+
+
+def process_document(file_path):
+    """
+    Process a single document with the worker's Main instance and report the outcome.
+    Any exception is captured so one bad file never aborts the batch.
+
+    Args:
+        file_path (str): The path to the document.
+
+    Returns:
+        dict: The file path, status ('ok', 'skipped' or 'failed'; the scheduler reports 'oversized' documents
+            without processing them), elapsed seconds, size in bytes, error message, the per-stage timings of the
+            document and the (file path, storage name, error) storage failures of documents written since the
+            last report, including documents reported earlier that a failed batch commit dropped.
+    """
+    from main import Main  # Imported here to avoid a circular import with main.py
+
+    start = time.perf_counter()
+    result = {'file_path': file_path, 'status': 'ok', 'seconds': 0.0, 'bytes': 0, 'error': '', 'stages': {},
+              'storage_errors': []}
+    try:
+        result['bytes'] = os.path.getsize(file_path)
+        main = worker_main
+        if main is None:
+            main = Main()  # No persistent worker state, use a Main for this document only
+        try:
+            if not main.process_file(file_path, os.path.splitext(file_path)[1][1:].lower()):
+                result['status'] = 'skipped'  # Unchanged since the last run
+        finally:
+            # Collected even if this document failed, which may have rolled back documents buffered before it
+            if main is worker_main:
+                result['storage_errors'] = main.take_storage_errors(wait=wait_for_storage)
+            else:
+                result['storage_errors'] = main.flush()
+                main.close()
+            if main.last_metrics is not None:
+                # Storage writes still queued in a worker's pipeline are not included yet
+                result['stages'] = main.last_metrics.to_dict()
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = f"{type(e).__name__}: {e}"
+        traceback.print_exc()
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def flush_worker():
+    """
+    Write every document this process's worker still buffers, at the end of a batch.
+    In a pool, each worker runs one flush task and holds it at flush_barrier until every worker has one.
+
+    Returns:
+        list: The (file path, storage name, error) storage failures not reported yet.
+    """
+    if flush_barrier is not None:
+        try:
+            flush_barrier.wait(FLUSH_BARRIER_TIMEOUT)
+        except threading.BrokenBarrierError:
+            print("Not every worker started flushing; the others write their documents when they exit")
+    if worker_main is None:
+        return []
+    return worker_main.flush()
+
+
+def storage_error_message(errors):
+    """Join the (storage name, error) failures of one document into a single error message."""
+    return "; ".join(f"{storage_name}: {error}" for storage_name, error in errors)
+
+
+class BatchRunner:
+    def __init__(self, concurrency=1, error_report="batch_errors.csv", memory_budget_mb=None,
+                 metrics_json=None, metrics_prom=None, max_pages=None):
+        """
+        Initialize the BatchRunner.
+
+        Args:
+            concurrency (int): Number of documents processed at the same time (worker processes).
+            error_report (str): Path of the CSV file listing the documents that failed.
+            memory_budget_mb (int, optional): Total memory the workers may use, in MB; caps the concurrency.
+            metrics_json (str, optional): JSON file receiving the per-stage timings of the batch and each document.
+            metrics_prom (str, optional): Prometheus text file receiving the per-stage timings of the batch.
+            max_pages (int, optional): Documents with more pages or slides are skipped without being parsed.
+
+        Raises:
+            ValueError: If JSON Lines records would stream to stdout from several worker processes.
+        """
+        from batch.scheduler import DocumentScheduler  # Imported here because the scheduler imports this module
+
+        self.scheduler = DocumentScheduler(max(1, concurrency), memory_budget_mb, max_pages=max_pages)
+        self.concurrency = self.scheduler.workers
+        check_stdout_writers(os.getenv('JSONL_OUTPUT'), self.concurrency)
+        self.error_report = error_report
+        self.metrics_json = metrics_json
+        self.metrics_prom = metrics_prom
+        self.metrics = StageMetrics()  # Stage timings summed over the batch
+
+    def run(self, files):
+        """
+        Process every file, reporting progress and throughput, and write the error report.
+
+        Args:
+            files (list): The paths of the documents to process.
+
+        Returns:
+            list: One result dict per document (see process_document).
+        """
+        self.start_time = time.perf_counter()
+        self.total = len(files)
+        self.total_bytes = 0
+        results = []
+        print(f"Processing {self.total} document(s) with concurrency {self.concurrency}")
+
+        self.results_by_path = {}
+        for result in self.scheduler.run(files):
+            results.append(self.report_progress(result, len(results) + 1))
+        self.apply_storage_errors(self.scheduler.storage_errors)  # Documents the workers still buffered
+
+        self.write_error_report(results)
+        self.write_metrics(results)
+        self.print_summary(results)
+        return results
+
+    def report_progress(self, result, done):
+        """Print the outcome of one document together with the running throughput."""
+        self.total_bytes += result['bytes']
+        self.metrics.merge(result['stages'])
+        elapsed = time.perf_counter() - self.start_time
+        status = result['status']
+        if status == 'failed':
+            status = f"FAILED ({result['error']})"
+        elif status == 'oversized':
+            status = f"oversized ({result['error']}), skipped"
+        print(f"[{done}/{self.total}] {result['file_path']}: {status} in {result['seconds']:.2f}s "
+              f"| {done / elapsed:.2f} docs/s, {self.total_bytes / elapsed / 1e6:.2f} MB/s")
+        self.results_by_path[result['file_path']] = result
+        self.apply_storage_errors(result.get('storage_errors', []))
+        return result
+
+    def apply_storage_errors(self, storage_errors):
+        """
+        Mark the documents a storage failed to write as failed, including documents reported earlier
+        whose writes were still queued in the worker's pipeline.
+
+        Args:
+            storage_errors (list): (file path, storage name, error) storage failures.
+        """
+        by_path = {}
+        for file_path, storage_name, error in storage_errors:
+            by_path.setdefault(file_path, []).append((storage_name, error))
+        for file_path, errors in by_path.items():
+            result = self.results_by_path.get(file_path)
+            if result is None:
+                continue
+            message = storage_error_message(errors)
+            result['error'] = f"{result['error']}; {message}" if result['status'] == 'failed' else message
+            result['status'] = 'failed'
+            print(f"{file_path}: FAILED to store ({message})")
+
+    def write_error_report(self, results):
+        """Write the failed documents and their errors to the error report CSV."""
+        failures = [result for result in results if result['status'] == 'failed']
+        if not failures:
+            return
+        with open(self.error_report, 'w', newline='', encoding='utf-8') as report:
+            writer = csv.writer(report)
+            writer.writerow(['file_path', 'error'])
+            writer.writerows([result['file_path'], result['error']] for result in failures)
+        print(f"Error report saved to {self.error_report}")
+
+    def write_metrics(self, results):
+        """Export the batch and per-document stage timings to the requested JSON and Prometheus files."""
+        if self.metrics_json:
+            write_json(self.metrics_json, self.metrics, {result['file_path']: result['stages'] for result in results})
+        if self.metrics_prom:
+            write_prometheus(self.metrics_prom, self.metrics)
+
+    def print_summary(self, results):
+        """Print the number of processed and failed documents and the overall throughput."""
+        elapsed = time.perf_counter() - self.start_time
+        failed = sum(1 for result in results if result['status'] == 'failed')
+        skipped = sum(1 for result in results if result['status'] == 'skipped')
+        oversized = sum(1 for result in results if result['status'] == 'oversized')
+        rate = len(results) / elapsed if elapsed else 0.0
+        print(f"Processed {len(results) - failed - skipped - oversized} document(s), {skipped} unchanged, "
+              f"{oversized} oversized, {failed} failed, in {elapsed:.2f}s ({rate:.2f} docs/s)")
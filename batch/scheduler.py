@@ -0,0 +1,201 @@
+import os  # For file sizes and system memory
+import multiprocessing  # Barrier that hands one flush task to each worker
+from concurrent.futures import ProcessPoolExecutor, as_completed  # For spreading documents across processes
+from multiprocessing import util  # For closing each worker's connection when the worker exits
+from batch import runner  # Worker entry point and per-worker state
+from file_loader.concrete_file_loader import Loader  # Probes documents without parsing them
+
+# Memory a single worker is assumed to need while parsing a large document (in MB)
+DEFAULT_WORKER_MEMORY_MB = 512
+
+# Cost of one embedded image, in pages
+IMAGE_COST_PAGES = 0.5
+
+# Batches of documents handed to each worker while probing
+PROBE_CHUNKS_PER_WORKER = 4
+
+# Documents whose page count is unknown (DOCX files not saved by Word, unreadable files) are costed
+# by size, at one page per BYTES_PER_PAGE
+BYTES_PER_PAGE = 100 * 1024
+
+
+def probe_file(file_path):
+    """
+    Probe a document without parsing it (see Loader.probe). PDFs are not scanned for images,
+    which would read every byte of every file before the batch starts, so their cost is their page count.
+
+    Args:
+        file_path (str): The path to the document.
+
+    Returns:
+        dict: The probe result, or None if the file is missing, unsupported or damaged.
+    """
+    try:
+        return Loader(file_path, os.path.splitext(file_path)[1][1:].lower()).probe(count_images=False)
+    except (OSError, ValueError):
+        return None  # Fails fast in the worker, which reports the error
+
+
+def estimate_cost(file_path, probe=None):
+    """
+    Estimate how expensive a document is to process, from its page and image counts.
+
+    Args:
+        file_path (str): The path to the document.
+        probe (dict, optional): The probe result of the document; probed here when omitted.
+
+    Returns:
+        float: The estimated cost in pages; missing files cost 0.
+    """
+    if probe is None:
+        probe = probe_file(file_path)
+    if probe is not None and probe['pages'] is not None:
+        return probe['pages'] + IMAGE_COST_PAGES * (probe['images'] or 0)
+    try:
+        return os.path.getsize(file_path) / BYTES_PER_PAGE
+    except OSError:
+        return 0  # Missing files fail fast in the worker
+
+
+def order_largest_first(files, probes=None):
+    """
+    Order documents by estimated cost, largest first, so no huge document is left for the end.
+
+    Args:
+        files (list): The paths of the documents.
+        probes (dict, optional): The probe result of each path; probed here when omitted.
+
+    Returns:
+        list: The paths, most expensive first.
+    """
+    probes = probes if probes is not None else {file_path: probe_file(file_path) for file_path in files}
+    return sorted(files, key=lambda file_path: estimate_cost(file_path, probes.get(file_path)), reverse=True)
+
+
+def oversized_result(file_path, probe, max_pages):
+    """
+    Build the result of a document with more pages than allowed.
+
+    Args:
+        file_path (str): The path to the document.
+        probe (dict): The probe result of the document, or None.
+        max_pages (int): The page limit; no limit when None or 0.
+
+    Returns:
+        dict: An 'oversized' result (see runner.process_document), or None if the document is within the limit.
+    """
+    if not max_pages or probe is None or probe['pages'] is None or probe['pages'] <= max_pages:
+        return None
+    return {'file_path': file_path, 'status': 'oversized', 'seconds': 0.0, 'bytes': probe['bytes'],
+            'error': f"{probe['pages']} pages, over the limit of {max_pages}", 'stages': {}}
+
+
+def max_workers_for_memory(concurrency, memory_budget_mb=None, worker_memory_mb=DEFAULT_WORKER_MEMORY_MB):
+    """
+    Cap the number of workers so that together they stay within the memory budget.
+
+    Args:
+        concurrency (int): The requested number of workers.
+        memory_budget_mb (int, optional): Total memory the workers may use, in MB. No cap when omitted.
+        worker_memory_mb (int): Memory assumed per worker, in MB.
+
+    Returns:
+        int: The number of workers to start (at least 1).
+    """
+    if memory_budget_mb:
+        concurrency = min(concurrency, memory_budget_mb // max(1, worker_memory_mb))
+    return max(1, concurrency)
+
+
+def init_worker(wait_for_storage=True, flush_barrier=None):
+    """
+    Create the Main instance (and its SQLStorage connection) that this worker reuses
+    for every document, and close it (draining any storage pipeline) when the worker exits.
+
+    Args:
+        wait_for_storage (bool, optional): Report each document only once its storage writes are done
+            (see runner.wait_for_storage).
+        flush_barrier (multiprocessing.Barrier, optional): Shared by the pool workers (see runner.flush_worker).
+    """
+    from main import Main  # Imported here to avoid a circular import with main.py
+
+    runner.wait_for_storage = wait_for_storage
+    runner.flush_barrier = flush_barrier
+    runner.worker_main = Main()
+    util.Finalize(runner.worker_main, runner.worker_main.close, exitpriority=10)
+
+
+class DocumentScheduler:
+    def __init__(self, concurrency=1, memory_budget_mb=None, worker_memory_mb=DEFAULT_WORKER_MEMORY_MB,
+                 max_pages=None):
+        """
+        Initialize the DocumentScheduler.
+
+        Args:
+            concurrency (int): The requested number of worker processes.
+            memory_budget_mb (int, optional): Total memory the workers may use, in MB.
+            worker_memory_mb (int): Memory assumed per worker, in MB.
+            max_pages (int, optional): Documents with more pages or slides are skipped without being parsed.
+        """
+        self.workers = max_workers_for_memory(concurrency, memory_budget_mb, worker_memory_mb)
+        self.max_pages = max_pages
+        self.storage_errors = []  # Storage failures reported by the workers' final flush
+
+    def run(self, files):
+        """
+        Probe the documents, skip those over the page limit and process the rest largest first
+        across the worker processes. With several workers the documents are probed by the workers too.
+        Once every document is processed, each worker writes what its storages still buffer and
+        the failures are left in storage_errors.
+
+        Args:
+            files (list): The paths of the documents to process.
+
+        Yields:
+            dict: The result of each document as it completes (see runner.process_document).
+        """
+        self.storage_errors = []
+        if self.workers == 1:
+            probes = {file_path: probe_file(file_path) for file_path in files}
+            files = yield from self.accept(files, probes)
+            if not files:
+                return
+            if runner.worker_main is None:
+                init_worker(wait_for_storage=False)  # Reuse one Main in this process for the whole batch
+            for file_path in files:
+                yield runner.process_document(file_path)
+            self.storage_errors = runner.flush_worker()
+            return
+
+        flush_barrier = multiprocessing.Barrier(self.workers)
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                 initargs=(True, flush_barrier)) as executor:
+            chunk_size = max(1, len(files) // (self.workers * PROBE_CHUNKS_PER_WORKER))
+            probes = dict(zip(files, executor.map(probe_file, files, chunksize=chunk_size)))
+            files = yield from self.accept(files, probes)
+            # Tasks are picked up in submission order, so the largest documents start first
+            futures = [executor.submit(runner.process_document, file_path) for file_path in files]
+            for future in as_completed(futures):
+                yield future.result()
+            flushes = [executor.submit(runner.flush_worker) for _ in range(self.workers)]
+            self.storage_errors = [error for flush in flushes for error in flush.result()]
+
+    def accept(self, files, probes):
+        """
+        Yield the result of every document over the page limit and order the others largest first.
+
+        Args:
+            files (list): The paths of the documents.
+            probes (dict): The probe result of each path.
+
+        Returns:
+            list: The paths to process, most expensive first.
+        """
+        accepted = []
+        for file_path in files:
+            oversized = oversized_result(file_path, probes[file_path], self.max_pages)
+            if oversized is not None:
+                yield oversized
+            else:
+                accepted.append(file_path)
+        return order_largest_first(accepted, probes)
@@ -0,0 +1,258 @@
+import os, sys, json, time, argparse, platform, tempfile, contextlib, multiprocessing  # Import necessary libraries
+from concurrent.futures import ProcessPoolExecutor  # Runs the memory measurement in a fresh process
+from tabulate import tabulate  # For displaying the benchmark results as a table
+
+try:
+    import resource  # Peak resident set size of a process (not available on Windows)
+except ImportError:
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Allow running from the benchmarks folder
+
+from benchmarks.synthetic_corpus import CORPUS_FORMATS, generate_document  # Reproducible synthetic documents
+from data_extractor.data_extractor import EXTRACTOR_VERSION, TEXT_ENGINES, UniversalDataExtractor  # Extractor under test
+from data_extractor.image_store import ImageStore  # Content-addressed image store
+from file_loader.concrete_file_loader import Loader  # Loader that owns the document session
+from instrumentation.stage_metrics import StageMetrics  # Per-stage timings of the measured runs
+from storage.columnar_storage import ColumnarStorage, pa  # Optional Parquet sink
+from storage.file_storage import FileStorage  # Storage backends under test
+from storage.jsonl_storage import JSONLStorage
+from storage.sqlite_storage import SQLiteStorage
+from storage.storage import store_document  # Streams one document into the storages
+
+# Page counts of each scale
+SCALES = {
+    'small': [10, 100],
+    'full': [10, 100, 1000, 5000],
+}
+
+# Storage backends measured; 'extract' walks the document without storing it
+SINKS = ['extract', 'file', 'sqlite', 'jsonl', 'columnar']
+
+# A case regresses when its median latency or peak memory grows by more than this fraction
+DEFAULT_TOLERANCE = 0.25
+
+# Bytes per unit of ru_maxrss: bytes on macOS, kilobytes on Linux
+MAXRSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+
+def create_sink(sink, work_dir):
+    """
+    Create the storage for a sink in its own folder.
+
+    Args:
+        sink (str): One of SINKS.
+        work_dir (str): The folder of the storage output.
+
+    Returns:
+        Storage: The storage, or None for 'extract'.
+    """
+    if sink == 'file':
+        return FileStorage(work_dir)
+    if sink == 'sqlite':
+        storage = SQLiteStorage(os.path.join(work_dir, "benchmark.db"), commit_every=1)  # Commit inside each run
+        storage.create_tables()
+        return storage
+    if sink == 'jsonl':
+        return JSONLStorage(os.path.join(work_dir, "benchmark.jsonl"))
+    if sink == 'columnar':
+        return ColumnarStorage(os.path.join(work_dir, "columnar"), rows_per_file=1)  # Write the part files in each run
+    return None
+
+
+def run_document(path, file_format, storages, image_store, workers, engine='layout'):
+    """
+    Extract one document into the storages, with the engine for PDFs.
+
+    Returns:
+        StageMetrics: The per-stage timings of the run.
+    """
+    loader = Loader(path, file_format)
+    loader.load_file()
+    extractor = UniversalDataExtractor(loader, workers=workers, image_store=image_store,
+                                       engine=engine if file_format == 'pdf' else 'layout')
+    store_document(extractor, storages)
+    extractor.close()
+    return extractor.metrics
+
+
+def percentile(values, fraction):
+    """Return the value at the given fraction of the sorted values (nearest rank)."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def measure_peak_rss(path, file_format, sink, workers, engine='layout'):
+    """
+    Run one document into a new sink and return the peak resident set size of this process
+    and of the PDF extraction workers it started. Run it in a fresh process, as ru_maxrss
+    only ever grows over a process's lifetime.
+
+    Returns:
+        tuple: The peak RSS of this process and the largest peak RSS of its workers, in MB.
+    """
+    with tempfile.TemporaryDirectory() as work_dir, open(os.devnull, 'w') as devnull, \
+            contextlib.redirect_stdout(devnull):  # Silence the per-document status messages
+        storage = create_sink(sink, work_dir)
+        run_document(path, file_format, [storage] if storage else [], ImageStore(os.path.join(work_dir, "images")),
+                     workers, engine)
+        if storage:
+            storage.close()
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * MAXRSS_UNIT / 1e6,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * MAXRSS_UNIT / 1e6)
+
+
+def measure_case(path, file_format, pages, sink, repeat, workers, engine='layout'):
+    """
+    Time repeated runs of one document and sink, then measure the peak RSS of one more run
+    in a fresh process (None where the resource module is not available).
+
+    Returns:
+        dict: The case results, see the JSON report.
+    """
+    with tempfile.TemporaryDirectory() as work_dir:
+        storage = create_sink(sink, work_dir)
+        storages = [storage] if storage else []
+        image_store = ImageStore(os.path.join(work_dir, "images"))
+        stages = StageMetrics()
+        latencies = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            stages.merge(run_document(path, file_format, storages, image_store, workers, engine).to_dict())
+            latencies.append(time.perf_counter() - start)
+        if storage:
+            storage.close()
+
+    peak_rss_mb = peak_worker_rss_mb = None
+    if resource is not None:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            peak_rss_mb, peak_worker_rss_mb = executor.submit(
+                measure_peak_rss, path, file_format, sink, workers, engine).result()
+
+    total = sum(latencies)
+    engine = engine if file_format == 'pdf' else 'layout'
+    return {
+        'case': f"{file_format}-{pages}p-{sink}" + (f"-{engine}" if engine != 'layout' else ""),
+        'format': file_format,
+        'engine': engine,
+        'pages': pages,
+        'sink': sink,
+        'runs': repeat,
+        'latencies_seconds': latencies,
+        'p50_seconds': percentile(latencies, 0.50),
+        'p95_seconds': percentile(latencies, 0.95),
+        'p99_seconds': percentile(latencies, 0.99),
+        'documents_per_second': repeat / total,
+        'pages_per_second': repeat * pages / total,
+        'peak_rss_mb': peak_rss_mb,
+        'peak_worker_rss_mb': peak_worker_rss_mb if workers > 1 else None,
+        'stages': stages.to_dict(),
+    }
+
+
+def format_mb(value):
+    """Format a size in MB for display, 'n/a' when it was not measured."""
+    return "n/a" if value is None else f"{value:.1f}"
+
+
+def find_regressions(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare the results with a baseline report.
+
+    Args:
+        results (list): The case results of this run.
+        baseline (dict): An earlier JSON report.
+        tolerance (float, optional): Allowed relative growth of the median latency and the peak memory.
+
+    Returns:
+        list: One message per regressed metric.
+    """
+    previous = {case['case']: case for case in baseline.get('results', [])}
+    regressions = []
+    for case in results:
+        old = previous.get(case['case'])
+        if old is None:
+            continue  # New case, nothing to compare with
+        for metric in ['p50_seconds', 'peak_rss_mb']:
+            if old.get(metric) and case[metric] is not None and case[metric] > old[metric] * (1 + tolerance):
+                regressions.append(f"{case['case']}: {metric} {old[metric]:.4f} -> {case[metric]:.4f} "
+                                   f"(+{(case[metric] / old[metric] - 1) * 100:.0f}%)")
+    return regressions
+
+
+def parse_args():
+    """Parse the command line options."""
+    parser = argparse.ArgumentParser(description="Benchmark extraction and storage on synthetic PDF, DOCX and PPTX documents.")
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small', help="Page counts to generate.")
+    parser.add_argument('--pages', type=int, nargs='+', help="Explicit page counts, overriding --scale.")
+    parser.add_argument('--formats', nargs='+', choices=CORPUS_FORMATS, default=CORPUS_FORMATS)
+    parser.add_argument('--sinks', nargs='+', choices=SINKS, default=['extract', 'file', 'sqlite', 'jsonl'])
+    parser.add_argument('--tables', type=int, default=1, help="Tables per page.")
+    parser.add_argument('--images', type=int, default=2, help="Images per page.")
+    parser.add_argument('--links', type=int, default=3, help="Hyperlinks per page.")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per case.")
+    parser.add_argument('--workers', type=int, default=1, help="PDF extraction worker processes.")
+    parser.add_argument('--pdf-engine', choices=TEXT_ENGINES['.pdf'], default='layout', help="Text engine for PDFs.")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the generated content.")
+    parser.add_argument('--corpus-dir', default=os.path.join(tempfile.gettempdir(), "synthetic_corpus"),
+                        help="Folder of the generated documents, reused across runs.")
+    parser.add_argument('--output', default="benchmark_results.json", help="JSON report of this run.")
+    parser.add_argument('--baseline', help="JSON report of an earlier run; exit with status 1 on regressions.")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    return parser.parse_args()
+
+
+def main():
+    """Generate the corpus, measure every case and write the JSON report."""
+    args = parse_args()
+    sinks = [sink for sink in args.sinks if sink != 'columnar' or pa is not None]
+    if len(sinks) < len(args.sinks):
+        print("Skipping the columnar sink: pyarrow is not installed.")
+
+    results = []
+    stdout = sys.stdout
+    for file_format in args.formats:
+        for pages in args.pages or SCALES[args.scale]:
+            path = generate_document(args.corpus_dir, file_format, pages, args.tables, args.images, args.links, args.seed)
+            for sink in sinks:
+                sys.stdout = open(os.devnull, 'w')  # Silence the per-document status messages
+                try:
+                    result = measure_case(path, file_format, pages, sink, args.repeat, args.workers, args.pdf_engine)
+                finally:
+                    sys.stdout.close()
+                    sys.stdout = stdout
+                results.append(result)
+                print(f"{result['case']}: p50 {result['p50_seconds'] * 1000:.1f} ms, "
+                      f"{result['pages_per_second']:.1f} pages/s, peak RSS {format_mb(result['peak_rss_mb'])} MB")
+
+    report = {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'extractor_version': EXTRACTOR_VERSION,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'parameters': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as output:
+        json.dump(report, output, indent=2)
+
+    rows = [[result['case'], f"{result['p50_seconds'] * 1000:.1f}", f"{result['p95_seconds'] * 1000:.1f}",
+             f"{result['p99_seconds'] * 1000:.1f}", f"{result['pages_per_second']:.1f}", format_mb(result['peak_rss_mb'])]
+            for result in results]
+    print(tabulate(rows, headers=["Case", "p50 ms", "p95 ms", "p99 ms", "Pages/s", "Peak RSS MB"], tablefmt='grid'))
+    print(f"Results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as baseline:
+            regressions = find_regressions(results, json.load(baseline), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import os, sys, time  # Import necessary libraries
+from tabulate import tabulate  # For displaying the benchmark results as a table
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Allow running from the benchmarks folder
+
+from data_extractor.data_extractor import UniversalDataExtractor  # Universal extractor for different file types
+from file_loader.concrete_file_loader import Loader  # Loader that owns the document session
+
+# Sample files shipped with the repository
+SAMPLE_FILES = [
+    ("test_files/PDF/sample.pdf", "pdf"),
+    ("test_files/DOCX/sample.docx", "docx"),
+    ("test_files/PPT/sample.pptx", "pptx"),
+]
+
+
+def run_before(file_path, file_type):
+    """
+    Reproduce the previous flow: Main loaded the file, the extractor loaded it again
+    and then reopened the path with the parser directly.
+
+    Returns:
+        int: The number of times the file was parsed.
+    """
+    reader = Loader.file_reader[file_type]
+    documents = [reader(file_path) for _ in range(3)]  # Main, extractor load_file, extractor reopen
+    for document in documents:
+        if hasattr(document, 'close'):
+            document.close()
+    return len(documents)
+
+
+def run_after(file_path, file_type):
+    """
+    Run the current flow where the loader's session parses the file once.
+
+    Returns:
+        int: The number of times the file was parsed.
+    """
+    loader = Loader(file_path, file_type)
+    loader.load_file()
+    extractor = UniversalDataExtractor(loader)
+    parse_count = loader.session.parse_count
+    extractor.close()
+    return parse_count
+
+
+def measure(func, file_path, file_type, repeat):
+    """Run func repeat times and return the parse count and mean wall time in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parse_count = func(file_path, file_type)
+    elapsed = (time.perf_counter() - start) / repeat
+    return parse_count, elapsed * 1000
+
+
+def main(repeat=5):
+    """Benchmark the parse count and wall time before and after the document session change."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    rows = []
+    for relative_path, file_type in SAMPLE_FILES:
+        file_path = os.path.join(root, relative_path)
+        before_parses, before_ms = measure(run_before, file_path, file_type, repeat)
+        after_parses, after_ms = measure(run_after, file_path, file_type, repeat)
+        rows.append([os.path.basename(file_path), before_parses, f"{before_ms:.2f}", after_parses, f"{after_ms:.2f}"])
+    headers = ["File", "Parses (before)", "Open ms (before)", "Parses (after)", "Open ms (after)"]
+    print(tabulate(rows, headers=headers, tablefmt='grid'))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
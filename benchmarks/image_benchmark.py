@@ -0,0 +1,85 @@
+import os, sys, time, tempfile  # Import necessary libraries
+from tabulate import tabulate  # For displaying the benchmark results as a table
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Allow running from the benchmarks folder
+
+from data_extractor.data_extractor import UniversalDataExtractor  # Universal extractor for different file types
+from data_extractor.image_store import ImageStore  # Content-addressed image store
+from data_extractor.image_utils import transcode_images  # Optional PNG transcoding step
+from data_extractor.page_walker import PageWalker  # Collects the embedded images without saving them
+from file_loader.concrete_file_loader import Loader  # Loader that owns the document session
+
+# Sample files shipped with the repository
+SAMPLE_FILES = [
+    ("test_files/PDF/sample.pdf", "pdf"),
+    ("test_files/DOCX/sample.docx", "docx"),
+    ("test_files/PPT/sample.pptx", "pptx"),
+]
+
+
+def collect_images(root):
+    """Load every sample file and collect its embedded images, ready to be saved."""
+    collected = []
+    for relative_path, file_type in SAMPLE_FILES:
+        loader = Loader(os.path.join(root, relative_path), file_type)
+        loader.load_file()
+        extractor = UniversalDataExtractor(loader)
+        images = [image for record in PageWalker(extractor.content, extractor.file_type).walk() for image in record.images]
+        collected.append((extractor, images))
+    return collected
+
+
+def measure(collected, image_mode, repeat):
+    """
+    Save every collected image in the given mode.
+
+    Returns:
+        tuple: The image count, bytes written and mean milliseconds per image.
+    """
+    count, total_bytes, total_seconds = 0, 0, 0.0
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as image_dir:
+            count, total_bytes = 0, 0
+            for extractor, images in collected:
+                extractor.image_mode, extractor.image_store = image_mode, ImageStore(image_dir)
+                for image in images:
+                    start = time.perf_counter()
+                    path = extractor.save_image(image['data'])[1]
+                    total_seconds += time.perf_counter() - start
+                    count += 1
+                    total_bytes += os.path.getsize(path)
+    return count, total_bytes, total_seconds * 1000 / max(1, count * repeat)
+
+
+def measure_transcoding(collected, workers, repeat):
+    """Save the images raw, then time the separate PNG transcoding step on a thread pool."""
+    total_seconds, count = 0.0, 0
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as image_dir:
+            paths = []
+            for extractor, images in collected:
+                extractor.image_mode, extractor.image_store = 'raw', ImageStore(image_dir)
+                paths.extend(extractor.save_image(image['data'])[1] for image in images)
+            start = time.perf_counter()
+            transcode_images(paths, workers)
+            total_seconds += time.perf_counter() - start
+            count = len(paths)
+    return total_seconds * 1000 / max(1, count * repeat)
+
+
+def main(repeat=5):
+    """Compare raw pass-through with PNG re-encoding of embedded images."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    collected = collect_images(root)
+    rows = []
+    for image_mode in ['png', 'raw']:
+        count, total_bytes, ms_per_image = measure(collected, image_mode, repeat)
+        rows.append([image_mode, count, total_bytes, f"{ms_per_image:.2f}"])
+    print(tabulate(rows, headers=["Image mode", "Images", "Bytes written", "ms/image"], tablefmt='grid'))
+    print(f"Optional PNG transcoding of raw images on 4 threads: {measure_transcoding(collected, 4, repeat):.2f} ms/image")
+    for extractor, _ in collected:
+        extractor.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,141 @@
+import os, sys, time  # Import necessary libraries
+from tabulate import tabulate  # For displaying the benchmark results as a table
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Allow running from the benchmarks folder
+
+from data_extractor.data_extractor import EXTRACTOR_VERSION  # Version recorded with each document
+from data_extractor.page_walker import PageRecord  # Synthetic pages fed to the storage
+from storage.sql_storage import SQLStorage  # Storage under test
+from storage.sqlite_storage import SQLiteStorage  # Creates the tables of the stand-in
+
+
+# SQLite stand-in for a MySQL connection: translates the %s placeholders used by SQLStorage
+class SQLiteConnection:
+    def __init__(self):
+        storage = SQLiteStorage(":memory:")
+        storage.create_tables()
+        # Same schema as the SQLite backend; implicit transactions again, like a MySQL connection
+        self.connection = storage.connection
+        self.connection.isolation_level = ''
+        self.statements = 0  # Number of execute/executemany calls, i.e. round-trips on a real server
+
+    def cursor(self):
+        return SQLiteCursor(self)
+
+    def commit(self):
+        self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        self.connection.close()
+
+
+class SQLiteCursor:
+    def __init__(self, owner):
+        self.owner = owner
+        self.cursor = owner.connection.cursor()
+
+    @property
+    def lastrowid(self):
+        return self.cursor.lastrowid
+
+    def execute(self, statement, params=()):
+        self.owner.statements += 1
+        self.cursor.execute(statement.replace('%s', '?'), params)
+
+    def executemany(self, statement, rows):
+        self.owner.statements += 1
+        self.cursor.executemany(statement.replace('%s', '?'), rows)
+
+    def close(self):
+        self.cursor.close()
+
+
+# SQLStorage connected to the SQLite stand-in instead of a MySQL server
+class StandInSQLStorage(SQLStorage):
+    def create_connection(self):
+        self.connection = SQLiteConnection()
+
+
+# Minimal extractor exposing what SQLStorage reads from a document
+class SyntheticExtractor:
+    version = EXTRACTOR_VERSION
+
+    def __init__(self, index):
+        self.index = index
+        self.file_loader = self
+
+    @property
+    def file_path(self):
+        return self.get_file_name()
+
+    def get_file_name(self):
+        return f"document_{self.index}.pdf"
+
+    def content_hash(self):
+        return f"{self.index:064d}"
+
+    def extract_metadata(self):
+        return {f"key_{i}": f"value_{i}" for i in range(10)}
+
+
+def synthetic_pages(pages, links_per_page):
+    """Build PageRecords with text, a table, an image and several links per page."""
+    return [
+        PageRecord(
+            page_number,
+            text=f"Page {page_number} " * 50,
+            tables=[[["a", "b", "c"], ["1", "2", "3"]]],
+            images=[{'index': 1, 'page_number': page_number, 'width': 640, 'height': 480, 'bbox': (72, 72, 552, 432),
+                     'hash': f"{page_number:064d}", 'path': f"output/images/{page_number}.png"}],
+            links=[f"https://example.com/{page_number}/{i}" for i in range(links_per_page)],
+            table_boxes=[(72, 500, 300, 560)],
+        )
+        for page_number in range(1, pages + 1)
+    ]
+
+
+def run(batch_size, commit_every, documents, pages):
+    """Store the synthetic documents and return the elapsed seconds and statement count."""
+    storage = StandInSQLStorage({}, batch_size=batch_size, commit_every=commit_every)
+    records = synthetic_pages(pages, links_per_page=20)
+    start = time.perf_counter()
+    for index in range(documents):
+        extractor = SyntheticExtractor(index)
+        storage.begin_document(extractor)
+        for record in records:
+            storage.store_page(record)
+        storage.end_document(extractor)
+    storage.flush()
+    elapsed = time.perf_counter() - start
+    return elapsed, storage.connection.statements
+
+
+def main(documents=50, pages=20):
+    """Compare row-by-row inserts with batched inserts and multi-document transactions."""
+    configurations = [
+        ("row by row (previous behaviour)", 1, 1),
+        ("executemany, batch 500", 500, 1),
+        ("executemany, batch 500, commit every 25 docs", 500, 25),
+    ]
+    rows = []
+    stdout = sys.stdout
+    for label, batch_size, commit_every in configurations:
+        sys.stdout = open(os.devnull, 'w')  # Silence the per-document status messages
+        try:
+            elapsed, statements = run(batch_size, commit_every, documents, pages)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+        rows.append([label, statements, f"{elapsed * 1000:.1f}", f"{documents / elapsed:.1f}"])
+    print(f"{documents} documents x {pages} pages on an in-memory SQLite stand-in")
+    print(tabulate(rows, headers=["Mode", "Statements", "Total ms", "Docs/s"], tablefmt='grid'))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
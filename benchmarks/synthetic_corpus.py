@@ -0,0 +1,289 @@
+import io, os, random  # Import necessary libraries
+from PIL import Image  # Small JPEG images embedded in the documents
+from docx import Document  # Builds DOCX files
+from docx.opc.constants import RELATIONSHIP_TYPE  # Hyperlink relationship type
+from docx.oxml import OxmlElement  # Raw hyperlink elements, python-docx has no hyperlink API
+from docx.oxml.ns import qn
+from docx.shared import Inches
+from pptx import Presentation  # Builds PPTX files
+from pptx.util import Inches as PptxInches
+
+# Formats the generator can write
+CORPUS_FORMATS = ['pdf', 'docx', 'pptx']
+
+# Distinct images per document; pages cycle through them, so the image store sees repeated images too
+IMAGE_VARIANTS = 8
+
+# Letter page size in PDF points
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792
+
+WORDS = ("extraction pipeline document page table image link storage batch throughput latency memory "
+         "report quarterly revenue growth market customer product service region forecast").split()
+
+
+# Content of one synthetic page, generated from a seeded random source so every run sees the same corpus
+class SyntheticPage:
+    def __init__(self, rng, page_number, tables, images, links, rows=5, columns=4):
+        """
+        Initialize the SyntheticPage.
+
+        Args:
+            rng (random.Random): The seeded random source.
+            page_number (int): The 1-based page number.
+            tables (int): Tables on the page.
+            images (int): Images on the page, as indexes into the document's image variants.
+            links (int): Hyperlinks on the page.
+            rows (int, optional): Rows per table, including the header.
+            columns (int, optional): Columns per table.
+        """
+        self.page_number = page_number
+        self.lines = [" ".join(rng.choice(WORDS) for _ in range(10)) for _ in range(8)]
+        self.tables = [[[f"h{column}" for column in range(columns)]] +
+                       [[str(rng.randint(0, 9999)) for _ in range(columns)] for _ in range(rows - 1)]
+                       for _ in range(tables)]
+        self.images = [rng.randrange(IMAGE_VARIANTS) for _ in range(images)]
+        self.links = [f"https://example.com/doc/{page_number}/{index}" for index in range(links)]
+
+
+def synthetic_pages(pages, tables=1, images=2, links=3, seed=0):
+    """
+    Generate the content of every page.
+
+    Args:
+        pages (int): The number of pages (slides for PPTX).
+        tables (int, optional): Tables per page.
+        images (int, optional): Images per page.
+        links (int, optional): Hyperlinks per page.
+        seed (int, optional): Seed of the random source.
+
+    Returns:
+        list: The SyntheticPage objects.
+    """
+    rng = random.Random(seed)
+    return [SyntheticPage(rng, page_number, tables, images, links) for page_number in range(1, pages + 1)]
+
+
+def image_variants(seed=0):
+    """Encode IMAGE_VARIANTS distinct 64x64 JPEG images."""
+    rng = random.Random(seed)
+    variants = []
+    for _ in range(IMAGE_VARIANTS):
+        image = Image.new('RGB', (64, 64), tuple(rng.randrange(256) for _ in range(3)))
+        image.paste(tuple(rng.randrange(256) for _ in range(3)), (16, 16, 48, 48))
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=80)
+        variants.append(buffer.getvalue())
+    return variants
+
+
+def pdf_string(text):
+    """Escape text for a PDF literal string."""
+    return "(" + text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+# Writes a PDF one object at a time, without any PDF library
+class PDFWriter:
+    def __init__(self):
+        self.objects = []  # Object bodies in object number order (numbers start at 1)
+
+    def reserve(self):
+        """Reserve an object number whose body is set later."""
+        self.objects.append(None)
+        return len(self.objects)
+
+    def add(self, body):
+        """Add an object and return its number."""
+        self.objects.append(body)
+        return len(self.objects)
+
+    def set(self, number, body):
+        """Set the body of a reserved object."""
+        self.objects[number - 1] = body
+
+    def stream(self, dictionary, data):
+        """Add a stream object and return its number."""
+        return self.add(b"<< " + dictionary.encode('latin-1') + f" /Length {len(data)} >>\nstream\n".encode('latin-1')
+                        + data + b"\nendstream")
+
+    def write(self, path, root):
+        """Write the objects, the cross-reference table and the trailer."""
+        with open(path, 'wb') as pdf:
+            pdf.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+            offsets = []
+            for number, body in enumerate(self.objects, start=1):
+                offsets.append(pdf.tell())
+                body = body.encode('latin-1') if isinstance(body, str) else body
+                pdf.write(f"{number} 0 obj\n".encode('latin-1') + body + b"\nendobj\n")
+            xref = pdf.tell()
+            pdf.write(f"xref\n0 {len(self.objects) + 1}\n0000000000 65535 f \n".encode('latin-1'))
+            pdf.write("".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode('latin-1'))
+            pdf.write(f"trailer\n<< /Size {len(self.objects) + 1} /Root {root} 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode('latin-1'))
+
+
+def pdf_table(table, x, top, cell_width=120, cell_height=20):
+    """Draw a ruled table with its cell text; pdfplumber finds tables from the ruling lines."""
+    rows, columns = len(table), len(table[0])
+    bottom = top - rows * cell_height
+    commands = ["0 0 0 RG 0.5 w"]
+    for row in range(rows + 1):
+        y = top - row * cell_height
+        commands.append(f"{x} {y} m {x + columns * cell_width} {y} l S")
+    for column in range(columns + 1):
+        commands.append(f"{x + column * cell_width} {top} m {x + column * cell_width} {bottom} l S")
+    for row_index, row in enumerate(table):
+        for column_index, cell in enumerate(row):
+            commands.append(f"BT /F1 9 Tf {x + column_index * cell_width + 4} {top - (row_index + 1) * cell_height + 6} Td "
+                            f"{pdf_string(cell)} Tj ET")
+    return commands, bottom
+
+
+def write_pdf(path, pages, seed=0):
+    """
+    Write a PDF with text, ruled tables, JPEG images and URI link annotations on every page.
+
+    Args:
+        path (str): The PDF file to write.
+        pages (list): The SyntheticPage objects.
+        seed (int, optional): Seed of the image variants.
+    """
+    writer = PDFWriter()
+    catalog = writer.reserve()
+    page_tree = writer.reserve()
+    font = writer.add("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    images = [writer.stream("/Type /XObject /Subtype /Image /Width 64 /Height 64 /ColorSpace /DeviceRGB "
+                            "/BitsPerComponent 8 /Filter /DCTDecode", data) for data in image_variants(seed)]
+    kids = []
+    for page in pages:
+        commands = []
+        y = PAGE_HEIGHT - 50
+        for line in page.lines:
+            commands.append(f"BT /F1 10 Tf 50 {y} Td {pdf_string(line)} Tj ET")
+            y -= 14
+        y -= 10
+        for table in page.tables:
+            table_commands, y = pdf_table(table, 50, y)
+            commands.extend(table_commands)
+            y -= 20
+        for position, variant in enumerate(page.images):
+            commands.append(f"q 64 0 0 64 {50 + position * 80} {max(y - 64, 120)} cm /Im{variant} Do Q")
+        annotations = []
+        for index, link in enumerate(page.links):
+            link_y = 40 + index * 14
+            commands.append(f"BT /F1 9 Tf 50 {link_y} Td {pdf_string(link)} Tj ET")
+            annotations.append(writer.add(f"<< /Type /Annot /Subtype /Link /Rect [50 {link_y - 2} 300 {link_y + 10}] "
+                                          f"/Border [0 0 0] /A << /S /URI /URI {pdf_string(link)} >> >>"))
+        content = writer.stream("", "\n".join(commands).encode('latin-1'))
+        xobjects = " ".join(f"/Im{index} {number} 0 R" for index, number in enumerate(images))
+        annots = " ".join(f"{number} 0 R" for number in annotations)
+        kids.append(writer.add(f"<< /Type /Page /Parent {page_tree} 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+                               f"/Resources << /Font << /F1 {font} 0 R >> /XObject << {xobjects} >> >> "
+                               f"/Contents {content} 0 R /Annots [{annots}] >>"))
+    writer.set(page_tree, f"<< /Type /Pages /Kids [{' '.join(f'{kid} 0 R' for kid in kids)}] /Count {len(kids)} >>")
+    writer.set(catalog, f"<< /Type /Catalog /Pages {page_tree} 0 R >>")
+    writer.write(path, catalog)
+
+
+def add_docx_hyperlink(paragraph, url):
+    """Append a hyperlink run pointing to url to a python-docx paragraph."""
+    relationship_id = paragraph.part.relate_to(url, RELATIONSHIP_TYPE.HYPERLINK, is_external=True)
+    hyperlink = OxmlElement('w:hyperlink')
+    hyperlink.set(qn('r:id'), relationship_id)
+    run = OxmlElement('w:r')
+    text = OxmlElement('w:t')
+    text.text = url
+    run.append(text)
+    hyperlink.append(run)
+    paragraph._p.append(hyperlink)
+
+
+def write_docx(path, pages, seed=0):
+    """
+    Write a DOCX with one page-break separated section per synthetic page.
+
+    Args:
+        path (str): The DOCX file to write.
+        pages (list): The SyntheticPage objects.
+        seed (int, optional): Seed of the image variants.
+    """
+    variants = image_variants(seed)
+    document = Document()
+    for page in pages:
+        document.add_heading(f"Page {page.page_number}", level=1)
+        for line in page.lines:
+            document.add_paragraph(line)
+        for table in page.tables:
+            docx_table = document.add_table(rows=len(table), cols=len(table[0]))
+            for row_index, row in enumerate(table):
+                for column_index, cell in enumerate(row):
+                    docx_table.cell(row_index, column_index).text = cell
+        for variant in page.images:
+            document.add_picture(io.BytesIO(variants[variant]), width=Inches(0.8))
+        for link in page.links:
+            add_docx_hyperlink(document.add_paragraph(), link)
+        document.add_page_break()
+    document.save(path)
+
+
+def write_pptx(path, pages, seed=0):
+    """
+    Write a PPTX with one slide per synthetic page.
+
+    Args:
+        path (str): The PPTX file to write.
+        pages (list): The SyntheticPage objects.
+        seed (int, optional): Seed of the image variants.
+    """
+    variants = image_variants(seed)
+    presentation = Presentation()
+    layout = presentation.slide_layouts[6]  # Blank layout
+    for page in pages:
+        slide = presentation.slides.add_slide(layout)
+        body = slide.shapes.add_textbox(PptxInches(0.5), PptxInches(0.3), PptxInches(9), PptxInches(2)).text_frame
+        body.text = "\n".join(page.lines)
+        for table_index, table in enumerate(page.tables):
+            shape = slide.shapes.add_table(len(table), len(table[0]), PptxInches(0.5), PptxInches(2.5 + table_index * 2),
+                                           PptxInches(6), PptxInches(1.5))
+            for row_index, row in enumerate(table):
+                for column_index, cell in enumerate(row):
+                    shape.table.cell(row_index, column_index).text = cell
+        for position, variant in enumerate(page.images):
+            slide.shapes.add_picture(io.BytesIO(variants[variant]), PptxInches(6.8 + (position % 3) * 1),
+                                     PptxInches(2.5 + (position // 3) * 1), PptxInches(0.8))
+        links = slide.shapes.add_textbox(PptxInches(0.5), PptxInches(6.5), PptxInches(9), PptxInches(1)).text_frame
+        for index, link in enumerate(page.links):
+            paragraph = links.paragraphs[0] if index == 0 else links.add_paragraph()
+            run = paragraph.add_run()
+            run.text = link
+            run.hyperlink.address = link
+    presentation.save(path)
+
+
+def generate_document(corpus_dir, file_format, pages, tables=1, images=2, links=3, seed=0):
+    """
+    Write a synthetic document, or reuse it if the same parameters were generated before.
+
+    Args:
+        corpus_dir (str): The folder of the generated documents.
+        file_format (str): 'pdf', 'docx' or 'pptx'.
+        pages (int): The number of pages (slides for PPTX, page-break separated sections for DOCX).
+        tables (int, optional): Tables per page.
+        images (int, optional): Images per page.
+        links (int, optional): Hyperlinks per page.
+        seed (int, optional): Seed of the random content.
+
+    Returns:
+        str: The path of the document.
+
+    Raises:
+        ValueError: If the format is not supported.
+    """
+    writers = {'pdf': write_pdf, 'docx': write_docx, 'pptx': write_pptx}
+    if file_format not in writers:
+        raise ValueError(f"Unsupported format: {file_format}. Use one of {CORPUS_FORMATS}.")
+    os.makedirs(corpus_dir, exist_ok=True)
+    path = os.path.join(corpus_dir, f"synthetic_{pages}p_{tables}t_{images}i_{links}l_s{seed}.{file_format}")
+    if not os.path.exists(path):
+        temp_path = f"{path}.tmp"
+        writers[file_format](temp_path, synthetic_pages(pages, tables, images, links, seed), seed)
+        os.replace(temp_path, path)
+    return path
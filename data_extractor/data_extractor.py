@@ -1,33 +1,293 @@
-import os, io, csv  # Import necessary libraries
-import docx.document  # Import specific module for working with DOCX files
-import pdfplumber  # Import pdfplumber to work with PDF files
-import docx  # Import python-docx for DOCX files
-from pptx import Presentation  # Import python-pptx for PPTX files
-from PIL import Image  # Import PIL to handle images
+import os, hashlib, functools  # Import necessary libraries
+from concurrent.futures import ThreadPoolExecutor  # For generating thumbnails in parallel
+from data_extractor.image_store import ImageStore  # Content-addressed store for extracted images
+from data_extractor.image_utils import RAW_STREAM_EXTENSION, encode_png, make_thumbnail, sniff_image_format  # Image format helpers
+from data_extractor.page_walker import PageWalker, extract_pdf_page  # Single-pass walker over pages and slides
+from instrumentation.stage_metrics import StageMetrics, measure, start_timer  # Per-stage timing
+
+# Default maximum width and height of image thumbnails
+THUMBNAIL_SIZE = (256, 256)
+
+# Image modes: 'raw' writes the embedded bytes as they are, 'png' decodes and re-encodes every image as PNG
+IMAGE_MODES = ['raw', 'png']
+
+
+def cached_result(method):
+    """
+    Decorator that computes an extraction result once and reuses it for the life of the extractor,
+    so every storage backend shares the same result.
+    """
+    @functools.wraps(method)
+    def wrapper(self):
+        if method.__name__ not in self.results:
+            self.results[method.__name__] = method(self)  # Compute the artifact on first use
+        return self.results[method.__name__]
+    return wrapper
+
+
+def timed(stage):
+    """
+    Decorator that records the wall and CPU time of a method in the extractor's stage metrics,
+    counting the items of the result when it is a list.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with measure(self.metrics, stage) as counts:
+                result = method(self, *args, **kwargs)
+                counts['items'] = len(result) if isinstance(result, list) else 1
+            return result
+        return wrapper
+    return decorator
+
+# Version of the extraction logic; bump it when extracted output changes so stored documents are re-extracted
+EXTRACTOR_VERSION = "1.1"
+
+# Text engines available per file type; 'layout' is the default and extracts everything.
+# 'fast' extracts only the text (PDFium) and links of PDFs, many times faster than pdfplumber's layout model.
+TEXT_ENGINES = {
+    '.pdf': ['layout', 'fast'],
+    '.docx': ['layout'],
+    '.pptx': ['layout'],
+}
+
+
+def extraction_version(engine='layout'):
+    """
+    Get the version recorded with documents extracted by an engine, so switching engines re-extracts them.
+
+    Args:
+        engine (str, optional): The text engine.
+
+    Returns:
+        str: EXTRACTOR_VERSION, suffixed with the engine name for engines other than 'layout'.
+    """
+    return EXTRACTOR_VERSION if engine == 'layout' else f"{EXTRACTOR_VERSION}+{engine}"
+
+
+def cache_version(version, image_mode, image_root):
+    """
+    Get the version an extraction cache entry is stored under. Cached pages carry the hash and path of
+    their stored images, so entries are kept apart per image mode and image store.
+
+    Args:
+        version (str): The extractor and engine version (see extraction_version).
+        image_mode (str): The image mode, one of IMAGE_MODES.
+        image_root (str): The root of the image store.
+
+    Returns:
+        str: The version, suffixed with the image mode and a short hash of the image store root.
+    """
+    root_hash = hashlib.sha256(os.path.abspath(image_root).encode('utf-8')).hexdigest()[:12]
+    return f"{version}+{image_mode}-{root_hash}"
+
+# Core document properties shared by python-docx and python-pptx
+CORE_PROPERTIES = [
+    'author', 'category', 'comments', 'content_status', 'created', 'identifier', 'keywords',
+    'language', 'last_modified_by', 'last_printed', 'modified', 'revision', 'subject', 'title', 'version',
+]
+
+
+def metadata_to_dict(metadata):
+    """
+    Convert extracted metadata to a dictionary of non-empty values.
+    PDF metadata is already a dict, DOCX/PPTX core properties are objects with attributes.
+
+    Args:
+        metadata: The metadata returned by extract_metadata.
+
+    Returns:
+        dict: The non-empty metadata values keyed by property name.
+    """
+    if not metadata:
+        return {}
+    if isinstance(metadata, dict):
+        return {key: value for key, value in metadata.items() if value}  # Only keep non-empty metadata
+    properties = {}
+    for prop in CORE_PROPERTIES:
+        value = getattr(metadata, prop, None)
+        if value:  # Only keep non-empty metadata
+            properties[prop] = value
+    return properties
+
+
+def describe_image(image):
+    """
+    Describe an image found by the PageWalker without decoding it.
+
+    Args:
+        image (dict): The image dict from a PageRecord.
+
+    Returns:
+        dict: The page number, index, format, width, height, bounding box and byte size of the image.
+    """
+    extension = sniff_image_format(image['data']) or RAW_STREAM_EXTENSION
+    return {
+        'page_number': image['page_number'],
+        'index': image['index'],
+        'format': extension[1:],
+        'width': image['width'],
+        'height': image['height'],
+        'bbox': image['bbox'],
+        'byte_size': len(image['data']),
+    }
+
 
 # Universal Data Extractor class to handle different file types (PDF, DOCX, PPTX)
 class UniversalDataExtractor():
-    def __init__(self, loader):
+    def __init__(self, loader, workers=1, image_mode='raw', image_dir=os.path.join('output', 'images'), image_store=None,
+                 metrics=None, engine='layout', cache=None):
         """
         Initialize the UniversalDataExtractor with a file loader.
         
         Args:
             loader: An instance of a file loader that handles file loading.
+            workers (int, optional): Number of worker processes used to extract PDF pages in parallel.
+                The default of 1 extracts pages serially.
+            image_mode (str, optional): 'raw' writes embedded images as-is with the extension sniffed from
+                their magic bytes; 'png' decodes and re-encodes them as PNG.
+            image_dir (str, optional): The root of the content-addressed image store.
+            image_store (ImageStore, optional): A store shared across extractors; created from image_dir when omitted.
+            metrics (StageMetrics, optional): Collects the time spent in each stage of this document;
+                created when omitted.
+            engine (str, optional): The text engine, one of TEXT_ENGINES for the file type.
+            cache (ExtractionCache, optional): On-disk cache of extraction results. On a hit the document
+                is not parsed at all; on a miss the results are added to the cache as the pages are walked.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            ValueError: If the image mode or the engine is not supported, or the file is not a valid document.
         """
+        if image_mode not in IMAGE_MODES:
+            raise ValueError(f"Unsupported image mode: {image_mode}. Use one of {IMAGE_MODES}.")
         self.file_loader = loader  # Store the file loader object
-        self.content = self.file_loader.load_file()  # Load the file content
-        self.file_type = os.path.splitext(loader.file_path)[1].lower()  # Extract the file extension and convert it to lowercase
-        
-        # Handle different file types (PDF, DOCX, PPTX)
+        loader.validate_file()  # Sniff the actual type before it picks the engine, cache entry and walker
+        self.workers = workers  # Opt-in parallel PDF extraction
+        self.image_mode = image_mode
+        self.image_store = image_store or ImageStore(image_dir)  # Each unique image is written once
+        self.results = {}  # Cache of extraction results, keyed by extract_* method name
+        self.metrics = metrics or StageMetrics()  # Wall/CPU time, bytes and items per stage of this document
+        self.file_type = f".{loader.file_type.lower()}"  # The type validated by the loader, which may differ from the extension
+        if engine not in TEXT_ENGINES.get(self.file_type, ['layout']):
+            raise ValueError(f"Unsupported engine for {self.file_type} files: {engine}.")
+        self.engine = engine
+        self.version = extraction_version(engine)  # Recorded by the storages with the extracted data
+        self.cache = cache
+        self.content = None  # Parsed document, only opened when the results are not cached
+
+        # Serve the results from the cache when the same contents were extracted by the same version
+        # into the same image mode and store
+        self.cache_version = cache_version(self.version, image_mode, self.image_store.root)
+        cached = cache.get(loader.content_hash(), self.cache_version) if cache is not None else None
+        self.cached = cached is not None
+        if self.cached:
+            self.results['extract_metadata'] = cached['metadata']
+        else:
+            self.open_document()
+
+    def open_document(self):
+        """
+        Parse the document through the loader's session, unless it is already open.
+
+        Returns:
+            object: The parsed document.
+        """
+        if self.content is not None:
+            return self.content
+        with measure(self.metrics, 'file.open'):
+            self.content = self.file_loader.load_file()  # Reuse the document parsed by the loader's session
+
+        # Handle different file types (PDF, DOCX, PPTX) using the already parsed document
         if self.file_type == '.pdf':
-            self.pdf = pdfplumber.open(self.file_loader.file_path)  # Open PDF using pdfplumber
+            self.pdf = self.content  # pdfplumber PDF object
             
         elif self.file_type == '.docx':
-            self.doc = docx.Document(self.file_loader.file_path)  # Open DOCX using python-docx
+            self.doc = self.content  # python-docx Document object
             
         elif self.file_type == '.pptx':
-            self.prs = Presentation(self.file_loader.file_path)  # Open PPTX using python-pptx
+            self.prs = self.content  # python-pptx Presentation object
+        return self.content
  
+    def iter_pages(self):
+        """
+        Stream the document page by page (slide by slide for PPTX).
+        Each record's images are saved as they are found and carry their content 'hash' and stored 'path',
+        so consumers can store one page at a time with bounded memory.
+
+        Yields:
+            PageRecord: The text, tables, images and links of one page.
+        """
+        content_hash = self.file_loader.content_hash()
+        if self.cached:
+            try:
+                records = self.cache.open_pages(content_hash, self.cache_version)
+            except FileNotFoundError:
+                self.cached = False  # Evicted since the lookup, extract the document instead
+            else:
+                while True:
+                    started = start_timer()
+                    record = next(records, None)
+                    if record is None:
+                        return
+                    self.metrics.record('cache.read', started, 1, len(record.text))
+                    yield record
+
+        self.open_document()
+        writer = None
+        if self.cache is not None:
+            writer = self.cache.writer(content_hash, self.cache_version,
+                                       {'metadata': metadata_to_dict(self.extract_metadata())})
+        completed = False
+        try:
+            records = PageWalker(self.content, self.file_type, self.file_loader.file_path, self.workers,
+                                 engine=self.engine).walk()
+            while True:
+                started = start_timer()
+                record = next(records, None)
+                if record is None:
+                    break
+                self.metrics.record('extract.page', started, 1, len(record.text))
+                self.metrics.merge(record.stages)  # Finer stages measured while the page was extracted
+                for image in record.images:
+                    with measure(self.metrics, 'image.save') as counts:
+                        # Save the image and keep its path
+                        image['hash'], image['path'] = self.save_image(image['data'])
+                        counts['items'], counts['bytes'] = 1, len(image['data'])
+                if writer is not None:
+                    writer.add_page(record)
+                yield record
+            completed = True
+        finally:
+            if writer is not None:
+                if completed:
+                    writer.finish()
+                else:
+                    writer.abort()  # Only publish entries of documents that were walked to the end
+
+    def walk_pages(self):
+        """
+        Visit every page or slide once and compute text, tables, images and links together.
+        The results are cached, so later extract_* calls do not traverse the document again.
+
+        Returns:
+            dict: The cached extraction results.
+        """
+        if 'extract_text' in self.results:
+            return self.results  # Already walked
+
+        texts, tables, images, links = [], [], [], []
+        for record in self.iter_pages():
+            texts.append(record.text)
+            tables.extend(record.tables)
+            images.extend(image['path'] for image in record.images)
+            links.extend(record.links)
+
+        self.results['extract_text'] = "\n".join(texts).strip()
+        self.results['extract_tables'] = tables
+        self.results['extract_images'] = images
+        self.results['extract_links'] = links
+        return self.results
+
     def extract_text(self):
         """
         Extract text from the file based on its type.
@@ -35,26 +295,7 @@ class UniversalDataExtractor():
         Returns:
             str: Extracted text.
         """
-        extracted_data = {'text': '', 'metadata': {}}  # Placeholder for extracted data
-        
-        # Extract text from a PDF
-        if self.file_type == '.pdf':
-            return "\n".join(page.extract_text() or "" for page in self.pdf.pages).strip()  # Extract text from all PDF pages
-        
-        # Extract text from a DOCX
-        elif self.file_type == '.docx':
-            return "\n".join(para.text for para in self.doc.paragraphs).strip()  # Extract text from DOCX paragraphs
-        
-        # Extract text from a PPTX
-        elif self.file_type == 'pptx':
-            text = ''
-            for slide in self.prs.slides:  # Iterate through each slide
-                for shape in slide.shapes:  # Iterate through each shape
-                    if hasattr(shape, "text"):  # Check if the shape has text
-                        text += shape.text + "\n"
-            return text.strip()  # Return extracted text
-
-        return ""  # Return empty string if file type is not supported
+        return self.walk_pages()['extract_text']
     
     def extract_tables(self):
         """
@@ -63,58 +304,93 @@ class UniversalDataExtractor():
         Returns:
             list: Extracted tables.
         """
-        # Extract tables from a PDF
-        if self.file_type == ".pdf":
-            return [table for page in self.pdf.pages for table in page.extract_tables()]  # Extract tables from all pages of the PDF
-        
-        # Extract tables from a DOCX
-        elif self.file_type == "docx":
-            tables = []
-            for table in self.doc.tables:  # Iterate through all tables
-                table_data = [[cell.text for cell in row.cells] for row in table.rows]  # Extract text from each cell
-                tables.append(table_data)
-            return tables
-        
-        # PPTX typically does not contain tables in this context
-        elif self.file_type == ".pptx":
-            return []
-        
-        return []
+        return self.walk_pages()['extract_tables']
     
-    def extract_images(self):
+    def extract_images(self, metadata_only=False):
         """
         Extract images from the file based on its type.
+
+        Args:
+            metadata_only (bool, optional): Only describe the images (format, size, position, byte size)
+                without decoding or saving them.
         
         Returns:
-            list: Paths of extracted images.
+            list: Paths of extracted images, or image descriptions when metadata_only is set.
         """
-        images = []  # List to store image paths
-        
-        # Extract images from a PDF
-        if self.file_type == ".pdf":
-            for page_number, page in enumerate(self.pdf.pages):  # Iterate through each page
-                for img_index, img in enumerate(page.images):  # Iterate through images in the page
-                    if 'stream' in img:  # Check if image has raw data stream
-                        img_data = img['stream'].get_rawdata()
-                        images.append(self.save_image(img_data, img_index + 1, ".pdf", page_number))  # Save the image and append its path
-        
-        # Extract images from a DOCX
-        elif self.file_type == ".docx":
-            for rel in self.doc.part.rels.values():  # Iterate through relationships to find images
-                if "image" in rel.target_ref:
-                    img_data = rel.target_part.blob
-                    images.append(self.save_image(img_data, len(images) + 1, ".docx"))  # Save the image and append its path
-        
-        # Extract images from a PPTX
-        elif self.file_type == ".pptx":
-            for slide_number, slide in enumerate(self.prs.slides):  # Iterate through each slide
-                for shape_index, shape in enumerate(slide.shapes):  # Iterate through shapes
-                    if shape.shape_type == 13:  # Shape type 13 is for images
-                        img_data = shape.image.blob
-                        images.append(self.save_image(img_data, shape_index + 1, ".pptx", slide_number))  # Save the image and append its path
-        
-        return images
+        if metadata_only:
+            return self.extract_image_metadata()
+        return self.walk_pages()['extract_images']
+
+    @cached_result
+    @timed('extract.image_metadata')
+    def extract_image_metadata(self):
+        """
+        Describe every image without decoding pixels or writing files.
+        Text, tables and links are not extracted, so this is much cheaper than a full walk.
+
+        Returns:
+            list: One dict per image with 'page_number', 'index', 'format', 'width', 'height',
+                'bbox' and 'byte_size' keys.
+        """
+        return [describe_image(image) for record in self.walk_images() for image in record.images]
+
+    def walk_images(self):
+        """Walk the document collecting only images (see PageWalker images_only)."""
+        self.open_document()
+        walker = PageWalker(self.content, self.file_type, self.file_loader.file_path, self.workers, images_only=True)
+        return walker.walk()
+
+    def get_image_bytes(self, page_number, index):
+        """
+        Get the encoded bytes of one image, reading only its page for PDFs.
+
+        Args:
+            page_number (int): The page or slide number from the image description (None for DOCX).
+            index (int): The image index from the image description.
+
+        Returns:
+            bytes: The encoded image data, or None if there is no such image.
+        """
+        self.open_document()
+        if self.file_type == '.pdf':
+            records = [extract_pdf_page(self.pdf.pages[page_number - 1], images_only=True)]
+        else:
+            records = self.walk_images()
+        for record in records:
+            for image in record.images:
+                if image['page_number'] == page_number and image['index'] == index:
+                    return image['data']
+        return None
+
+    @timed('image.thumbnails')
+    def generate_thumbnails(self, size=THUMBNAIL_SIZE, workers=4):
+        """
+        Create PNG thumbnails of every image on a thread pool and store them in the image store.
+        Images are read once in document order; decoding and resizing run in parallel.
+
+        Args:
+            size (tuple, optional): The maximum width and height of a thumbnail.
+            workers (int, optional): Number of threads.
+
+        Returns:
+            list: The image descriptions with 'thumbnail_hash' and 'thumbnail_path' added
+                (None when the image could not be decoded).
+        """
+        thumbnails = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for record in self.walk_images():
+                for image in record.images:
+                    thumbnails.append((describe_image(image), executor.submit(make_thumbnail, image['data'], size)))
+        results = []
+        for description, future in thumbnails:
+            thumbnail = future.result()
+            description['thumbnail_hash'], description['thumbnail_path'] = (
+                self.image_store.put(thumbnail, '.png') if thumbnail else (None, None))
+            results.append(description)
+        return results
     
+    @cached_result
+    @timed('extract.metadata')
     def extract_metadata(self):
         """
         Extract metadata from the file.
@@ -122,6 +398,7 @@ class UniversalDataExtractor():
         Returns:
             dict: Extracted metadata.
         """
+        self.open_document()
         # Extract metadata from a PDF
         if self.file_type == ".pdf":
             return self.pdf.metadata
@@ -143,59 +420,37 @@ class UniversalDataExtractor():
         Returns:
             list: List of extracted links.
         """
-        links = []  # List to store extracted links
-        
-        # Extract links from a PDF
-        if self.file_type == ".pdf":
-            for page in self.pdf.pages:
-                links.extend(annot.get("uri") for annot in getattr(page, 'annots', []) if annot.get("uri"))  # Extract links from annotations
-        
-        # Extract links from a DOCX
-        elif self.file_type == ".docx":
-            for rel in self.doc.part.rels.values():
-                if "hyperlink" in rel.reltype:
-                    links.append(rel.target_ref)  # Extract links from DOCX relationships
-        
-        # Extract links from a PPTX
-        elif self.file_type == ".pptx":
-            for slide in self.prs.slides:  # Iterate through slides
-                for shape in slide.shapes:  # Iterate through shapes
-                    if shape.has_text_frame:  # Check if shape contains text
-                        for paragraph in shape.text_frame.paragraphs:  # Iterate through paragraphs
-                            for run in paragraph.runs:  # Iterate through runs
-                                if run.hyperlink:  # Check if the run has a hyperlink
-                                    links.append(run.hyperlink.address)  # Append the hyperlink address
-        
-        return links
+        return self.walk_pages()['extract_links']
     
     def get_file_name(self):
         """Get the file name from the file path."""
         return os.path.basename(self.file_loader.file_path)
     
-    def save_image(self, img_data, index, file_ext, page_number=None):
+    def save_image(self, img_data):
         """
-        Save the extracted image to the output directory and return the image path.
+        Save the extracted image in the content-addressed image store.
+        In 'raw' mode the encoded bytes are written unchanged; in 'png' mode they are transcoded first,
+        or kept raw if PIL cannot decode them. Identical images, within or across documents, are written only once.
         
         Args:
             img_data (bytes): The raw image data.
-            index (int): The image index.
-            file_ext (str): The file extension to create unique names.
-            page_number (int, optional): The page number for PDFs.
         
         Returns:
-            str: The path of the saved image.
+            tuple: The SHA-256 hash of the stored bytes and the path of the saved image.
         """
-        # Create a unique image filename based on the file name, page number (if applicable), and image index
-        img_filename = f"{self.get_file_name().replace(file_ext, '')}_img_{index}.png"
-        if page_number is not None:
-            img_filename = f"{self.get_file_name().replace(file_ext, '')}_page_{page_number + 1}_img_{index}.png"
-        
-        img_path = os.path.join('output', img_filename)  # Set the output path for the image
-        image = Image.open(io.BytesIO(img_data))  # Open the image data using PIL
-        image.save(img_path)  # Save the image to the specified path
-        return img_path  # Return the saved image path
+        if self.image_mode == 'png':
+            try:
+                return self.image_store.put(encode_png(img_data), '.png')  # Decode and re-encode through PIL
+            except OSError as e:  # Includes UnidentifiedImageError
+                print(f"Error transcoding image to PNG, keeping the original bytes: {e}")
+        # Keep the original encoded bytes; the extension comes from the magic bytes
+        extension = sniff_image_format(img_data) or RAW_STREAM_EXTENSION
+        return self.image_store.put(img_data, extension)
     
+    def clear_cache(self):
+        """Drop the cached extraction results so the next extract_* call recomputes them."""
+        self.results.clear()
+
     def close(self):
-        """Close the file if it's a PDF."""
-        if self.file_type == '.pdf':
-            self.pdf.close()  # Close the PDF object
+        """Close the document session owned by the loader."""
+        self.file_loader.close()
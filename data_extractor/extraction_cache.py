@@ -0,0 +1,203 @@
+import os, pickle, tempfile, threading  # Import necessary libraries
+
+# Default size limit of the cache, in bytes
+DEFAULT_CACHE_BYTES = 1024 * 1024 * 1024
+
+# Eviction removes the least recently used entries until the cache is back under this share of its limit
+EVICTION_TARGET = 0.9
+
+# Extension of the cache entries
+CACHE_EXTENSION = '.pickle'
+
+
+# On-disk cache of extraction results, keyed by content hash and a version covering the extractor, engine,
+# image mode and image store (see data_extractor.cache_version).
+# An entry is a file of consecutive pickles: a header dict with the metadata, then one PageRecord per page.
+class ExtractionCache:
+    def __init__(self, root, max_bytes=DEFAULT_CACHE_BYTES):
+        """
+        Initialize the ExtractionCache and measure the entries already stored.
+
+        Args:
+            root (str): The directory holding the sharded cache entries.
+            max_bytes (int, optional): Size limit; the least recently used entries are evicted above it.
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()  # Pipeline writer threads may read while a document is written
+        self.hits = 0  # Documents served from the cache
+        self.misses = 0  # Documents that had to be extracted
+        self.writes = 0  # Entries written
+        self.evictions = 0  # Entries removed to stay under max_bytes
+        self.total_bytes = sum(os.path.getsize(path) for path in self.entry_paths())
+
+    def path_for(self, content_hash, version):
+        """
+        Get the sharded path of an entry, e.g. root/ab/abcd...ef-1.0.pickle.
+
+        Args:
+            content_hash (str): The SHA-256 hash of the document.
+            version (str): The extractor and engine version.
+
+        Returns:
+            str: The path of the entry.
+        """
+        return os.path.join(self.root, content_hash[:2], f"{content_hash}-{version}{CACHE_EXTENSION}")
+
+    def entry_paths(self):
+        """List the paths of every entry in the cache."""
+        if not os.path.isdir(self.root):
+            return []
+        return [os.path.join(folder, name) for folder, _, names in os.walk(self.root)
+                for name in names if name.endswith(CACHE_EXTENSION)]
+
+    def get(self, content_hash, version):
+        """
+        Look up a document and read its header.
+
+        Args:
+            content_hash (str): The SHA-256 hash of the document.
+            version (str): The extractor and engine version.
+
+        Returns:
+            dict: The header ('metadata' key) of the entry, or None on a miss.
+        """
+        path = self.path_for(content_hash, version)
+        try:
+            with open(path, 'rb') as entry:
+                header = pickle.load(entry)
+            os.utime(path)  # Mark the entry as recently used
+        except (OSError, EOFError, pickle.UnpicklingError):
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+        return header
+
+    def open_pages(self, content_hash, version):
+        """
+        Open an entry to stream its PageRecords.
+
+        Args:
+            content_hash (str): The SHA-256 hash of the document.
+            version (str): The extractor and engine version.
+
+        Returns:
+            generator: The PageRecords in page order.
+
+        Raises:
+            FileNotFoundError: If the entry was evicted since get().
+        """
+        try:
+            entry = open(self.path_for(content_hash, version), 'rb')
+        except FileNotFoundError:
+            with self.lock:  # get() counted a hit, but the document is extracted after all
+                self.hits -= 1
+                self.misses += 1
+            raise
+        pickle.load(entry)  # Skip the header
+        return read_pages(entry)
+
+    def writer(self, content_hash, version, header):
+        """
+        Start writing an entry; pages are appended as they are extracted so memory stays bounded.
+
+        Args:
+            content_hash (str): The SHA-256 hash of the document.
+            version (str): The extractor and engine version.
+            header (dict): The document-level results ('metadata').
+
+        Returns:
+            CacheWriter: The writer of the entry.
+        """
+        return CacheWriter(self, self.path_for(content_hash, version), header)
+
+    def added(self, size):
+        """Account for a newly written entry and evict the least recently used entries if the cache is full."""
+        with self.lock:
+            self.writes += 1
+            self.total_bytes += size
+            if self.total_bytes <= self.max_bytes:
+                return
+            entries = []
+            for path in self.entry_paths():
+                try:
+                    entries.append((os.path.getmtime(path), os.path.getsize(path), path))
+                except OSError:
+                    continue  # Removed by another worker
+            self.total_bytes = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):  # Oldest use first
+                if self.total_bytes <= self.max_bytes * EVICTION_TARGET:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                self.total_bytes -= size
+                self.evictions += 1
+
+    def stats(self):
+        """
+        Get the cache statistics.
+
+        Returns:
+            dict: Hits, misses, hit rate, writes, evictions and the current size in bytes.
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'writes': self.writes,
+                'evictions': self.evictions,
+                'bytes': self.total_bytes,
+            }
+
+
+def read_pages(entry):
+    """Yield the pickled PageRecords that follow the header of an open entry, then close it."""
+    with entry:
+        while True:
+            try:
+                yield pickle.load(entry)
+            except EOFError:
+                return
+
+
+# Writes one cache entry to a temporary file that only becomes visible once the whole document is written
+class CacheWriter:
+    def __init__(self, cache, path, header):
+        """
+        Initialize the CacheWriter and write the header.
+
+        Args:
+            cache (ExtractionCache): The cache receiving the entry.
+            path (str): The final path of the entry.
+            header (dict): The document-level results.
+        """
+        self.cache = cache
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        file_descriptor, self.temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        self.file = os.fdopen(file_descriptor, 'wb')
+        pickle.dump(header, self.file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def add_page(self, record):
+        """Append a PageRecord, without its image bytes (they are in the image store) or its timings."""
+        images = [{key: value for key, value in image.items() if key != 'data'} for image in record.images]
+        cached = type(record)(record.page_number, record.text, record.tables, images, record.links,
+                              table_boxes=record.table_boxes)
+        pickle.dump(cached, self.file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def finish(self):
+        """Publish the entry under its final name."""
+        self.file.close()
+        os.replace(self.temp_path, self.path)  # Atomic; concurrent workers writing the same entry is harmless
+        self.cache.added(os.path.getsize(self.path))
+
+    def abort(self):
+        """Drop an entry whose document was not walked to the end."""
+        self.file.close()
+        os.remove(self.temp_path)
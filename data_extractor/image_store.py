@@ -0,0 +1,57 @@
+import os, hashlib, tempfile  # Import necessary libraries
+
+
+# Content-addressed image store: every unique image is written once, under its SHA-256 hash
+class ImageStore:
+    def __init__(self, root):
+        """
+        Initialize the ImageStore.
+
+        Args:
+            root (str): The directory holding the sharded image tree.
+        """
+        self.root = root
+        self.written = 0  # Images written by this store
+        self.deduplicated = 0  # Images skipped because the same bytes were already stored
+        self.bytes_written = 0
+
+    def path_for(self, content_hash, extension):
+        """
+        Get the sharded path of an image, e.g. root/ab/cd/abcd...ef.jpg.
+
+        Args:
+            content_hash (str): The SHA-256 hex digest of the image bytes.
+            extension (str): The file extension including the dot.
+
+        Returns:
+            str: The path of the image in the store.
+        """
+        return os.path.join(self.root, content_hash[:2], content_hash[2:4], content_hash + extension)
+
+    def put(self, data, extension):
+        """
+        Store image bytes under their content hash, writing them only if they are not stored yet.
+        The file is written to a temporary name and renamed, so concurrent workers never see partial files.
+
+        Args:
+            data (bytes): The encoded image bytes.
+            extension (str): The file extension including the dot.
+
+        Returns:
+            tuple: The content hash and the path of the stored image.
+        """
+        content_hash = hashlib.sha256(data).hexdigest()
+        path = self.path_for(content_hash, extension)
+        if os.path.exists(path):
+            self.deduplicated += 1
+            return content_hash, path
+
+        folder = os.path.dirname(path)
+        os.makedirs(folder, exist_ok=True)
+        file_descriptor, temp_path = tempfile.mkstemp(dir=folder, suffix='.tmp')
+        with os.fdopen(file_descriptor, 'wb') as image_file:
+            image_file.write(data)
+        os.replace(temp_path, path)  # Atomic; another worker writing the same bytes is harmless
+        self.written += 1
+        self.bytes_written += len(data)
+        return content_hash, path
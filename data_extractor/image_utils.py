@@ -0,0 +1,136 @@
+import io, os  # For byte streams and file paths
+from concurrent.futures import ThreadPoolExecutor  # For transcoding images in parallel
+from PIL import Image  # Import PIL to transcode images
+
+# Magic byte prefixes of the image formats embedded in PDF, DOCX and PPTX files
+IMAGE_SIGNATURES = [
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+    (b'GIF87a', '.gif'),
+    (b'GIF89a', '.gif'),
+    (b'II*\x00', '.tiff'),
+    (b'MM\x00*', '.tiff'),
+    (b'\x00\x00\x00\x0cjP  \r\n\x87\n', '.jp2'),
+    (b'\xff\x4f\xff\x51', '.j2k'),
+    (b'\xd7\xcd\xc6\x9a', '.wmf'),
+    (b'BM', '.bmp'),
+]
+
+# Extension used when the bytes are not a standalone image file (e.g. a Flate-compressed PDF pixel stream)
+RAW_STREAM_EXTENSION = '.bin'
+
+
+def sniff_image_format(data):
+    """
+    Detect the image format from the first bytes of the data, without decoding it.
+
+    Args:
+        data (bytes): The encoded image data.
+
+    Returns:
+        str: The file extension including the dot (e.g., '.jpg'), or None if the format is unknown.
+    """
+    for signature, extension in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return extension
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return '.webp'
+    if data[40:44] == b' EMF':
+        return '.emf'
+    return None
+
+
+def image_size(data):
+    """
+    Read the pixel size of an image from its header without decoding the pixels.
+
+    Args:
+        data (bytes): The encoded image data.
+
+    Returns:
+        tuple: The width and height, or (None, None) if the format is not readable.
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as image:  # PIL only parses the header until pixels are accessed
+            return image.size
+    except OSError:
+        return None, None
+
+
+def make_thumbnail(data, size):
+    """
+    Decode an image at reduced scale and encode a PNG thumbnail of it.
+
+    Args:
+        data (bytes): The encoded image data.
+        size (tuple): The maximum width and height of the thumbnail.
+
+    Returns:
+        bytes: The PNG thumbnail, or None if PIL cannot decode the image.
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.draft('RGB', size)  # JPEGs are decoded directly at a reduced scale
+            image.thumbnail(size)
+            output = io.BytesIO()
+            image.save(output, format='PNG')
+            return output.getvalue()
+    except OSError as e:
+        print(f"Error creating thumbnail: {e}")
+        return None
+
+
+def transcode_to_png(image_path):
+    """
+    Decode a saved image and write it next to the original as PNG.
+
+    Args:
+        image_path (str): The path of the saved image.
+
+    Returns:
+        str: The path of the PNG file, or None if PIL cannot decode the image.
+    """
+    png_path = os.path.splitext(image_path)[0] + '.png'
+    if png_path == image_path:
+        return image_path  # Already a PNG
+    try:
+        with Image.open(image_path) as image:
+            image.save(png_path)
+    except OSError as e:
+        print(f"Error transcoding image {image_path}: {e}")
+        return None
+    return png_path
+
+
+def transcode_images(image_paths, workers=4):
+    """
+    Transcode saved images to PNG on a thread pool (PIL releases the GIL while decoding and encoding).
+
+    Args:
+        image_paths (list): The paths of the saved images.
+        workers (int, optional): Number of threads.
+
+    Returns:
+        list: The PNG paths in the same order (None where transcoding failed).
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(transcode_to_png, image_paths))
+
+
+def encode_png(img_data):
+    """
+    Decode image bytes with PIL and re-encode them as PNG.
+
+    Args:
+        img_data (bytes): The encoded image data.
+
+    Returns:
+        bytes: The PNG data.
+
+    Raises:
+        OSError: If PIL cannot decode the image (PIL.UnidentifiedImageError is an OSError).
+    """
+    output = io.BytesIO()
+    with Image.open(io.BytesIO(img_data)) as image:
+        image.save(output, format='PNG')
+    return output.getvalue()
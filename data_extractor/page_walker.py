@@ -0,0 +1,234 @@
+from concurrent.futures import ProcessPoolExecutor  # For parallel PDF extraction
+import pdfplumber  # Each worker process opens its own PDF handle
+import pypdfium2  # Fast text engine (installed with pdfplumber)
+from docx.opc.constants import RELATIONSHIP_TYPE as RT  # Image and hyperlink relationship types
+from data_extractor.image_utils import image_size  # Reads image dimensions from the header only
+from instrumentation.stage_metrics import measure_into  # Per-stage timing of each page
+
+# Shape type 13 is a picture in python-pptx
+PICTURE_SHAPE_TYPE = 13
+
+# Number of page ranges handed to each worker, so uneven pages are balanced across the pool
+CHUNKS_PER_WORKER = 4
+
+
+# Everything extracted from a single page (PDF), slide (PPTX) or document body (DOCX)
+class PageRecord:
+    def __init__(self, page_number, text="", tables=None, images=None, links=None, stages=None, table_boxes=None):
+        """
+        Initialize the PageRecord for one page or slide.
+
+        Args:
+            page_number (int): The 1-based page or slide number.
+            text (str): The text extracted from the page.
+            tables (list): The tables found on the page, each a list of rows.
+            images (list): The images found on the page as dicts with 'index', 'page_number', 'data',
+                'width', 'height' and 'bbox' keys. 'bbox' is (x0, top, x1, bottom) in PDF points or
+                PPTX EMUs, None for DOCX.
+            links (list): The hyperlinks found on the page.
+            stages (dict): Time spent in each extraction stage of the page (see instrumentation.stage_metrics).
+            table_boxes (list): The (x0, top, x1, bottom) bounding box of each table in PDF points,
+                in the order of tables; empty when the format has no table positions.
+        """
+        self.page_number = page_number
+        self.text = text
+        self.tables = tables or []
+        self.images = images or []
+        self.links = links or []
+        self.stages = stages or {}
+        self.table_boxes = table_boxes or []
+
+
+# Single-pass walker that visits every page or slide once and extracts all artifacts together
+class PageWalker:
+    def __init__(self, document, file_type, file_path=None, workers=1, images_only=False, engine='layout'):
+        """
+        Initialize the PageWalker with a parsed document.
+
+        Args:
+            document: The parsed document (pdfplumber PDF, docx Document or pptx Presentation).
+            file_type (str): The file extension including the dot (e.g., '.pdf', '.docx', '.pptx').
+            file_path (str, optional): The path of the file, needed for parallel PDF extraction.
+            workers (int, optional): Number of worker processes for PDF pages; 1 keeps extraction serial.
+            images_only (bool, optional): Only collect images, skipping text, tables and links.
+            engine (str, optional): 'layout' extracts everything with pdfplumber; 'fast' extracts only the
+                text (with PDFium) and links of PDFs, without tables or images.
+        """
+        self.document = document
+        self.file_type = file_type
+        self.file_path = file_path
+        self.workers = workers
+        self.images_only = images_only
+        self.engine = engine
+
+    def walk(self):
+        """
+        Visit each page or slide once and yield a PageRecord for it.
+
+        Yields:
+            PageRecord: The text, tables, images and links of the page.
+        """
+        walkers = {
+            '.pdf': self.walk_pdf,
+            '.docx': self.walk_docx,
+            '.pptx': self.walk_pptx,
+        }
+        walker = walkers.get(self.file_type)
+        if walker is None:
+            return  # Unsupported file type, nothing to yield
+        yield from walker()
+
+    def walk_pdf(self):
+        """Yield one PageRecord per PDF page, releasing each page's layout cache once it is processed."""
+        if self.engine == 'fast' and not self.images_only:
+            yield from self.walk_pdf_fast()
+            return
+        page_count = len(self.document.pages)
+        if self.workers > 1 and self.file_path and page_count > 1:
+            yield from self.walk_pdf_parallel(page_count)
+            return
+        for page in self.document.pages:
+            yield extract_pdf_page(page, self.images_only)
+
+    def walk_pdf_fast(self):
+        """
+        Yield one text-only PageRecord per PDF page. PDFium extracts the text without pdfplumber's
+        character-level layout model; links come from the page annotations, which need no layout either.
+        """
+        pdf = pypdfium2.PdfDocument(self.file_path)
+        try:
+            for page_index, page in enumerate(self.document.pages):
+                stages = {}
+                with measure_into(stages, 'pdfium.text') as counts:
+                    pdfium_page = pdf[page_index]
+                    text_page = pdfium_page.get_textpage()
+                    text = text_page.get_text_range().replace("\r\n", "\n")  # PDFium ends lines with CRLF
+                    text_page.close()
+                    pdfium_page.close()
+                    counts['bytes'] = len(text)
+                with measure_into(stages, 'pdf.links') as counts:
+                    links = [annot.get("uri") for annot in page.annots if annot.get("uri")]
+                    counts['items'] = len(links)
+                page.close()
+                yield PageRecord(page.page_number, text, links=links, stages=stages)
+        finally:
+            pdf.close()
+
+    def walk_pdf_parallel(self, page_count):
+        """
+        Split the page range across worker processes, each with its own pdfplumber handle,
+        and yield the PageRecords back in page order so the output matches the serial walk.
+
+        Args:
+            page_count (int): The number of pages in the PDF.
+        """
+        workers = min(self.workers, page_count)
+        chunk_size = max(1, -(-page_count // (workers * CHUNKS_PER_WORKER)))  # Ceiling division
+        ranges = [(start, min(start + chunk_size, page_count)) for start in range(0, page_count, chunk_size)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map() returns the chunks in submission order, i.e. page order
+            starts, stops = zip(*ranges)
+            for records in executor.map(extract_pdf_page_range, [self.file_path] * len(ranges), starts, stops,
+                                        [self.images_only] * len(ranges)):
+                yield from records
+
+    def walk_docx(self):
+        """Yield a single PageRecord for the DOCX body, which has no fixed pages."""
+        document = self.document
+        text, tables = "", []
+        if not self.images_only:
+            text = "\n".join(para.text for para in document.paragraphs)  # Extract text from DOCX paragraphs
+            tables = [[[cell.text for cell in row.cells] for row in table.rows] for table in document.tables]
+        images = []
+        links = []
+        for rel in document.part.rels.values():  # Relationships hold both images and hyperlinks
+            if not rel.is_external and rel.reltype == RT.IMAGE:  # External targets have no part to read
+                data = rel.target_part.blob
+                width, height = image_size(data)
+                images.append({'index': len(images) + 1, 'page_number': None, 'data': data,
+                               'width': width, 'height': height, 'bbox': None})
+            elif rel.reltype == RT.HYPERLINK and not self.images_only:
+                links.append(rel.target_ref)
+        yield PageRecord(1, text, tables, images, links)
+
+    def walk_pptx(self):
+        """Yield one PageRecord per PPTX slide."""
+        for slide_index, slide in enumerate(self.document.slides):
+            texts = []
+            images = []
+            links = []
+            for shape_index, shape in enumerate(slide.shapes):
+                if shape.shape_type == PICTURE_SHAPE_TYPE:
+                    width, height = shape.image.size  # Pixel size read from the image header
+                    images.append({'index': shape_index + 1, 'page_number': slide_index + 1, 'data': shape.image.blob,
+                                   'width': width, 'height': height,
+                                   'bbox': (shape.left, shape.top, shape.left + shape.width, shape.top + shape.height)})
+                if self.images_only:
+                    continue
+                if hasattr(shape, "text"):  # Check if the shape has text
+                    texts.append(shape.text)
+                if shape.has_text_frame:
+                    for paragraph in shape.text_frame.paragraphs:
+                        for run in paragraph.runs:
+                            if run.hyperlink.address:  # Only keep runs that link somewhere
+                                links.append(run.hyperlink.address)
+            yield PageRecord(slide_index + 1, "\n".join(texts), [], images, links)
+
+
+def extract_pdf_page(page, images_only=False):
+    """
+    Extract text, tables, images and links from a pdfplumber page in one visit
+    and release the page's layout cache afterwards.
+
+    Args:
+        page: A pdfplumber Page object.
+        images_only (bool, optional): Only collect images, skipping the text and table layout analysis.
+
+    Returns:
+        PageRecord: The artifacts found on the page.
+    """
+    stages = {}  # Timed here, so pages extracted in worker processes report their stages too
+    try:
+        images = []
+        with measure_into(stages, 'pdf.images') as counts:
+            for img_index, img in enumerate(page.images):  # Iterate through images in the page
+                if 'stream' in img:  # Check if image has raw data stream
+                    width, height = img.get('srcsize') or (None, None)  # Size from the image dictionary, no decoding
+                    images.append({'index': img_index + 1, 'page_number': page.page_number, 'data': img['stream'].get_rawdata(),
+                                   'width': width, 'height': height,
+                                   'bbox': (img['x0'], img['top'], img['x1'], img['bottom'])})
+            counts['items'] = len(images)
+            counts['bytes'] = sum(len(image['data']) for image in images)
+        if images_only:
+            return PageRecord(page.page_number, images=images, stages=stages)
+        with measure_into(stages, 'pdf.text') as counts:  # Includes the layout analysis of the page
+            text = page.extract_text() or ""
+            counts['bytes'] = len(text)
+        with measure_into(stages, 'pdf.tables') as counts:
+            found = page.find_tables()  # Same tables as extract_tables(), with their positions
+            tables = [table.extract() for table in found]
+            table_boxes = [tuple(table.bbox) for table in found]
+            counts['items'] = len(tables)
+        with measure_into(stages, 'pdf.links') as counts:
+            links = [annot.get("uri") for annot in getattr(page, 'annots', []) if annot.get("uri")]
+            counts['items'] = len(links)
+        return PageRecord(page.page_number, text, tables, images, links, stages, table_boxes)
+    finally:
+        page.close()  # Drop the cached layout objects of this page
+
+
+def extract_pdf_page_range(file_path, start, stop, images_only=False):
+    """
+    Worker entry point: open the PDF and extract pages start..stop-1 (0-based).
+
+    Args:
+        file_path (str): The path of the PDF file.
+        start (int): The index of the first page to extract.
+        stop (int): The index after the last page to extract.
+        images_only (bool, optional): Only collect images.
+
+    Returns:
+        list: The PageRecords of the pages in page order.
+    """
+    with pdfplumber.open(file_path, pages=list(range(start + 1, stop + 1))) as pdf:
+        return [extract_pdf_page(page, images_only) for page in pdf.pages]
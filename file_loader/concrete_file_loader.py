@@ -3,6 +3,16 @@ from docx import Document  # Library for handling Word documents
 from pptx import Presentation  # Library for handling PowerPoint presentations
 from abc import ABC, abstractmethod  # For creating an abstract base class
 import os  # For file handling operations
+import hashlib  # For hashing file contents
+from file_loader.document_session import DocumentSession  # Owns the parsed document for a file
+from file_loader.file_sniffer import sniff_file_type  # Detects the file type from the first bytes
+from file_loader.document_probe import is_encrypted_package, probe_document, probe_result  # Cheap document statistics
+
+# File types (extensions without the dot) that can be loaded
+SUPPORTED_FILE_TYPES = ['pdf', 'docx', 'pptx']
+
+# Size of the blocks read when hashing a file
+HASH_CHUNK_SIZE = 1024 * 1024
 
 # Abstract class FileLoader
 class FileLoader(ABC):
@@ -17,7 +27,49 @@ class FileLoader(ABC):
         self.file_path = file_path  # Store the file path
         self.file_type = file_type  # Extracts the file extension (e.g., 'pdf', 'docx', 'pptx')
         self.file = None  # Will store the file object after loading
+        self.session = None  # Document session that parses the file once
+        self.hash = None  # SHA-256 of the file contents, computed on first use
  
+    def content_hash(self):
+        """
+        Compute the SHA-256 hash of the file contents, reading it in blocks.
+        The hash identifies the document independently of its name or location.
+
+        Returns:
+            str: The hex digest of the file contents.
+        """
+        if self.hash is None:
+            digest = hashlib.sha256()
+            with open(self.file_path, 'rb') as file:
+                for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+            self.hash = digest.hexdigest()
+        return self.hash
+
+    def probe(self, count_images=True):
+        """
+        Get the page or slide count, image count and encryption status of the file without parsing it.
+        Pages come from the PDF cross-reference table and page tree, or the DOCX/PPTX package manifest.
+        DOCX/PPTX images are counted from the manifest; the PDF image count is an estimate from a scan
+        of the file bytes.
+
+        Args:
+            count_images (bool, optional): Scan PDFs for their images; their image count is None otherwise.
+
+        Returns:
+            dict: 'file_type', 'bytes', 'pages' (None when unknown, e.g. for DOCX files not saved by Word),
+                'images' (None when unknown) and 'encrypted'.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            ValueError: If the file type is unsupported or the file is truncated or damaged.
+        """
+        if os.path.exists(self.file_path) and is_encrypted_package(self.file_path):
+            # Password-protected DOCX/PPTX files have no readable manifest; trust the extension
+            return probe_result(self.file_type.lower(), os.path.getsize(self.file_path), encrypted=True)
+        self.validate_file()
+        return probe_document(self.file_path, self.file_type, count_images)
+
     @abstractmethod
     def load_file(self):
         """
@@ -28,18 +80,28 @@ class FileLoader(ABC):
  
     def validate_file(self):
         """
-        Validate the file by checking if it exists and is of a supported type.
+        Validate the file by checking if it exists and its contents are of a supported type.
+        The type is sniffed from the file signature before any parser runs; a file whose
+        extension does not match its contents is read with the reader of its actual type.
         
         Raises:
             FileNotFoundError: If the file does not exist.
-            ValueError: If the file type is unsupported.
+            ValueError: If the file type is unsupported or the file is truncated or damaged.
         """
         if not os.path.exists(self.file_path):
             # Check if the file exists at the specified path
             raise FileNotFoundError(f"File does not exist: {self.file_path}")
-        if self.file_type not in ['pdf', 'docx', 'pptx']:
-            # Ensure the file type is one of the supported types
-            raise ValueError(f"Unsupported file type: {self.file_type}. Only PDF, DOCX, and PPTX are supported.")
+        detected_type = sniff_file_type(self.file_path)  # Raises ValueError for damaged files
+        if detected_type is None:
+            if is_encrypted_package(self.file_path):
+                raise ValueError(f"Encrypted file: {self.file_path} is password-protected and cannot be read.")
+            if self.file_type.lower() not in SUPPORTED_FILE_TYPES:
+                # Ensure the file type is one of the supported types
+                raise ValueError(f"Unsupported file type: {self.file_type}. Only PDF, DOCX, and PPTX are supported.")
+            raise ValueError(f"Invalid {self.file_type.upper()} file: {self.file_path} is not a PDF, DOCX or PPTX document.")
+        if detected_type != self.file_type.lower():
+            print(f"{os.path.basename(self.file_path)} is a {detected_type.upper()} file; reading it as {detected_type.upper()}.")
+        self.file_type = detected_type
 
 # Concrete Loader class that handles loading of files
 class Loader(FileLoader):
@@ -53,15 +115,30 @@ class Loader(FileLoader):
     def load_file(self):
         """
         Load the file based on the file type after validation.
+        The file is parsed only once; later calls reuse the same document session.
         
+        Returns:
+            object: The parsed document.
+
         Raises:
             ValueError: If there's an error loading the file.
         """
+        if self.session is not None and self.session.document is not None:
+            return self.file  # Already parsed, reuse the open document
+
         self.validate_file()  # First validate the file (check existence and type)
  
+        # Create the session using the appropriate reader from the file_reader dictionary
+        self.session = DocumentSession(self.file_path, self.file_type, self.file_reader[self.file_type])
         try:
-            # Load the file using the appropriate method from the file_reader dictionary
-            self.file = self.file_reader[self.file_type](self.file_path)
+            self.file = self.session.open()
         except Exception as e:
             # Raise an error if there's an issue loading the file
             raise ValueError(f"Error loading file: {e}")
+        return self.file
+
+    def close(self):
+        """Close the document session and release the parsed file."""
+        if self.session is not None:
+            self.session.close()
+        self.file = None
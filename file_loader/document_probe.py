@@ -0,0 +1,153 @@
+import mmap  # Scans PDFs for image objects without reading them into memory
+import os  # For the file size
+import re  # Finds image objects and the page count of DOCX packages
+import zipfile  # Reads the manifest (central directory) of DOCX/PPTX packages
+import pypdfium2  # Reads the PDF cross-reference table and page tree only (installed with pdfplumber)
+
+# Image XObjects in the raw PDF bytes. Streams are never stored in object streams, so every image
+# dictionary is visible without decompressing anything; each image is counted once however often it is drawn
+PDF_IMAGE_PATTERN = re.compile(rb'/Subtype\s*/Image\b')
+
+# Soft mask references; the mask is an image XObject of its own and is not counted as an image
+PDF_SMASK_PATTERN = re.compile(rb'/SMask\s+\d+\s+\d+\s+R\b')
+
+# Slides of a PPTX package
+SLIDE_PART_PATTERN = re.compile(r'ppt/slides/slide\d+\.xml')
+
+# Folder holding the media parts of DOCX and PPTX packages (word/media/, ppt/media/ or media/)
+MEDIA_FOLDER = 'media'
+
+# Extensions of the media parts that are images (media folders also hold audio and video)
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.jfif', '.gif', '.bmp', '.tif', '.tiff', '.emf', '.wmf', '.svg', '.webp'}
+
+# Page count saved by Word in the extended properties of a DOCX package
+DOCX_PAGES_PATTERN = re.compile(rb'<(?:\w+:)?Pages>(\d+)</')
+
+# Compound File Binary signature; password-protected DOCX/PPTX files are CFB files, not ZIP packages
+CFB_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+# Stream holding the encrypted package inside a CFB file, as a UTF-16 directory entry name
+ENCRYPTED_PACKAGE_NAME = 'EncryptedPackage'.encode('utf-16-le')
+
+# Bytes of the CFB directory searched for the encrypted package entry
+CFB_DIRECTORY_BYTES = 4096
+
+
+def probe_result(file_type, size, pages=None, images=None, encrypted=False):
+    """Build the dict returned by probe_document."""
+    return {'file_type': file_type, 'bytes': size, 'pages': pages, 'images': images, 'encrypted': encrypted}
+
+
+def probe_document(file_path, file_type, count_images=True):
+    """
+    Count the pages or slides and the images of a document, and check whether it is encrypted,
+    without parsing its contents.
+
+    Args:
+        file_path (str): The path of the document.
+        file_type (str): Its type, 'pdf', 'docx' or 'pptx' (see file_sniffer.sniff_file_type).
+        count_images (bool, optional): Count the images of a PDF, which reads the whole file
+            (see count_pdf_images). DOCX/PPTX images are always counted from the manifest.
+
+    Returns:
+        dict: 'file_type', 'bytes', 'pages' (pages or slides, None when unknown), 'images'
+            (embedded images, None when unknown or not counted) and 'encrypted'.
+    """
+    if file_type == 'pdf':
+        return probe_pdf(file_path, count_images)
+    return probe_ooxml(file_path, file_type)
+
+
+def probe_pdf(file_path, count_images=True):
+    """
+    Probe a PDF: PDFium reads the cross-reference table, trailer and page tree but no page content.
+    The image count is an estimate from a scan of the whole file (see count_pdf_images).
+
+    Args:
+        file_path (str): The path of the PDF.
+        count_images (bool, optional): Scan the file for images; the image count is None otherwise.
+
+    Returns:
+        dict: See probe_document. The page count is None when the PDF needs a password to open.
+    """
+    size = os.path.getsize(file_path)
+    images = count_pdf_images(file_path) if count_images else None
+    try:
+        pdf = pypdfium2.PdfDocument(file_path)
+    except pypdfium2.PdfiumError:
+        return probe_result('pdf', size, images=images, encrypted=True)  # Needs a user password
+    try:
+        pages = len(pdf)
+        encrypted = pypdfium2.raw.FPDF_GetSecurityHandlerRevision(pdf.raw) != -1  # -1: no security handler
+    finally:
+        pdf.close()
+    return probe_result('pdf', size, pages, images, encrypted)
+
+
+def count_pdf_images(file_path):
+    """
+    Estimate the number of images of a PDF by scanning all of its bytes for image XObjects, minus
+    the soft masks they reference. This reads the whole file, not just the trailer and cross-reference
+    table, and it still counts images superseded by incremental updates; it is meant for cost estimates only.
+
+    Args:
+        file_path (str): The path of the PDF.
+
+    Returns:
+        int: The estimated image count.
+    """
+    if os.path.getsize(file_path) == 0:
+        return 0
+    with open(file_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        images = sum(1 for _ in PDF_IMAGE_PATTERN.finditer(data))
+        masks = sum(1 for _ in PDF_SMASK_PATTERN.finditer(data))
+    return max(0, images - masks)
+
+
+def probe_ooxml(file_path, file_type):
+    """
+    Probe a DOCX or PPTX package from its manifest: slides and images are counted from the part names
+    in the ZIP central directory. DOCX pages come from the count Word saves in docProps/app.xml.
+
+    Args:
+        file_path (str): The path of the package.
+        file_type (str): 'docx' or 'pptx'.
+
+    Returns:
+        dict: See probe_document.
+    """
+    size = os.path.getsize(file_path)
+    if is_encrypted_package(file_path):
+        return probe_result(file_type, size, encrypted=True)
+    with zipfile.ZipFile(file_path) as package:
+        names = package.namelist()
+        images = sum(1 for name in names
+                     if MEDIA_FOLDER in name.split('/')[:-1] and os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS)
+        if file_type == 'pptx':
+            pages = sum(1 for name in names if SLIDE_PART_PATTERN.fullmatch(name))
+        else:
+            pages = None
+            if 'docProps/app.xml' in package.NameToInfo:
+                match = DOCX_PAGES_PATTERN.search(package.read('docProps/app.xml'))
+                pages = int(match.group(1)) if match else None
+    return probe_result(file_type, size, pages, images)
+
+
+def is_encrypted_package(file_path):
+    """
+    Check whether a file is a password-protected DOCX/PPTX: a CFB file with an EncryptedPackage stream.
+
+    Args:
+        file_path (str): The path of the file.
+
+    Returns:
+        bool: True for an encrypted Office Open XML package.
+    """
+    with open(file_path, 'rb') as file:
+        header = file.read(512)
+        if not header.startswith(CFB_SIGNATURE):
+            return False
+        sector_size = 1 << int.from_bytes(header[30:32], 'little')
+        first_directory_sector = int.from_bytes(header[48:52], 'little')
+        file.seek((first_directory_sector + 1) * sector_size)  # Sectors are numbered after the header sector
+        return ENCRYPTED_PACKAGE_NAME in file.read(CFB_DIRECTORY_BYTES)
@@ -0,0 +1,42 @@
+import os  # For file handling operations
+
+
+# Document session that owns the parsed document for a single file
+class DocumentSession:
+    def __init__(self, file_path, file_type, reader):
+        """
+        Initialize the DocumentSession for a file.
+
+        Args:
+            file_path (str): The path to the file to be parsed.
+            file_type (str): The file type (extension) of the file (e.g., 'pdf', 'docx', 'pptx').
+            reader (callable): The function used to parse the file (e.g., pdfplumber.open).
+        """
+        self.file_path = file_path  # Store the file path
+        self.file_type = file_type  # Store the file type
+        self.reader = reader  # Parser used to open the file
+        self.document = None  # Parsed document, created on first open
+        self.parse_count = 0  # Number of times the file has been parsed
+
+    def open(self):
+        """
+        Parse the file on first use and return the parsed document.
+        Later calls return the same document without parsing the file again.
+
+        Returns:
+            object: The parsed document (pdfplumber PDF, docx Document or pptx Presentation).
+        """
+        if self.document is None:
+            self.document = self.reader(self.file_path)  # Parse the file only once
+            self.parse_count += 1
+        return self.document
+
+    def get_file_name(self):
+        """Get the file name from the file path."""
+        return os.path.basename(self.file_path)
+
+    def close(self):
+        """Release the parsed document (PDF handles hold an open file)."""
+        if self.document is not None and hasattr(self.document, 'close'):
+            self.document.close()  # Close the PDF object
+        self.document = None
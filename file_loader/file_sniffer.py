@@ -0,0 +1,81 @@
+import os  # For the file size
+import zipfile  # Reads the central directory of DOCX/PPTX packages
+import zlib  # Raised when a compressed part is damaged
+
+# Bytes read from the start of a file to check its signature
+SNIFF_BYTES = 1024
+
+# Bytes read from the end of a PDF to find its end-of-file marker. Readers only expect it within the last
+# 1024 bytes, but real files often carry padding or appended data after it
+PDF_EOF_SEARCH_BYTES = 1024 * 1024
+
+# PDF header; readers accept it anywhere in the first 1024 bytes
+PDF_SIGNATURE = b'%PDF-'
+
+# End-of-file marker every complete PDF ends with
+PDF_EOF_MARKER = b'%%EOF'
+
+# Local file header signature that starts every ZIP archive, including DOCX and PPTX packages
+ZIP_SIGNATURE = b'PK\x03\x04'
+
+# Part listing the content types of an Office Open XML package
+CONTENT_TYPES_PART = '[Content_Types].xml'
+
+# Content types of the main part of each supported package
+OOXML_MAIN_CONTENT_TYPES = {
+    'docx': [b'wordprocessingml.document.main+xml'],
+    'pptx': [b'presentationml.presentation.main+xml', b'presentationml.slideshow.main+xml'],
+}
+
+
+def sniff_file_type(file_path):
+    """
+    Detect the type of a file from its contents, without parsing it.
+    PDFs are recognized by their header and checked for the end-of-file marker; DOCX and PPTX
+    packages by the main content type listed in the [Content_Types].xml of the ZIP central directory.
+
+    Args:
+        file_path (str): The path of the file.
+
+    Returns:
+        str: 'pdf', 'docx' or 'pptx', or None if the contents are none of these.
+
+    Raises:
+        ValueError: If the file is a PDF or ZIP package that is truncated or damaged.
+    """
+    with open(file_path, 'rb') as file:
+        header = file.read(SNIFF_BYTES)
+        if PDF_SIGNATURE in header:
+            file.seek(max(0, os.path.getsize(file_path) - PDF_EOF_SEARCH_BYTES))
+            if PDF_EOF_MARKER not in file.read():
+                raise ValueError(f"Corrupt PDF file: {file_path} is truncated (no %%EOF marker).")
+            return 'pdf'
+    if not header.startswith(ZIP_SIGNATURE):
+        return None
+    return sniff_ooxml_type(file_path)
+
+
+def sniff_ooxml_type(file_path):
+    """
+    Detect whether a ZIP archive is a DOCX or PPTX package.
+
+    Args:
+        file_path (str): The path of the ZIP archive.
+
+    Returns:
+        str: 'docx' or 'pptx', or None for other ZIP archives.
+
+    Raises:
+        ValueError: If the central directory or the content types part cannot be read.
+    """
+    try:
+        with zipfile.ZipFile(file_path) as package:  # Only reads the central directory at the end of the file
+            if CONTENT_TYPES_PART not in package.NameToInfo:
+                return None  # A ZIP archive, but not an Office Open XML package
+            content_types = package.read(CONTENT_TYPES_PART)
+    except (zipfile.BadZipFile, zlib.error, OSError, EOFError) as e:
+        raise ValueError(f"Corrupt ZIP package: {file_path} ({e}).")
+    for file_type, main_types in OOXML_MAIN_CONTENT_TYPES.items():
+        if any(main_type in content_types for main_type in main_types):
+            return file_type
+    return None
@@ -0,0 +1,217 @@
+import os, json, time, threading, cProfile  # Import necessary libraries
+from contextlib import contextmanager  # For the measure() blocks
+
+try:
+    import pyinstrument  # Optional: statistical profiler with HTML reports
+except ImportError:
+    pyinstrument = None
+
+# Profilers that can wrap a document
+PROFILERS = ['cprofile', 'pyinstrument']
+
+# Counters kept for every stage
+STAGE_FIELDS = ['calls', 'wall_seconds', 'cpu_seconds', 'bytes', 'items']
+
+# Help text of the exported Prometheus metrics, keyed by stage field
+PROMETHEUS_HELP = {
+    'calls': "Number of times the stage ran",
+    'wall_seconds': "Wall-clock time spent in the stage",
+    'cpu_seconds': "CPU time of the thread running the stage",
+    'bytes': "Bytes handled by the stage",
+    'items': "Items (pages, rows, tables, images, links) handled by the stage",
+}
+
+
+def start_timer():
+    """Return the current wall-clock and thread CPU time, to be passed to add_stage."""
+    return time.perf_counter(), time.thread_time()
+
+
+def add_stage(stages, stage, started, items=0, size=0):
+    """
+    Add one run of a stage to a plain dict of stage counters.
+    Plain dicts can be returned from worker processes, e.g. inside a PageRecord.
+
+    Args:
+        stages (dict): The stage counters, keyed by stage name.
+        stage (str): The stage name, e.g. 'pdf.tables' or 'storage.SQLStorage.store_page'.
+        started (tuple): The value of start_timer() when the stage began.
+        items (int, optional): Items handled by the stage.
+        size (int, optional): Bytes handled by the stage.
+    """
+    wall_start, cpu_start = started
+    counters = stages.setdefault(stage, dict.fromkeys(STAGE_FIELDS, 0))
+    counters['calls'] += 1
+    counters['wall_seconds'] += time.perf_counter() - wall_start
+    counters['cpu_seconds'] += time.thread_time() - cpu_start
+    counters['bytes'] += size
+    counters['items'] += items
+
+
+@contextmanager
+def measure_into(stages, stage):
+    """
+    Time the block as one run of a stage in a plain dict of stage counters.
+    The block may set 'items' and 'bytes' on the yielded dict.
+    """
+    counts = {'items': 0, 'bytes': 0}
+    started = start_timer()
+    try:
+        yield counts
+    finally:
+        add_stage(stages, stage, started, counts['items'], counts['bytes'])
+
+
+@contextmanager
+def measure(metrics, stage):
+    """
+    Time the block as one run of a stage in a StageMetrics, or do nothing when metrics is None.
+    The block may set 'items' and 'bytes' on the yielded dict.
+    """
+    counts = {'items': 0, 'bytes': 0}
+    started = start_timer()
+    try:
+        yield counts
+    finally:
+        if metrics is not None:
+            metrics.record(stage, started, counts['items'], counts['bytes'])
+
+
+# Thread-safe wall time, CPU time, byte and item counters per pipeline stage
+class StageMetrics:
+    def __init__(self):
+        """Initialize an empty set of stage counters."""
+        self.stages = {}  # Stage name -> counters, see STAGE_FIELDS
+        self.lock = threading.Lock()  # Storage writer threads record concurrently
+
+    def record(self, stage, started, items=0, size=0):
+        """
+        Record one run of a stage.
+
+        Args:
+            stage (str): The stage name.
+            started (tuple): The value of start_timer() when the stage began.
+            items (int, optional): Items handled by the stage.
+            size (int, optional): Bytes handled by the stage.
+        """
+        with self.lock:
+            add_stage(self.stages, stage, started, items, size)
+
+    def merge(self, stages):
+        """
+        Add the counters of another set of stages, e.g. a page measured in a worker process
+        or a document into its batch.
+
+        Args:
+            stages (dict): Stage counters keyed by stage name.
+        """
+        with self.lock:
+            for stage, counters in stages.items():
+                totals = self.stages.setdefault(stage, dict.fromkeys(STAGE_FIELDS, 0))
+                for field in STAGE_FIELDS:
+                    totals[field] += counters.get(field, 0)
+
+    def to_dict(self):
+        """
+        Copy the counters.
+
+        Returns:
+            dict: Stage counters keyed by stage name, sorted by stage.
+        """
+        with self.lock:
+            return {stage: dict(counters) for stage, counters in sorted(self.stages.items())}
+
+    def rows(self):
+        """
+        Get one row per stage for display with tabulate.
+
+        Returns:
+            list: [stage, calls, wall seconds, CPU seconds, items, bytes] rows, slowest stage first.
+        """
+        stages = self.to_dict()
+        return [[stage, counters['calls'], round(counters['wall_seconds'], 4), round(counters['cpu_seconds'], 4),
+                 counters['items'], counters['bytes']]
+                for stage, counters in sorted(stages.items(), key=lambda item: -item[1]['wall_seconds'])]
+
+
+def write_json(path, batch, documents):
+    """
+    Write the batch and per-document stage counters as JSON.
+
+    Args:
+        path (str): The JSON file to write.
+        batch (StageMetrics): The counters summed over the batch.
+        documents (dict): Stage counters of each document, keyed by file path.
+    """
+    with open(path, 'w', encoding='utf-8') as report:
+        json.dump({'batch': batch.to_dict(), 'documents': documents}, report, indent=2)
+    print(f"Stage metrics saved to {path}")
+
+
+def write_prometheus(path, batch):
+    """
+    Write the batch stage counters in the Prometheus text exposition format,
+    e.g. for the node_exporter textfile collector.
+
+    Args:
+        path (str): The .prom file to write.
+        batch (StageMetrics): The counters summed over the batch.
+    """
+    stages = batch.to_dict()
+    lines = []
+    for field in STAGE_FIELDS:
+        name = f"extractor_stage_{field}_total"
+        lines.append(f"# HELP {name} {PROMETHEUS_HELP[field]}")
+        lines.append(f"# TYPE {name} counter")
+        for stage, counters in stages.items():
+            lines.append(f'{name}{{stage="{stage}"}} {counters[field]}')
+    temp_path = f"{path}.tmp"  # Written aside and renamed, so the collector never reads a partial file
+    with open(temp_path, 'w', encoding='utf-8') as report:
+        report.write("\n".join(lines) + "\n")
+    os.replace(temp_path, path)
+    print(f"Stage metrics saved to {path}")
+
+
+@contextmanager
+def document_profiler(profile_dir, file_name, profiler='cprofile'):
+    """
+    Profile the block and save the profile of the document in profile_dir:
+    <file_name>.prof for cProfile (open with pstats or snakeviz), <file_name>.html for pyinstrument.
+    Does nothing when profile_dir is empty.
+
+    Args:
+        profile_dir (str): The folder of the profiles, or None to disable profiling.
+        file_name (str): The name of the document being profiled.
+        profiler (str, optional): 'cprofile' or 'pyinstrument'.
+
+    Raises:
+        ValueError: If the profiler is not supported.
+        ImportError: If pyinstrument is requested but not installed.
+    """
+    if not profile_dir:
+        yield
+        return
+    if profiler not in PROFILERS:
+        raise ValueError(f"Unsupported profiler: {profiler}. Use one of {PROFILERS}.")
+    if profiler == 'pyinstrument' and pyinstrument is None:
+        raise ImportError("The pyinstrument profiler requires 'pip install pyinstrument'.")
+    os.makedirs(profile_dir, exist_ok=True)
+
+    if profiler == 'pyinstrument':
+        session = pyinstrument.Profiler()
+        session.start()
+        try:
+            yield
+        finally:
+            session.stop()
+            with open(os.path.join(profile_dir, f"{file_name}.html"), 'w', encoding='utf-8') as report:
+                report.write(session.output_html())
+        return
+
+    session = cProfile.Profile()
+    session.enable()
+    try:
+        yield
+    finally:
+        session.disable()
+        session.dump_stats(os.path.join(profile_dir, f"{file_name}.prof"))
@@ -1,15 +1,33 @@
 import os
+import sys  # Status messages move to stderr when records stream to stdout
+import traceback  # Reports storages that fail to write their buffered documents
+import argparse  # Command line options for batch ingestion
 from dotenv import load_dotenv  # Load environment variables from a .env file
-from data_extractor.data_extractor import UniversalDataExtractor  # Universal extractor for different file types
+from data_extractor.data_extractor import UniversalDataExtractor, extraction_version  # Universal extractor for different file types
+from data_extractor.image_store import ImageStore  # Content-addressed store shared by every document
+from data_extractor.extraction_cache import ExtractionCache  # On-disk cache of extraction results
 from file_loader.concrete_file_loader import Loader  # Import the Loader class for loading files
 from storage.file_storage import FileStorage  # Handles file-based storage of extracted data
 from storage.sql_storage import SQLStorage  # Handles database storage of extracted data
-from tabulate import tabulate  # Optional: for tabular display of data (not used in the current code)
+from storage.pooled_sql_storage import PooledSQLStorage  # Database storage backed by a connection pool
+from storage.sqlite_storage import SQLiteStorage  # Embedded SQLite database storage
+from storage.columnar_storage import ColumnarStorage  # Partitioned Parquet/Arrow datasets
+from storage.jsonl_storage import STDOUT, JSONLStorage  # JSON Lines stream for downstream pipelines
+from storage.search_index import SearchIndex  # Full-text index of the page text
+from storage.storage import store_document  # Streams one document into several storages
+from batch.discovery import collect_files  # Finds documents in directories, globs and manifests
+from batch.runner import BatchRunner  # Processes many documents and reports failures
+from batch.pipeline import StoragePipeline  # Overlaps extraction with storage writes
+from instrumentation.stage_metrics import StageMetrics, document_profiler, measure  # Per-stage timing and profiling
+from tabulate import tabulate  # Tabular display of the stage timings
  
 class Main:
     def __init__(self):
         load_dotenv()  # Load database credentials from .env file
 
+        jsonl_output = os.getenv('JSONL_OUTPUT')
+        redirect_status_messages()
+
         # Database configuration loaded from environment variables
         self.db_config = {
             'user': os.getenv('DB_USER'),
@@ -18,15 +36,94 @@ class Main:
             'database': os.getenv('DB_NAME')
         }
 
+        # Number of worker processes used to extract PDF pages in parallel (1 = serial)
+        self.extract_workers = int(os.getenv('EXTRACT_WORKERS', '1'))
+
+        # Text engine per file type, e.g. EXTRACTION_ENGINES=pdf=fast for text-only PDF extraction
+        self.engines = parse_engines(os.getenv('EXTRACTION_ENGINES', ''))
+
+        # 'raw' keeps embedded images as they are, 'png' transcodes every image to PNG
+        self.image_mode = os.getenv('IMAGE_MODE', 'raw')
+
+        # Images of every document are stored once under their content hash
+        self.image_store = ImageStore(os.getenv('IMAGE_DIR', os.path.join('output', 'images')))
+
+        # EXTRACTION_CACHE_DIR keeps the extraction results of every document (up to EXTRACTION_CACHE_MB),
+        # so storages can be re-run over a corpus without parsing the documents again
+        cache_dir = os.getenv('EXTRACTION_CACHE_DIR')
+        cache_bytes = int(os.getenv('EXTRACTION_CACHE_MB', '1024')) * 1024 * 1024
+        self.cache = ExtractionCache(cache_dir, cache_bytes) if cache_dir else None
+
         # File storage for storing extracted data into local files
         self.file_storage = FileStorage("output")
 
-        # SQL storage for storing extracted data into a MySQL database
-        self.sql_storage = SQLStorage(self.db_config)
+        # SQL storage for storing extracted data into a database
+        self.sql_storage = self.create_sql_storage()
 
         # Create necessary tables in the database if they don't already exist
         self.sql_storage.create_tables()
+
+        # Every storage that receives the extracted data
+        self.storages = [self.file_storage, self.sql_storage]
+
+        # COLUMNAR_DIR adds Parquet (or Arrow, with COLUMNAR_FORMAT=arrow) datasets for analytics
+        if os.getenv('COLUMNAR_DIR'):
+            self.storages.append(ColumnarStorage(os.getenv('COLUMNAR_DIR'), os.getenv('COLUMNAR_FORMAT', 'parquet')))
+
+        # JSONL_OUTPUT adds one compact JSON record per document (JSONL_RECORDS=page: per page) to a
+        # .jsonl file rotated every JSONL_MAX_MB megabytes, or to stdout
+        if jsonl_output:
+            max_bytes = int(os.getenv('JSONL_MAX_MB', '100')) * 1024 * 1024
+            self.storages.append(JSONLStorage(jsonl_output, os.getenv('JSONL_RECORDS', 'document'), max_bytes))
+
+        # SEARCH_INDEX adds an SQLite FTS5 index of the page and slide text, searched with --search
+        if os.getenv('SEARCH_INDEX'):
+            self.storages.append(SearchIndex(os.getenv('SEARCH_INDEX')))
+
+        # PROFILE_DIR saves a profile of every document (PROFILER=cprofile by default, or pyinstrument)
+        self.profile_dir = os.getenv('PROFILE_DIR')
+        self.profiler = os.getenv('PROFILER', 'cprofile')
+        self.last_metrics = None  # Stage timings of the last processed document
+
+        # PIPELINE_QUEUE_SIZE above 0 writes to the storages in background threads, so storing one
+        # document overlaps with extracting the next; the queue size bounds the pages held in memory
+        pipeline_queue_size = int(os.getenv('PIPELINE_QUEUE_SIZE', '0'))
+        self.pipeline = StoragePipeline(self.storages, pipeline_queue_size) if pipeline_queue_size > 0 else None
+        self.storage_tickets = []  # (file path, DocumentTicket) of documents the pipeline has not reported yet
  
+    def create_sql_storage(self):
+        """
+        Create the SQL storage backend chosen by the STORAGE_BACKEND setting.
+        'mysql' (default) uses the DB_* credentials, 'sqlite' writes to SQLITE_PATH without a server.
+        SQL_BATCH_SIZE rows are sent per multi-row INSERT and SQL_COMMIT_EVERY documents per transaction.
+        For MySQL, DB_POOL_SIZE above 0 borrows connections from a per-process pool instead of holding a single one.
+
+        Returns:
+            SQLStorage: The configured storage backend.
+
+        Raises:
+            ValueError: If STORAGE_BACKEND is not supported.
+        """
+        backend = os.getenv('STORAGE_BACKEND', 'mysql').lower()
+        sql_options = {'batch_size': int(os.getenv('SQL_BATCH_SIZE', '500'))}
+        if os.getenv('SQL_COMMIT_EVERY'):
+            sql_options['commit_every'] = int(os.getenv('SQL_COMMIT_EVERY'))
+
+        if backend == 'sqlite':
+            return SQLiteStorage(os.getenv('SQLITE_PATH', os.path.join('output', 'extracted_data.db')), **sql_options)
+        if backend != 'mysql':
+            raise ValueError(f"Unsupported storage backend: {backend}. Use 'mysql' or 'sqlite'.")
+
+        pool_size = int(os.getenv('DB_POOL_SIZE', '0'))
+        if pool_size > 0:
+            # The pipeline runs one writer thread per pooled connection; without it only this thread stores
+            # documents, so connections beyond the first would never be borrowed
+            if pool_size > 1 and int(os.getenv('PIPELINE_QUEUE_SIZE', '0')) <= 0:
+                print(f"DB_POOL_SIZE={pool_size} needs PIPELINE_QUEUE_SIZE to write concurrently; using 1 connection.")
+                pool_size = 1
+            return PooledSQLStorage(self.db_config, pool_size=pool_size, **sql_options)
+        return SQLStorage(self.db_config, **sql_options)
+
     def get_user_file_path(self):
         """
         Prompt the user for a file path and return it.
@@ -43,21 +140,114 @@ class Main:
         Args:
             file_path (str): The path to the file to be processed.
             file_type (str): The type/extension of the file (e.g., 'pdf', 'docx', 'pptx').
+
+        Returns:
+            bool: False if every storage already had the file at the same contents and extractor version.
         """
+        # Time spent in each stage of this document, from hashing the file to the storage writes
+        metrics = self.last_metrics = StageMetrics()
+
         # Create an instance of Loader for loading the file
         loader = Loader(file_path, file_type)
-        
-        # Load the file based on its type (the logic is handled inside the Loader class)
-        loader.load_file()
-        
-        # Use UniversalDataExtractor to extract data from the loaded file
-        extractor = UniversalDataExtractor(loader)
+        with measure(metrics, 'file.hash') as counts:
+            loader.validate_file()
+            content_hash = loader.content_hash()
+            counts['bytes'] = os.path.getsize(file_path)
+
+        # Only store into the storages that do not have this content and extractor/engine version yet
+        file_name = os.path.basename(file_path)
+        engine = self.engines.get(loader.file_type, 'layout')  # Type sniffed from the contents by validate_file
+        version = extraction_version(engine)
+        storages = [storage for storage in self.storages
+                    if not storage.stream and not self.is_processed(storage, file_path, content_hash, version)]
+        if not storages:
+            print(f"Skipping {file_name}: already extracted (sha256 {content_hash[:12]}, version {version})")
+            return False
+        storages += [storage for storage in self.storages if storage.stream]  # Streams get every stored document
+
+        with document_profiler(self.profile_dir, file_name, self.profiler):
+            # Use UniversalDataExtractor to extract data from the file; the Loader parses it
+            # unless the results are already in the extraction cache
+            extractor = UniversalDataExtractor(loader, workers=self.extract_workers, image_mode=self.image_mode,
+                                               image_store=self.image_store, metrics=metrics, engine=engine,
+                                               cache=self.cache)
+
+            if self.pipeline is not None:
+                # Queue the pages for the writer threads; they close the extractor when done
+                self.storage_tickets.append((file_path, self.pipeline.submit(extractor, storages)))
+                return True
 
-        # Store the extracted data in file-based storage
-        self.file_storage.store_data(extractor)
+            try:
+                # Walk the document once and store every page in file-based storage
+                # and SQL storage (MySQL database) as it is extracted
+                store_document(extractor, storages)
+            finally:
+                # Release the parsed document held by the loader's session, even if a page failed
+                extractor.close()
+        return True
 
-        # Store the extracted data in SQL storage (MySQL database)
-        self.sql_storage.store_data(extractor)
+    def is_processed(self, storage, file_path, content_hash, version):
+        """Check whether a storage already holds the document, without racing its pipeline writer."""
+        file_name = os.path.basename(file_path)
+        if self.pipeline is not None:
+            return self.pipeline.is_processed(storage, file_name, content_hash, version, file_path)
+        return storage.is_processed(file_name, content_hash, version, file_path)
+
+    def take_storage_errors(self, wait=False):
+        """
+        Collect the storage failures of the documents the pipeline has finished writing, and of the
+        documents reported earlier that a storage then dropped with a failed batch (commit_every above 1).
+
+        Args:
+            wait (bool, optional): Wait until every submitted document is written.
+
+        Returns:
+            list: (file path, storage name, error) for every storage that failed to write a document.
+        """
+        errors, pending = [], []
+        for file_path, ticket in self.storage_tickets:
+            if wait:
+                ticket.done.wait()
+            if ticket.done.is_set():
+                errors += [(file_path, storage_name, error) for storage_name, error in ticket.errors]
+            else:
+                pending.append((file_path, ticket))
+        self.storage_tickets = pending
+        if self.pipeline is not None:
+            errors += self.pipeline.take_lost_documents()
+        else:
+            for storage in self.storages:
+                errors += [(file_path, type(storage).__name__, error) for file_path, error in storage.take_lost_documents()]
+        return errors
+
+    def flush(self):
+        """
+        Write what the storages still buffer and collect every storage failure not reported yet.
+
+        Returns:
+            list: (file path, storage name, error) for every storage that failed to write a document.
+        """
+        if self.pipeline is not None:
+            self.pipeline.flush()  # From the writer threads, which own the storages
+        else:
+            for storage in self.storages:
+                try:
+                    storage.flush()
+                except Exception:
+                    traceback.print_exc()  # The documents it dropped are collected below
+        return self.take_storage_errors(wait=True)
+
+    def close(self):
+        """Wait for pending pipeline writes, then flush every storage and close the database connection."""
+        if self.pipeline is not None:
+            self.pipeline.close()
+            self.pipeline = None
+        for storage in self.storages:
+            storage.close()
+        if self.cache is not None:
+            stats = self.cache.stats()
+            print(f"Extraction cache: {stats['hits']} hit(s), {stats['misses']} miss(es), {stats['writes']} written, "
+                  f"{stats['evictions']} evicted, {stats['bytes'] / 1e6:.1f} MB")
  
         
     def run(self):
@@ -75,12 +265,92 @@ class Main:
         if file_type:
             # Process the file using the Loader and UniversalDataExtractor
             self.process_file(file_path, file_type)
+            self.close()  # Finish pending writes and commit anything still buffered
+            # Show where the time went, slowest stage first
+            print(tabulate(self.last_metrics.rows(), headers=['stage', 'calls', 'wall s', 'cpu s', 'items', 'bytes']))
         else:
             print("File format not supported. Please provide a .pdf, .docx, or .pptx file.")
  
     
  
+def parse_args():
+    """Parse the command line options for batch ingestion."""
+    parser = argparse.ArgumentParser(description="Extract text, tables, images, metadata and links from PDF, DOCX and PPTX files.")
+    parser.add_argument('paths', nargs='*', help="Files, directories or glob patterns to process. Prompts for a file when omitted.")
+    parser.add_argument('--manifest', help="File listing one path, directory or glob per line.")
+    parser.add_argument('--concurrency', type=int, default=1, help="Number of documents processed at the same time.")
+    parser.add_argument('--memory-budget', type=int, help="Total memory in MB the workers may use; caps the concurrency.")
+    parser.add_argument('--max-pages', type=int, help="Skip documents with more pages or slides, without parsing them.")
+    parser.add_argument('--error-report', default="batch_errors.csv", help="CSV file listing the documents that failed.")
+    parser.add_argument('--metrics-json', help="JSON file receiving the per-stage timings of the batch and of each document.")
+    parser.add_argument('--metrics-prom', help="Prometheus text file receiving the per-stage timings of the batch.")
+    parser.add_argument('--search', help="Search the SEARCH_INDEX full-text index instead of processing files.")
+    parser.add_argument('--limit', type=int, default=10, help="Maximum number of search hits.")
+    return parser.parse_args()
+
+
+def search(query, limit):
+    """
+    Print the pages of the SEARCH_INDEX index that best match a query.
+
+    Args:
+        query (str): The words to search for.
+        limit (int): The maximum number of hits.
+    """
+    index_path = os.getenv('SEARCH_INDEX')
+    if not index_path or not os.path.exists(index_path):
+        print("No search index found. Set SEARCH_INDEX and process some files first.")
+        return
+    index = SearchIndex(index_path)
+    hits = index.search(query, limit)
+    index.close()
+    if not hits:
+        print(f"No matches for '{query}'.")
+        return
+    rows = [[hit['file_path'] or hit['file_name'], hit['page_number'], f"{hit['score']:.2f}", hit['snippet']] for hit in hits]
+    print(tabulate(rows, headers=["File", "Page", "Score", "Snippet"], tablefmt='grid', maxcolwidths=[None, None, None, 80]))
+
+
+def parse_engines(setting):
+    """
+    Parse the EXTRACTION_ENGINES setting.
+
+    Args:
+        setting (str): Comma-separated type=engine pairs, e.g. 'pdf=fast'.
+
+    Returns:
+        dict: The engine of each listed file type; other types use 'layout'.
+
+    Raises:
+        ValueError: If a pair is not of the form type=engine.
+    """
+    engines = {}
+    for pair in filter(None, (item.strip() for item in setting.split(','))):
+        file_type, separator, engine = pair.partition('=')
+        if not separator:
+            raise ValueError(f"Invalid EXTRACTION_ENGINES entry: {pair}. Use type=engine, e.g. pdf=fast.")
+        engines[file_type.strip().lower().lstrip('.')] = engine.strip().lower()
+    return engines
+
+
+def redirect_status_messages():
+    """JSONL_OUTPUT=- streams JSON Lines records on stdout, so status messages go to stderr instead."""
+    if os.getenv('JSONL_OUTPUT') == STDOUT:
+        sys.stdout = sys.stderr
+
+
 if __name__ == "__main__":
-    # Create an instance of the Main class and run the application
-    main_instance = Main()
-    main_instance.run()
+    load_dotenv()
+    redirect_status_messages()
+    args = parse_args()
+    if args.search:
+        search(args.search, args.limit)
+    elif args.paths or args.manifest:
+        # Batch mode: process every supported document that was found
+        runner = BatchRunner(args.concurrency, args.error_report, args.memory_budget, args.metrics_json, args.metrics_prom,
+                             args.max_pages)
+        runner.run(collect_files(args.paths, args.manifest))
+    else:
+        # Create an instance of the Main class and run the application
+        main_instance = Main()
+        main_instance.run()
@@ -0,0 +1,211 @@
+import os  # For the dataset folders
+import uuid  # Unique part file names, so several workers can write the same dataset
+from data_extractor.data_extractor import metadata_to_dict  # Metadata helper
+from storage.storage import Storage  # Abstract storage interface
+
+try:
+    import pyarrow as pa  # Optional: columnar tables
+    import pyarrow.dataset as ds  # Reads the partitioned datasets back
+    import pyarrow.parquet as pq  # Parquet writer
+except ImportError:
+    pa = ds = pq = None
+
+# Supported output formats and the extension of their part files
+COLUMNAR_FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+# Rows buffered across all datasets before the part files are written
+DEFAULT_ROWS_PER_FILE = 100000
+
+# Columns and pyarrow type names of every dataset. Each dataset is partitioned by file type
+# (<root>/<dataset>/file_type=pdf/part-<id>.parquet), so file_type is not stored in the files.
+DATASETS = {
+    'documents': [('document_id', 'string'), ('file_name', 'string'), ('extractor_version', 'string'),
+                  ('pages', 'int32')],
+    'text': [('document_id', 'string'), ('page_number', 'int32'), ('text', 'string')],
+    'tables': [('document_id', 'string'), ('page_number', 'int32'), ('table_index', 'int32'),
+               ('row_index', 'int32'), ('column_index', 'int32'), ('value', 'string')],
+    'links': [('document_id', 'string'), ('page_number', 'int32'), ('url', 'string')],
+    'metadata': [('document_id', 'string'), ('key', 'string'), ('value', 'string')],
+}
+
+
+def dataset_schema(name):
+    """
+    Build the pyarrow schema of a dataset.
+
+    Args:
+        name (str): The dataset name, a key of DATASETS.
+
+    Returns:
+        pyarrow.Schema: The schema of the dataset.
+    """
+    return pa.schema([(column, getattr(pa, type_name)()) for column, type_name in DATASETS[name]])
+
+
+# Columnar storage writing the extracted data of a batch into partitioned Parquet or Arrow IPC datasets
+class ColumnarStorage(Storage):
+    def __init__(self, output_dir, file_format='parquet', rows_per_file=DEFAULT_ROWS_PER_FILE):
+        """
+        Initialize the ColumnarStorage.
+
+        Args:
+            output_dir (str): The directory holding one dataset folder per kind of data.
+            file_format (str, optional): 'parquet' or 'arrow' (Arrow IPC files).
+            rows_per_file (int, optional): Rows buffered across all datasets before the part files are written.
+
+        Raises:
+            ImportError: If pyarrow is not installed.
+            ValueError: If the file format is not supported.
+        """
+        if pa is None:
+            raise ImportError("ColumnarStorage requires pyarrow. Install it with 'pip install pyarrow'.")
+        if file_format not in COLUMNAR_FORMATS:
+            raise ValueError(f"Unsupported columnar format: {file_format}. Use 'parquet' or 'arrow'.")
+        self.output_dir = output_dir
+        self.file_format = file_format
+        self.rows_per_file = rows_per_file
+        self.buffers = {}  # (dataset, file type) -> list of buffered rows
+        self.pending_rows = 0  # Rows buffered across all datasets
+        self.document_id = None  # Content hash of the document currently being stored
+        self.file_type = None  # Partition of the document currently being stored
+        self.pages = 0  # Pages seen for the current document
+        self.table_index = 0  # Tables seen for the current document
+        self.document_start = None  # Buffered rows per partition when the current document began
+        self.processed = self.load_processed()  # (file name, content hash, extractor version) already written
+
+    def load_processed(self):
+        """
+        Read the documents dataset written by earlier runs.
+
+        Returns:
+            set: The (file name, content hash, extractor version) of every document already stored.
+        """
+        documents_dir = os.path.join(self.output_dir, 'documents')
+        if not os.path.isdir(documents_dir):
+            return set()
+        dataset = ds.dataset(documents_dir, schema=dataset_schema('documents'),
+                             format='parquet' if self.file_format == 'parquet' else 'ipc', partitioning='hive')
+        table = dataset.to_table(columns=['file_name', 'document_id', 'extractor_version']).to_pydict()
+        return set(zip(table['file_name'], table['document_id'], table['extractor_version']))
+
+    def is_processed(self, file_name, content_hash, extractor_version, file_path=None):
+        """
+        Check whether the document was written by this or an earlier run.
+
+        Args:
+            file_name (str): The name of the file.
+            content_hash (str): The SHA-256 hash of the file contents.
+            extractor_version (str): The version of the extraction logic.
+            file_path (str, optional): The path of the file, for storages that key documents by path.
+
+        Returns:
+            bool: True if the datasets already hold the document.
+        """
+        return (file_name, content_hash, extractor_version) in self.processed
+
+    def add_row(self, dataset, row):
+        """Buffer a row for a dataset in the partition of the current document."""
+        self.buffers.setdefault((dataset, self.file_type), []).append(row)
+        self.pending_rows += 1
+
+    def begin_document(self, extractor):
+        """
+        Start buffering the rows of a new document.
+
+        Args:
+            extractor (UniversalDataExtractor): The data extractor that provides the extracted data.
+        """
+        self.document_id = extractor.file_loader.content_hash()  # Same contents, same id in every dataset
+        self.file_type = extractor.file_type.lstrip('.')
+        self.pages = 0
+        self.table_index = 0
+        self.document_start = {key: len(rows) for key, rows in self.buffers.items()}
+
+    def store_page(self, page):
+        """
+        Buffer the text, table cells and links of a page, one row per text chunk, cell and link.
+
+        Args:
+            page (PageRecord): The text, tables, images and links of one page.
+        """
+        self.pages += 1
+        if page.text:
+            self.add_row('text', (self.document_id, page.page_number, page.text))
+
+        # Tables keep their structure as one row per cell
+        for table in page.tables:
+            self.table_index += 1
+            for row_index, row in enumerate(table):
+                for column_index, cell in enumerate(row):
+                    value = None if cell is None else str(cell)
+                    self.add_row('tables', (self.document_id, page.page_number, self.table_index,
+                                            row_index, column_index, value))
+
+        for link in filter(None, page.links):
+            self.add_row('links', (self.document_id, page.page_number, link))
+
+    def end_document(self, extractor):
+        """
+        Buffer the metadata and document rows, and write the part files once enough rows are buffered.
+
+        Args:
+            extractor (UniversalDataExtractor): The data extractor that provides the extracted data.
+        """
+        for key, value in metadata_to_dict(extractor.extract_metadata()).items():
+            self.add_row('metadata', (self.document_id, key, str(value)))
+        file_name = extractor.get_file_name()
+        self.add_row('documents', (self.document_id, file_name, extractor.version, self.pages))
+        self.processed.add((file_name, self.document_id, extractor.version))
+        self.document_start = None
+
+        # Only flush between documents, so a part file never holds half a document
+        if self.pending_rows >= self.rows_per_file:
+            self.flush()
+
+    def abort_document(self):
+        """Drop the rows buffered for the document being stored, keeping those of earlier documents."""
+        if self.document_start is None:
+            return  # No document in progress
+        for key in list(self.buffers):
+            del self.buffers[key][self.document_start.get(key, 0):]
+            if not self.buffers[key]:
+                del self.buffers[key]
+        self.pending_rows = sum(len(rows) for rows in self.buffers.values())
+        self.document_start = None
+
+    def flush(self):
+        """Write every buffered dataset partition to a new part file."""
+        for (dataset, file_type), rows in self.buffers.items():
+            schema = dataset_schema(dataset)
+            columns = list(zip(*rows))
+            table = pa.Table.from_arrays([pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                                         schema=schema)
+            self.write_part(table, os.path.join(self.output_dir, dataset, f"file_type={file_type}"))
+        if self.pending_rows:
+            print(f"{self.pending_rows} rows written to {self.output_dir}")
+        self.buffers = {}
+        self.pending_rows = 0
+
+    def write_part(self, table, partition_dir):
+        """
+        Write a table as a new part file of a partition.
+        The file is written under a hidden name and renamed, so readers never see a partial file.
+
+        Args:
+            table (pyarrow.Table): The rows to write.
+            partition_dir (str): The partition folder.
+        """
+        os.makedirs(partition_dir, exist_ok=True)
+        part_name = f"part-{uuid.uuid4().hex}{COLUMNAR_FORMATS[self.file_format]}"
+        temp_path = os.path.join(partition_dir, f".{part_name}.tmp")  # Hidden files are ignored by readers
+        if self.file_format == 'parquet':
+            pq.write_table(table, temp_path)
+        else:
+            with pa.OSFile(temp_path, 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+        os.replace(temp_path, os.path.join(partition_dir, part_name))
+
+    def close(self):
+        """Write the rows still buffered."""
+        self.flush()
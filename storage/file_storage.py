@@ -1,117 +1,181 @@
 import os
 import csv
-from data_extractor.data_extractor import UniversalDataExtractor  # Import the universal data extractor
-from file_loader.concrete_file_loader import Loader  # Import the common Loader class to load different file types
-from PIL import Image  # Import Pillow library for handling images
-import io  # Used for handling byte streams of images
+from data_extractor.data_extractor import metadata_to_dict  # Metadata helper
+from storage.storage import Storage  # Abstract storage interface
 from tabulate import tabulate  # Importing tabulate for pretty table display in the terminal
+
+# File in each document folder recording the content hash and extractor version it was extracted from
+PROCESSED_MARKER = ".extraction"
  
-class FileStorage:
-    def __init__(self, output_dir):
+class FileStorage(Storage):
+    def __init__(self, output_dir, input_root=None):
         """
         Initialize the FileStorage with an output directory.
         Args:
             output_dir (str): The directory where extracted data will be saved.
+            input_root (str, optional): Each document is saved under its path relative to this directory,
+                so files with the same name in different folders do not overwrite each other.
+                Defaults to the current directory.
         """
         self.output_dir = output_dir
+        self.input_root = os.path.abspath(input_root or os.getcwd())
+        self.base_folder = None  # Folder of the document currently being stored
+        self.text_file = None  # Open handle of extracted_text.txt, appended to page by page
+        self.table_count = 0  # Number of tables saved for the current document
+        self.image_count = 0  # Number of images seen for the current document
+        self.links = set()  # Unique links of the current document
  
-    def store_data(self, extractor):
+    def is_processed(self, file_name, content_hash, extractor_version, file_path=None):
+        """
+        Check whether the document folder was written from the same contents and extractor version.
+
+        Args:
+            file_name (str): The name of the file.
+            content_hash (str): The SHA-256 hash of the file contents.
+            extractor_version (str): The version of the extraction logic.
+            file_path (str, optional): The path of the file, for storages that key documents by path.
+
+        Returns:
+            bool: True if the stored files are up to date.
+        """
+        marker_path = os.path.join(self.document_folder(file_path or file_name), PROCESSED_MARKER)
+        if not os.path.exists(marker_path):
+            return False
+        with open(marker_path, 'r', encoding='utf-8') as marker:
+            return marker.read().split() == [content_hash, extractor_version]
+
+    def document_folder(self, file_path):
+        """
+        Return the folder holding the extracted data of a file.
+
+        Args:
+            file_path (str): The path of the file.
+
+        Returns:
+            str: The file's path relative to input_root, under output_dir. Files outside input_root
+            keep their whole absolute path, without the drive and leading separator.
+        """
+        file_path = os.path.abspath(file_path)
+        try:
+            relative_path = os.path.relpath(file_path, self.input_root)
+        except ValueError:  # On another drive
+            relative_path = os.pardir
+        if relative_path == os.pardir or relative_path.startswith(os.pardir + os.sep):
+            relative_path = os.path.splitdrive(file_path)[1].lstrip(os.sep)
+        return os.path.join(self.output_dir, relative_path)
+
+    def begin_document(self, extractor):
         """
-        Store data extracted by the UniversalDataExtractor.
-        This includes saving text, tables, images, metadata, and links to files.
+        Create the folder for the document and open the text file for appending.
 
         Args:
             extractor (UniversalDataExtractor): The data extractor that provides the extracted data.
         """
         # Create a base folder for storing all extracted content for the file
-        base_folder = os.path.join(self.output_dir, extractor.get_file_name())
-        os.makedirs(base_folder, exist_ok=True)  # Ensure the directory exists
- 
-        # Store extracted text data
-        data = extractor.extract_text()
-        if data and 'text' in data and data['text'].strip():
-            # Save text to a file if extracted
-            text_file_path = os.path.join(base_folder, "extracted_text.txt")
-            with open(text_file_path, 'w', encoding='utf-8') as text_file:
-                text_file.write(data['text'])
-            print(f"Text data saved to {text_file_path}")
-        else:
-            print("Text data extracted.")
+        self.base_folder = self.document_folder(extractor.file_loader.file_path)
+        os.makedirs(self.base_folder, exist_ok=True)  # Ensure the directory exists
+
+        # Remove the marker until the document is fully stored again
+        marker_path = os.path.join(self.base_folder, PROCESSED_MARKER)
+        if os.path.exists(marker_path):
+            os.remove(marker_path)
+
+        text_file_path = os.path.join(self.base_folder, "extracted_text.txt")
+        self.text_file = open(text_file_path, 'w', encoding='utf-8')
+        self.table_count = 0
+        self.image_count = 0
+        self.links = set()
+
+    def store_page(self, page):
+        """
+        Append the text of a page and save its tables as they arrive.
+
+        Args:
+            page (PageRecord): The text, tables, images and links of one page.
+        """
+        # Store extracted text data, separating pages with a newline
+        if page.text:
+            if self.text_file.tell():
+                self.text_file.write("\n")
+            self.text_file.write(page.text)
  
         # Store extracted tables
-        tables = extractor.extract_tables()
-        if tables:
+        if page.tables:
             # Create a folder for storing tables
-            tables_folder = os.path.join(base_folder, "tables")
+            tables_folder = os.path.join(self.base_folder, "tables")
             os.makedirs(tables_folder, exist_ok=True)
-            for i, table in enumerate(tables):
+            for table in page.tables:
+                self.table_count += 1
                 # Save each table as a CSV file
-                csv_file_path = os.path.join(tables_folder, f"table_{i + 1}.csv")
+                csv_file_path = os.path.join(tables_folder, f"table_{self.table_count}.csv")
                 with open(csv_file_path, 'w', newline='', encoding='utf-8') as csv_file:
                     writer = csv.writer(csv_file)
                     writer.writerows(table)
                 print(f"Table data saved to {csv_file_path}")
                 # Display the table in a pretty format in the terminal
-                print(f"Table {i + 1}:\n{tabulate(table, headers='keys', tablefmt='grid')}")
-        else:
-            print("No tables extracted.")
+                print(f"Table {self.table_count}:\n{tabulate(table, headers='keys', tablefmt='grid')}")
  
-        # Store extracted images
-        images = extractor.extract_images()
-        if images:
-            # Create a folder for storing images
-            images_folder = os.path.join(base_folder, "images")
-            os.makedirs(images_folder, exist_ok=True)
-            for i, img_info in enumerate(images):
-                # Check if the image is valid and has a stream of data
-                if isinstance(img_info, dict) and 'stream' in img_info:
-                    img_stream = img_info['stream']
-                    img_data = img_stream.get_rawdata()  # Get the raw image data
- 
-                    # Convert image data to a Pillow image object
-                    try:
-                        img = Image.open(io.BytesIO(img_data))  # Open image from byte stream
-                        img_path = os.path.join(images_folder, f"image_{i + 1}.png")
-                        img.save(img_path)  # Save the image as a PNG file
-                        print(f"Image saved to {img_path}")
-                    except Exception as e:
-                        print(f"Error saving image {i + 1}: {e}")
-                else:
-                    print(f"Image data for image {i + 1} is not valid or not found.")
+        # Images are written once by the extractor into the content-addressed image store
+        for image in page.images:
+            self.image_count += 1
+            print(f"Image saved to {image['path']}")
+
+        # Collect unique, non-empty links
+        self.links.update(filter(None, page.links))
+
+    def abort_document(self):
+        """
+        Close the text file of a document that failed partway. The processed marker removed by
+        begin_document is not written, so the document is extracted again on the next run.
+        """
+        if self.text_file is not None:
+            self.text_file.close()
+            self.text_file = None
+
+    def end_document(self, extractor):
+        """
+        Close the text file and store the document metadata and links.
+
+        Args:
+            extractor (UniversalDataExtractor): The data extractor that provides the extracted data.
+        """
+        text_file_path = self.text_file.name
+        written = self.text_file.tell()
+        self.text_file.close()
+        self.text_file = None
+        if written:
+            print(f"Text data saved to {text_file_path}")
         else:
+            print("No text extracted.")
+
+        if not self.table_count:
+            print("No tables extracted.")
+        if not self.image_count:
             print("No images extracted.")
  
         # Store extracted metadata
-        metadata = extractor.extract_metadata()
+        metadata = metadata_to_dict(extractor.extract_metadata())
         if metadata:
             # Save metadata to a text file
-            metadata_file_path = os.path.join(base_folder, "metadata.txt")
+            metadata_file_path = os.path.join(self.base_folder, "metadata.txt")
             with open(metadata_file_path, 'w', encoding='utf-8') as metadata_file:
-                if isinstance(metadata, dict):
-                    # Write metadata key-value pairs if metadata is a dictionary
-                    for key, value in metadata.items():
-                        if value:  # Only save non-empty metadata
-                            metadata_file.write(f"{key}: {value}\n")
-                else:
-                    # Write metadata attributes if metadata is an object
-                    for prop in dir(metadata):
-                        if not prop.startswith('_') and prop != 'xml':  # Skip private/protected attributes
-                            value = getattr(metadata, prop)
-                            if value:  # Only save non-empty metadata
-                                metadata_file.write(f"{prop}: {value}\n")
+                for key, value in metadata.items():
+                    metadata_file.write(f"{key}: {value}\n")
             print(f"Metadata saved to {metadata_file_path}")
         else:
             print("No metadata extracted.")
  
         # Store extracted links
-        links = extractor.extract_links()
-        unique_links = set(filter(None, links))  # Filter out empty links and remove duplicates
-        if unique_links:
+        if self.links:
             # Save links to a text file
-            links_file_path = os.path.join(base_folder, "extracted_links.txt")
+            links_file_path = os.path.join(self.base_folder, "extracted_links.txt")
             with open(links_file_path, 'w', encoding='utf-8') as links_file:
-                for link in unique_links:
+                for link in self.links:
                     links_file.write(f"{link}\n")
             print(f"Links data saved to {links_file_path}")
         else:
             print("No links extracted.")
+
+        # Record the contents and extractor version the folder was written from
+        with open(os.path.join(self.base_folder, PROCESSED_MARKER), 'w', encoding='utf-8') as marker:
+            marker.write(f"{extractor.file_loader.content_hash()} {extractor.version}\n")
@@ -0,0 +1,206 @@
+import os  # For the output file and its rotation
+import sys  # Standard output stream
+import json  # Compact JSON records
+import time  # Timestamps in rotated file names
+from data_extractor.data_extractor import metadata_to_dict  # Metadata helper
+from storage.storage import Storage  # Abstract storage interface
+
+# Emit one record per document, or one per page followed by a document record
+RECORD_MODES = ['document', 'page']
+
+# Output path that writes the records to standard output
+STDOUT = '-'
+
+# Rotate the output file once it grows past this size (0 = never)
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+
+
+def check_stdout_writers(output_path, processes):
+    """
+    Reject standard output when several processes would write records to it. Records larger than
+    PIPE_BUF are not written atomically, so records of different processes could interleave.
+
+    Args:
+        output_path (str): The JSONL_OUTPUT setting.
+        processes (int): The number of processes writing records.
+
+    Raises:
+        ValueError: If records would stream to standard output from more than one process.
+    """
+    if output_path == STDOUT and processes > 1:
+        raise ValueError(f"JSONL_OUTPUT={STDOUT} cannot be written by {processes} worker processes; "
+                         "use --concurrency 1 or a .jsonl file, which every worker appends to atomically.")
+
+
+def image_reference(image):
+    """
+    Describe an extracted image by its location in the image store instead of its bytes.
+
+    Args:
+        image (dict): An image of a PageRecord.
+
+    Returns:
+        dict: The hash, path, position and size of the image.
+    """
+    return {
+        'index': image['index'],
+        'hash': image.get('hash'),
+        'path': image.get('path'),
+        'width': image['width'],
+        'height': image['height'],
+        'bbox': image['bbox'],
+    }
+
+
+# Storage streaming compact JSON Lines records to standard output or an append-only, rotating file
+class JSONLStorage(Storage):
+    stream = True  # Records are emitted for every document the other storages store, never replayed
+
+    def __init__(self, output_path=STDOUT, record_mode='document', max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Initialize the JSONLStorage.
+
+        Args:
+            output_path (str, optional): The .jsonl file to append to, or '-' for standard output.
+            record_mode (str, optional): 'document' for one record per document, 'page' for one record
+                per page followed by a document record with the metadata.
+            max_bytes (int, optional): Size after which the file is renamed with a timestamp and a new
+                one is started. Ignored for standard output, which only one process may write
+                (see check_stdout_writers).
+
+        Raises:
+            ValueError: If the record mode is not supported.
+        """
+        if record_mode not in RECORD_MODES:
+            raise ValueError(f"Unsupported record mode: {record_mode}. Use 'document' or 'page'.")
+        self.output_path = output_path
+        self.record_mode = record_mode
+        self.max_bytes = max_bytes
+        self.fd = None  # Descriptor of the open output file
+        self.rotations = 0  # Files rotated by this process, keeps rotated names unique
+        self.document = None  # Fields shared by every record of the current document
+        self.pages = []  # Pages of the current document, in 'document' mode
+        self.page_count = 0  # Pages seen for the current document
+        if output_path != STDOUT:
+            self.open_file()
+
+    def open_file(self):
+        """Open the output file for appending, creating its folder if needed."""
+        if os.path.dirname(self.output_path):
+            os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
+        # O_APPEND makes every record a single append, even with several processes writing the file
+        self.fd = os.open(self.output_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+    def rotate_file(self):
+        """
+        Start a new output file when the current one is full or was rotated by another process.
+        The full file is renamed to <name>.<timestamp>-<pid>-<n>.jsonl and never written again.
+        Another process may rotate the file between the checks and the rename; the file then
+        opened is checked again, as it may be full already.
+        """
+        while True:
+            current = os.fstat(self.fd)
+            try:
+                on_disk = os.stat(self.output_path)
+            except FileNotFoundError:
+                on_disk = None
+            if on_disk is not None and on_disk.st_ino == current.st_ino:
+                if not self.max_bytes or current.st_size < self.max_bytes:
+                    return
+                self.rotations += 1
+                root, ext = os.path.splitext(self.output_path)
+                rotated_path = f"{root}.{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self.rotations}{ext}"
+                try:
+                    os.rename(self.output_path, rotated_path)
+                    print(f"JSON Lines output rotated to {rotated_path}")
+                except (FileNotFoundError, FileExistsError):
+                    pass  # Another process rotated the file first
+            os.close(self.fd)
+            self.open_file()
+
+    def write_record(self, record):
+        """
+        Write one record as a single compact JSON line.
+
+        Args:
+            record (dict): The record to write.
+        """
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str) + "\n"
+        if self.fd is None:
+            # sys.__stdout__ stays the real standard output even when status messages are redirected.
+            # The record bypasses its buffer, which would split large records into several writes.
+            sys.__stdout__.flush()
+            data = memoryview(line.encode('utf-8'))
+            while data:
+                data = data[os.write(sys.__stdout__.fileno(), data):]  # A pipe may accept part of the record
+            return
+        self.rotate_file()
+        os.write(self.fd, line.encode('utf-8'))
+
+    def begin_document(self, extractor):
+        """
+        Start the records of a new document.
+
+        Args:
+            extractor (UniversalDataExtractor): The data extractor that provides the extracted data.
+        """
+        self.document = {
+            'document_id': extractor.file_loader.content_hash(),
+            'file_name': extractor.get_file_name(),
+            'file_type': extractor.file_type.lstrip('.'),
+        }
+        self.pages = []
+        self.page_count = 0
+
+    def store_page(self, page):
+        """
+        Write the page record, or keep the page for the document record.
+
+        Args:
+            page (PageRecord): The text, tables, images and links of one page.
+        """
+        self.page_count += 1
+        record = {
+            'page_number': page.page_number,
+            'text': page.text,
+            'tables': page.tables,
+            'links': [link for link in page.links if link],
+            'images': [image_reference(image) for image in page.images],
+        }
+        if self.record_mode == 'page':
+            self.write_record({'record': 'page', **self.document, **record})
+        else:
+            self.pages.append(record)
+
+    def end_document(self, extractor):
+        """
+        Write the document record with the metadata (and the pages in 'document' mode).
+
+        Args:
+            extractor (UniversalDataExtractor): The data extractor that provides the extracted data.
+        """
+        record = {
+            'record': 'document',
+            **self.document,
+            'extractor_version': extractor.version,
+            'page_count': self.page_count,
+            'metadata': metadata_to_dict(extractor.extract_metadata()),
+        }
+        if self.record_mode == 'document':
+            record['pages'] = self.pages
+        self.write_record(record)
+        self.pages = []
+
+    def abort_document(self):
+        """
+        Drop the pages of a document that failed partway. In 'page' mode its page records are already
+        written; no document record follows them, which marks the document as incomplete.
+        """
+        self.document = None
+        self.pages = []
+
+    def close(self):
+        """Close the output file."""
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
@@ -0,0 +1,214 @@
+import threading, time  # For per-thread state and wait time measurement
+from mysql.connector import Error, pooling  # For MySQL connection pools
+from mysql.connector.errors import PoolError  # Raised when the pool has no free connection
+from storage.sql_storage import SQLStorage  # Base SQL storage with the schema and inserts
+
+# Default number of connections kept in the pool of each process, and of pipeline writer threads borrowing them
+DEFAULT_POOL_SIZE = 5
+
+# Seconds to wait for a free connection before giving up on a document
+DEFAULT_POOL_TIMEOUT = 30.0
+
+# Seconds to sleep between attempts to borrow a connection from an exhausted pool
+POOL_RETRY_DELAY = 0.01
+
+
+def thread_local_attribute(name, default):
+    """
+    Create a property that keeps an SQLStorage attribute per thread, so every worker thread
+    borrows its own connection and tracks its own document state.
+
+    Args:
+        name (str): The attribute name.
+        default (callable): Builds the initial value for a new thread.
+    """
+    def getter(self):
+        if not hasattr(self.local, name):
+            setattr(self.local, name, default())
+        return getattr(self.local, name)
+
+    def setter(self, value):
+        setattr(self.local, name, value)
+
+    return property(getter, setter)
+
+
+# SQL storage that borrows connections from a mysql.connector pool
+class PooledSQLStorage(SQLStorage):
+    # Document state kept per thread instead of per storage object
+    connection = thread_local_attribute('connection', lambda: None)
+    cursor = thread_local_attribute('cursor', lambda: None)
+    file_id = thread_local_attribute('file_id', lambda: None)
+    failed = thread_local_attribute('failed', lambda: False)
+    error = thread_local_attribute('error', lambda: None)
+    pending_rows = thread_local_attribute('pending_rows', dict)
+    pending_documents = thread_local_attribute('pending_documents', lambda: 0)
+    pending_paths = thread_local_attribute('pending_paths', list)
+    lost_documents = thread_local_attribute('lost_documents', list)
+    stage_metrics = thread_local_attribute('stage_metrics', lambda: None)
+
+    def __init__(self, db_config, pool_size=DEFAULT_POOL_SIZE, pool_timeout=DEFAULT_POOL_TIMEOUT, **kwargs):
+        """
+        Initialize the PooledSQLStorage and create the connection pool.
+
+        Args:
+            db_config (dict): A dictionary containing the database credentials.
+            pool_size (int, optional): Number of connections in the pool of this process, and of pipeline
+                writer threads storing documents through it concurrently.
+            pool_timeout (float, optional): Seconds a worker waits for a free connection.
+            **kwargs: batch_size and commit_every, see SQLStorage.
+        """
+        self.local = threading.local()  # Per-thread connection and document state
+        self.pool = None
+        self.pool_size = pool_size
+        self.writer_threads = pool_size  # One pipeline writer per connection
+        self.pool_timeout = pool_timeout
+        self.metrics_lock = threading.Lock()
+        self.metrics = {'borrowed': 0, 'wait_seconds': 0.0, 'max_wait_seconds': 0.0, 'timeouts': 0, 'reconnects': 0}
+        super().__init__(db_config, **kwargs)
+
+    def create_connection(self):
+        """Create the connection pool using the provided db_config."""
+        try:
+            self.pool = pooling.MySQLConnectionPool(
+                pool_name="extraction_pool",
+                pool_size=self.pool_size,
+                user=self.db_config['user'],
+                password=self.db_config['password'],
+                host=self.db_config['host'],
+                database=self.db_config['database']
+            )
+            print(f"MySQL connection pool created with {self.pool_size} connections")
+        except Error as e:
+            # Handle connection errors
+            print(f"Error creating MySQL connection pool: {e}")
+            self.pool = None
+
+    def borrow_connection(self):
+        """
+        Borrow a connection from the pool, waiting up to pool_timeout seconds for one to be free.
+        The connection is pinged and reconnected if the server dropped it.
+
+        Returns:
+            PooledMySQLConnection: The borrowed connection, or None if none could be obtained.
+        """
+        if self.pool is None:
+            return None
+        start = time.perf_counter()
+        while True:
+            try:
+                connection = self.pool.get_connection()
+                break
+            except PoolError:
+                if time.perf_counter() - start >= self.pool_timeout:
+                    self.record_wait(time.perf_counter() - start, timed_out=True)
+                    print(f"Timed out after {self.pool_timeout}s waiting for a database connection")
+                    return None
+                time.sleep(POOL_RETRY_DELAY)  # Pool exhausted, wait for a connection to be returned
+            except Error as e:
+                print(f"Error getting a pooled connection: {e}")
+                return None
+        self.record_wait(time.perf_counter() - start)
+
+        try:
+            connection.ping(reconnect=False)
+        except Error:
+            try:
+                connection.ping(reconnect=True, attempts=3, delay=1)  # Server dropped the connection
+                with self.metrics_lock:
+                    self.metrics['reconnects'] += 1
+            except Error as e:
+                print(f"Error reconnecting to MySQL: {e}")
+                connection.close()
+                return None
+        return connection
+
+    def release_connection(self):
+        """Return the current thread's connection to the pool."""
+        if self.connection is not None:
+            self.connection.close()  # Closing a pooled connection returns it to the pool
+            self.connection = None
+
+    def record_wait(self, seconds, timed_out=False):
+        """Add one borrow attempt to the pool wait time metrics."""
+        with self.metrics_lock:
+            if timed_out:
+                self.metrics['timeouts'] += 1
+            else:
+                self.metrics['borrowed'] += 1
+            self.metrics['wait_seconds'] += seconds
+            self.metrics['max_wait_seconds'] = max(self.metrics['max_wait_seconds'], seconds)
+
+    def pool_metrics(self):
+        """
+        Get the pool wait time metrics, used to size the pool under load.
+
+        Returns:
+            dict: Borrow count, total/mean/max wait seconds, timeouts and reconnects.
+        """
+        with self.metrics_lock:
+            metrics = dict(self.metrics)
+        attempts = metrics['borrowed'] + metrics['timeouts']
+        metrics['mean_wait_seconds'] = metrics['wait_seconds'] / attempts if attempts else 0.0
+        metrics['pool_size'] = self.pool_size
+        return metrics
+
+    def create_tables(self):
+        """Create tables for storing extracted data using a borrowed connection."""
+        self.connection = self.borrow_connection()
+        try:
+            super().create_tables()
+        finally:
+            self.release_connection()
+
+    def is_processed(self, file_name, content_hash, extractor_version, file_path=None):
+        """Check the database for the document using a borrowed connection (see SQLStorage.is_processed)."""
+        if self.pool is None:
+            return True  # Nothing can be stored without a database
+        borrowed = self.connection is None
+        if borrowed:
+            self.connection = self.borrow_connection()
+            if self.connection is None:
+                return False
+        try:
+            return super().is_processed(file_name, content_hash, extractor_version, file_path)
+        finally:
+            if borrowed:
+                self.release_connection()
+
+    def begin_document(self, extractor):
+        """Borrow a connection for the document, then insert the file record."""
+        if self.connection is None:
+            self.connection = self.borrow_connection()
+        super().begin_document(extractor)
+
+    def end_document(self, extractor):
+        """Finish the document and return the connection unless documents are still buffered."""
+        try:
+            super().end_document(extractor)
+        finally:
+            if not self.pending_documents:
+                self.release_connection()
+
+    def abort_document(self):
+        """Roll back the current thread's document and return its connection to the pool."""
+        super().abort_document()
+        self.release_connection()
+
+    def flush(self):
+        """Commit the current thread's buffered documents and return its connection."""
+        try:
+            super().flush()
+        finally:
+            self.release_connection()
+
+    def close_connection(self):
+        """Commit buffered documents, release the pool and print the pool metrics."""
+        try:
+            self.flush()
+        finally:
+            if self.pool is not None:
+                # mysql.connector has no public call that closes a pool; dropping it lets its idle connections be
+                # closed with their objects, at the latest when the worker process exits
+                self.pool = None
+                print(f"Database connection pool released. Wait metrics: {self.pool_metrics()}")
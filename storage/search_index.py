@@ -0,0 +1,290 @@
+import os  # For creating the index folder
+import re  # Splits queries into terms
+import sqlite3  # SQLite with the FTS5 full-text extension
+from storage.storage import Storage  # Abstract storage interface
+
+# Target length of an indexed chunk, in characters; pages are split at whitespace near this length
+CHUNK_CHARS = 1000
+
+# Documents indexed per transaction by default
+DEFAULT_INDEX_COMMIT_EVERY = 50
+
+# Buffered chunks that trigger a commit before commit_every documents are reached, bounding memory
+DEFAULT_INDEX_MAX_PENDING_CHUNKS = 20000
+
+# Words of context around the matched terms in a snippet
+SNIPPET_TOKENS = 12
+
+
+def chunk_text(text, chunk_chars=CHUNK_CHARS):
+    """
+    Split page text into chunks of about chunk_chars characters, breaking at whitespace.
+
+    Args:
+        text (str): The text of a page or slide.
+        chunk_chars (int, optional): The target chunk length.
+
+    Returns:
+        list: (character offset in the page, chunk text) tuples.
+    """
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_chars, len(text))
+        if end < len(text):
+            space = max(text.rfind(" ", start + chunk_chars // 2, end),
+                        text.rfind("\n", start + chunk_chars // 2, end))  # Do not cut words in half
+            if space != -1:
+                end = space
+        chunk = text[start:end].rstrip()
+        stripped = chunk.lstrip()
+        if stripped:
+            chunks.append((start + len(chunk) - len(stripped), stripped))
+        start = end
+    return chunks
+
+
+def quote_query(query):
+    """
+    Turn plain words into an FTS5 query that matches pages containing all of them,
+    so punctuation in user input is never parsed as FTS5 syntax.
+
+    Args:
+        query (str): The words to search for.
+
+    Returns:
+        str: The FTS5 query.
+    """
+    return " ".join(f'"{term}"' for term in re.findall(r"\w+", query))
+
+
+# Full-text index of page and slide chunks in an SQLite FTS5 table, updated as documents are ingested.
+# Chunks are buffered in memory and each batch of documents is written in a short BEGIN IMMEDIATE ... COMMIT,
+# so the write lock is never held while documents are being extracted.
+class SearchIndex(Storage):
+    def __init__(self, index_path, commit_every=DEFAULT_INDEX_COMMIT_EVERY,
+                 max_pending_chunks=DEFAULT_INDEX_MAX_PENDING_CHUNKS):
+        """
+        Initialize the SearchIndex and create its tables.
+
+        Args:
+            index_path (str): Path of the SQLite index file (':memory:' for an in-memory index).
+            commit_every (int, optional): Number of documents indexed per transaction.
+            max_pending_chunks (int, optional): Buffered chunks after which the finished documents are written
+                even if fewer than commit_every are buffered.
+        """
+        if index_path != ':memory:' and os.path.dirname(index_path):
+            os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        # The connection may be used by a pipeline writer thread; wait for other writers instead of failing
+        self.connection = sqlite3.connect(index_path, timeout=30, check_same_thread=False)
+        self.connection.isolation_level = None  # No implicit transactions; flush opens a short explicit one
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.commit_every = commit_every
+        self.max_pending_chunks = max_pending_chunks
+        self.pending = []  # (document row, chunk rows) of the documents indexed since the last commit
+        self.pending_chunks = 0  # Chunks buffered across those documents
+        self.pending_paths = []  # Paths of the finished documents waiting for the next commit
+        self.lost_documents = []  # (file path, error) of finished documents dropped by a failed commit
+        self.document = None  # (document row, chunk rows) of the document currently being indexed
+        self.create_tables()
+
+    def create_tables(self):
+        """Create the documents table and the FTS5 table of page chunks, and add the columns of newer versions."""
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS indexed_documents (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                file_name TEXT NOT NULL,
+                content_hash TEXT,
+                extractor_version TEXT,
+                file_path TEXT,
+                first_chunk INTEGER,
+                last_chunk INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_indexed_file_name ON indexed_documents (file_name);
+            CREATE VIRTUAL TABLE IF NOT EXISTS page_chunks USING fts5(
+                text,
+                document_id UNINDEXED,
+                page_number UNINDEXED,
+                chunk_index UNINDEXED,
+                char_offset UNINDEXED,
+                tokenize = 'unicode61 remove_diacritics 2'
+            );
+        """)
+        # Documents indexed before these columns existed are matched by name and deleted by document_id
+        existing = {row[1] for row in self.connection.execute("PRAGMA table_info(indexed_documents)")}
+        for column, column_type in [('file_path', 'TEXT'), ('first_chunk', 'INTEGER'), ('last_chunk', 'INTEGER')]:
+            if column not in existing:
+                self.connection.execute(f"ALTER TABLE indexed_documents ADD COLUMN {column} {column_type}")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_indexed_file_path ON indexed_documents (file_path)")
+
+    def is_processed(self, file_name, content_hash, extractor_version, file_path=None):
+        """
+        Check whether the document is indexed, or buffered for indexing, at this content hash and extractor version.
+
+        Args:
+            file_name (str): The name of the file.
+            content_hash (str): The SHA-256 hash of the file contents.
+            extractor_version (str): The version of the extraction logic.
+            file_path (str, optional): The path of the file, for storages that key documents by path.
+
+        Returns:
+            bool: True if the index is up to date for the document.
+        """
+        if any(document[1:] == (file_name, content_hash, extractor_version) for document, _ in self.pending):
+            return True
+        row = self.connection.execute(
+            "SELECT 1 FROM indexed_documents WHERE file_name = ? AND content_hash = ? AND extractor_version = ? LIMIT 1",
+            (file_name, content_hash, extractor_version)).fetchone()
+        return row is not None
+
+    def begin_document(self, extractor):
+        """
+        Start buffering the chunks of a document. Documents are identified by their full path,
+        so files with the same name in different folders are indexed separately.
+
+        Args:
+            extractor (UniversalDataExtractor): The data extractor that provides the extracted data.
+        """
+        file_path = os.path.abspath(extractor.file_loader.file_path)
+        self.document = ((file_path, extractor.get_file_name(), extractor.file_loader.content_hash(), extractor.version),
+                         [])
+
+    def store_page(self, page):
+        """
+        Buffer the text of a page or slide in chunks, keeping the page number and character offset of each.
+
+        Args:
+            page (PageRecord): The text, tables, images and links of one page.
+        """
+        chunks = self.document[1]
+        chunks.extend((chunk, page.page_number, chunk_index, offset)
+                      for chunk_index, (offset, chunk) in enumerate(chunk_text(page.text or "")))
+
+    def end_document(self, extractor):
+        """
+        Queue the document for the next commit, and commit once commit_every documents
+        or max_pending_chunks chunks are buffered.
+
+        Args:
+            extractor (UniversalDataExtractor): The data extractor that provides the extracted data.
+
+        Raises:
+            sqlite3.Error: If writing the batch fails (see flush).
+        """
+        self.pending.append(self.document)
+        self.pending_chunks += len(self.document[1])
+        self.document = None
+        if len(self.pending) >= self.commit_every or self.pending_chunks >= self.max_pending_chunks:
+            self.flush()  # Raises for this document; the documents buffered before it are recorded as lost
+        else:
+            self.pending_paths.append(extractor.file_loader.file_path)
+
+    def abort_document(self):
+        """Drop the chunks of a document that failed partway, keeping the documents buffered before it."""
+        self.document = None
+
+    def flush(self):
+        """
+        Write the buffered documents in one short write transaction, replacing earlier versions of each.
+        Every document's chunks get consecutive rowids, recorded as its chunk range, so replacing
+        the document later deletes the range instead of scanning the FTS5 table.
+
+        Raises:
+            sqlite3.Error: If the transaction fails; it is rolled back and the finished documents it held
+                are recorded as lost (see take_lost_documents).
+        """
+        if not self.pending:
+            return
+        try:
+            self.connection.execute("BEGIN IMMEDIATE")  # Take the write lock now rather than fail halfway
+            last_rowid = self.connection.execute("SELECT rowid FROM page_chunks ORDER BY rowid DESC LIMIT 1").fetchone()
+            next_rowid = last_rowid[0] + 1 if last_rowid else 1
+            for (file_path, file_name, content_hash, extractor_version), chunks in self.pending:
+                self.delete_document(file_path, file_name)
+                first_chunk, last_chunk = next_rowid, next_rowid + len(chunks) - 1
+                cursor = self.connection.execute(
+                    "INSERT INTO indexed_documents (file_name, content_hash, extractor_version, file_path, first_chunk, "
+                    "last_chunk) VALUES (?, ?, ?, ?, ?, ?)",
+                    (file_name, content_hash, extractor_version, file_path, first_chunk, last_chunk))
+                self.connection.executemany(
+                    "INSERT INTO page_chunks (rowid, text, document_id, page_number, chunk_index, char_offset) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(first_chunk + position, chunk, cursor.lastrowid, page_number, chunk_index, offset)
+                     for position, (chunk, page_number, chunk_index, offset) in enumerate(chunks)])
+                next_rowid = last_chunk + 1
+            self.connection.execute("COMMIT")
+            print(f"Search index updated ({len(self.pending)} document(s)).")
+        except sqlite3.Error as e:
+            print(f"Error updating search index: {e}")
+            if self.connection.in_transaction:
+                self.connection.rollback()
+            self.lost_documents.extend((file_path, f"{type(e).__name__}: {e}") for file_path in self.pending_paths)
+            raise
+        finally:
+            self.pending = []
+            self.pending_chunks = 0
+            self.pending_paths = []
+
+    def take_lost_documents(self):
+        """Collect the finished documents dropped by a failed commit (see Storage.take_lost_documents)."""
+        lost, self.lost_documents = self.lost_documents, []
+        return lost
+
+    def delete_document(self, file_path, file_name):
+        """
+        Delete the indexed versions of a document and their chunks.
+
+        Args:
+            file_path (str): The absolute path of the document.
+            file_name (str): Its name, matching documents indexed before paths were recorded.
+        """
+        stale = self.connection.execute(
+            "SELECT id, first_chunk, last_chunk FROM indexed_documents WHERE file_path = ? "
+            "UNION ALL SELECT id, first_chunk, last_chunk FROM indexed_documents WHERE file_path IS NULL AND file_name = ?",
+            (file_path, file_name)).fetchall()
+        for document_id, first_chunk, last_chunk in stale:
+            if first_chunk is not None:
+                self.connection.execute("DELETE FROM page_chunks WHERE rowid BETWEEN ? AND ?", (first_chunk, last_chunk))
+            else:
+                self.connection.execute("DELETE FROM page_chunks WHERE document_id = ?", (document_id,))
+            self.connection.execute("DELETE FROM indexed_documents WHERE id = ?", (document_id,))
+
+    def search(self, query, limit=10, raw=False):
+        """
+        Find the best matching page chunks. Buffered documents are written first, so they can be found.
+
+        Args:
+            query (str): The words to search for (all must match), or an FTS5 query when raw is set.
+            limit (int, optional): The maximum number of hits.
+            raw (bool, optional): Pass the query to FTS5 unchanged (phrases, OR, NEAR, prefix*).
+
+        Returns:
+            list: One dict per hit with 'file_path' (None for documents indexed before paths were recorded),
+                'file_name', 'page_number', 'char_offset', 'score' and 'snippet', best match first.
+        """
+        match = query if raw else quote_query(query)
+        if not match:
+            return []
+        self.flush()
+        rows = self.connection.execute(
+            f"""
+            SELECT d.file_path, d.file_name, c.page_number, c.char_offset, -bm25(page_chunks) AS score,
+                   snippet(page_chunks, 0, '[', ']', '...', {SNIPPET_TOKENS})
+            FROM page_chunks c JOIN indexed_documents d ON d.id = c.document_id
+            WHERE page_chunks MATCH ?
+            ORDER BY bm25(page_chunks)
+            LIMIT ?
+            """, (match, limit)).fetchall()
+        return [{'file_path': file_path, 'file_name': file_name, 'page_number': page_number, 'char_offset': char_offset,
+                 'score': score, 'snippet': snippet}
+                for file_path, file_name, page_number, char_offset, score, snippet in rows]
+
+    def close(self):
+        """Commit pending documents and close the index."""
+        if self.connection is not None:
+            try:
+                self.flush()
+            finally:
+                self.connection.close()
+                self.connection = None
@@ -1,16 +1,59 @@
 import mysql.connector  # For connecting to MySQL
 from mysql.connector import Error  # For handling MySQL errors
+from data_extractor.data_extractor import EXTRACTOR_VERSION, metadata_to_dict  # Extraction version and metadata helper
+from instrumentation.stage_metrics import measure  # Times the database round-trips
+from storage.storage import Storage  # Abstract storage interface
 
-class SQLStorage:
-    def __init__(self, db_config):
+# Number of rows sent per executemany call
+DEFAULT_BATCH_SIZE = 500
+
+# Columns locating rows on their page or slide, added by migrate_tables to tables created without them
+BBOX_COLUMNS = [('bbox_x0', 'DOUBLE'), ('bbox_top', 'DOUBLE'), ('bbox_x1', 'DOUBLE'), ('bbox_bottom', 'DOUBLE')]
+PAGE_COLUMNS = {
+    'extracted_texts': [('page_number', 'INT')],
+    'extracted_tables': [('page_number', 'INT'), ('table_index', 'INT')] + BBOX_COLUMNS,
+    'extracted_images': [('page_number', 'INT'), ('image_index', 'INT'), ('width', 'INT'), ('height', 'INT')] + BBOX_COLUMNS,
+    'extracted_links': [('page_number', 'INT')],
+}
+
+
+def page_index_name(table):
+    """Name of the composite (file_id, page_number) index of a table, e.g. idx_texts_file_id."""
+    return f"idx_{table.replace('extracted_', '')}_file_id"
+
+
+def bbox_values(bbox):
+    """Split an (x0, top, x1, bottom) bounding box into its four column values, NULLs when unknown."""
+    return tuple(float(value) for value in bbox) if bbox else (None, None, None, None)
+
+
+class SQLStorage(Storage):
+    placeholder = '%s'  # Parameter marker used by the database driver
+    database_error = Error  # Base exception raised by the database driver
+
+    def __init__(self, db_config, batch_size=DEFAULT_BATCH_SIZE, commit_every=1):
         """
         Initialize the SQLStorage class with database configuration and create connection.
         
         Args:
             db_config (dict): A dictionary containing the database credentials.
+            batch_size (int, optional): Number of rows buffered per table before they are written
+                with a single executemany call (a multi-row INSERT).
+            commit_every (int, optional): Number of documents written per transaction. Values above 1
+                buffer rows across documents; a failed document then rolls back the whole open transaction.
         """
         self.db_config = db_config  # Store the database configuration
+        self.batch_size = max(1, batch_size)
+        self.commit_every = max(1, commit_every)
         self.connection = None  # Connection object to be established
+        self.cursor = None  # Cursor of the document currently being stored
+        self.file_id = None  # ID of the document currently being stored
+        self.failed = False  # Whether an insert of the current document failed
+        self.error = None  # First database error of the current document, raised by end_document
+        self.pending_rows = {}  # Buffered rows keyed by INSERT statement
+        self.pending_documents = 0  # Documents written since the last commit
+        self.pending_paths = []  # Paths of the finished documents waiting for the next commit
+        self.lost_documents = []  # (file path, error) of finished documents rolled back before their commit
         self.create_connection()  # Establish the connection when the class is instantiated
 
     def create_connection(self):
@@ -31,44 +74,67 @@ class SQLStorage:
             print(f"Error connecting to MySQL: {e}")
             self.connection = None
 
-    def create_tables(self):
-        """Create tables for storing extracted data in the database."""
-        if self.connection is None:
-            print("No database connection. Cannot create tables.")
-            return
+    def create_statements(self):
+        """
+        Get the SQL statements that create the tables for storing extracted data.
 
-        # SQL statements to create necessary tables
-        create_statements = [
+        Returns:
+            list: The CREATE TABLE statements.
+        """
+        return [
             """
             CREATE TABLE IF NOT EXISTS extracted_files (
                 id INT AUTO_INCREMENT PRIMARY KEY,
                 file_name VARCHAR(255) NOT NULL,
                 file_type VARCHAR(50),
-                extracted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                content_hash CHAR(64),
+                extractor_version VARCHAR(32),
+                extracted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                INDEX idx_content_hash (content_hash, extractor_version)
             )
             """,
             """
             CREATE TABLE IF NOT EXISTS extracted_texts (
                 id INT AUTO_INCREMENT PRIMARY KEY,
                 file_id INT,
+                page_number INT,
                 text LONGTEXT,
-                FOREIGN KEY (file_id) REFERENCES extracted_files(id)
+                FOREIGN KEY (file_id) REFERENCES extracted_files(id),
+                INDEX idx_texts_file_id (file_id, page_number)
             )
             """,
             """
             CREATE TABLE IF NOT EXISTS extracted_tables (
                 id INT AUTO_INCREMENT PRIMARY KEY,
                 file_id INT,
+                page_number INT,
+                table_index INT,
+                bbox_x0 DOUBLE,
+                bbox_top DOUBLE,
+                bbox_x1 DOUBLE,
+                bbox_bottom DOUBLE,
                 table_data LONGTEXT,
-                FOREIGN KEY (file_id) REFERENCES extracted_files(id)
+                FOREIGN KEY (file_id) REFERENCES extracted_files(id),
+                INDEX idx_tables_file_id (file_id, page_number)
             )
             """,
             """
             CREATE TABLE IF NOT EXISTS extracted_images (
                 id INT AUTO_INCREMENT PRIMARY KEY,
                 file_id INT,
+                page_number INT,
+                image_index INT,
+                width INT,
+                height INT,
+                bbox_x0 DOUBLE,
+                bbox_top DOUBLE,
+                bbox_x1 DOUBLE,
+                bbox_bottom DOUBLE,
+                image_hash CHAR(64),
                 image_path VARCHAR(255),
-                FOREIGN KEY (file_id) REFERENCES extracted_files(id)
+                FOREIGN KEY (file_id) REFERENCES extracted_files(id),
+                INDEX idx_images_file_id (file_id, page_number),
+                INDEX idx_image_hash (image_hash)
             )
             """,
             """
@@ -84,57 +150,295 @@ class SQLStorage:
             CREATE TABLE IF NOT EXISTS extracted_links (
                 id INT AUTO_INCREMENT PRIMARY KEY,
                 file_id INT,
+                page_number INT,
                 link VARCHAR(255),
-                FOREIGN KEY (file_id) REFERENCES extracted_files(id)
+                FOREIGN KEY (file_id) REFERENCES extracted_files(id),
+                INDEX idx_links_file_id (file_id, page_number)
             )
             """
         ]
 
+    def create_tables(self):
+        """Create tables for storing extracted data in the database."""
+        if self.connection is None:
+            print("No database connection. Cannot create tables.")
+            return
+
         cursor = self.connection.cursor()  # Cursor to execute SQL commands
         try:
             # Execute each SQL statement to create tables
-            for statement in create_statements:
+            for statement in self.create_statements():
                 cursor.execute(statement)
             self.connection.commit()  # Commit changes to the database
+            self.migrate_tables(cursor)
             print("Tables created successfully.")
-        except Error as e:
+        except self.database_error as e:
             # Handle errors during table creation
             print(f"Error creating tables: {e}")
         finally:
             cursor.close()  # Close the cursor after operation
 
-    def store_data(self, extractor):
-        """Store extracted data from the extractor into the database."""
+    def migrate_tables(self, cursor):
+        """
+        Add the content hash and page columns to tables created before they existed.
+        Rows stored before the page columns keep NULL pages; the extractor version bump re-extracts them.
+
+        Args:
+            cursor: Database cursor to execute SQL commands.
+        """
+        migrations = [
+            "ALTER TABLE extracted_files ADD COLUMN content_hash CHAR(64)",
+            "ALTER TABLE extracted_files ADD COLUMN extractor_version VARCHAR(32)",
+            "CREATE INDEX idx_content_hash ON extracted_files (content_hash, extractor_version)",
+            "ALTER TABLE extracted_images ADD COLUMN image_hash CHAR(64)",
+            "CREATE INDEX idx_image_hash ON extracted_images (image_hash)",
+        ]
+        for table, columns in PAGE_COLUMNS.items():
+            migrations += [f"ALTER TABLE {table} ADD COLUMN {column} {column_type}" for column, column_type in columns]
+            migrations.append(f"CREATE INDEX {page_index_name(table)} ON {table} (file_id, page_number)")
+        for statement in migrations:
+            try:
+                cursor.execute(statement)
+            except self.database_error:
+                pass  # Column or index already exists
+        self.connection.commit()
+
+    def is_processed(self, file_name, content_hash, extractor_version, file_path=None):
+        """
+        Check whether a document with this content hash was already stored by this extractor version.
+
+        Args:
+            file_name (str): The name of the file (documents are matched by content, not name).
+            content_hash (str): The SHA-256 hash of the file contents.
+            extractor_version (str): The version of the extraction logic.
+            file_path (str, optional): The path of the file, for storages that key documents by path.
+
+        Returns:
+            bool: True if the document is already in the database. Without a connection nothing
+            can be stored, so the database never forces a re-extraction.
+        """
+        if self.connection is None:
+            return True
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(
+                self.format_query("SELECT 1 FROM extracted_files WHERE content_hash = %s AND extractor_version = %s LIMIT 1"),
+                (content_hash, extractor_version)
+            )
+            return cursor.fetchone() is not None
+        except self.database_error as e:
+            print(f"Error checking processed files: {e}")
+            return False
+        finally:
+            cursor.close()
+
+    def begin_document(self, extractor):
+        """
+        Insert the file record and open the cursor used for the pages of the document.
+
+        Args:
+            extractor: The extractor object containing extracted data.
+        """
+        self.cursor = None
+        self.file_id = None
         if self.connection is None:
             print("No database connection. Cannot store data.")
             return
 
         file_name = extractor.get_file_name()  # Get the file name from the extractor
         file_type = extractor.__class__.__name__  # Get the file type (extractor class name)
+        content_hash = extractor.file_loader.content_hash()  # Identify the document by its contents
+        extractor_version = extractor.version  # Extractor and engine version the data comes from
 
-        cursor = self.connection.cursor()  # Cursor for executing SQL commands
+        self.cursor = self.connection.cursor()  # Cursor for executing SQL commands
+        self.failed = False  # Set when an insert fails so the document is rolled back
+        self.error = None
         try:
             # Insert file metadata and get the generated file ID
-            file_id = self.insert_file(cursor, file_name, file_type)
+            self.file_id = self.insert_file(self.cursor, file_name, file_type, content_hash, extractor_version)
+        except self.database_error as e:
+            print(f"Error storing data: {e}")
+            self.failed = True
+            self.error = e
+
+    def store_page(self, page):
+        """
+        Insert the text, tables, images and links of one page as it arrives.
+
+        Args:
+            page (PageRecord): The text, tables, images and links of one page.
+        """
+        if self.cursor is None:
+            return  # No database connection
+        self.run_insert(self.insert_text, page.page_number, page.text)
+        self.run_insert(self.insert_tables, page.page_number, page.tables, page.table_boxes)
+        self.run_insert(self.insert_images, page.page_number, page.images)
+        self.run_insert(self.insert_links, page.page_number, page.links)
+
+    def end_document(self, extractor):
+        """
+        Insert the document metadata and commit, or roll back if any insert failed.
+
+        Args:
+            extractor: The extractor object containing extracted data.
 
-            # Insert the extracted data into the respective tables
-            self.insert_text(cursor, extractor, file_id)
-            self.insert_tables(cursor, extractor, file_id)
-            self.insert_images(cursor, extractor, file_id)
-            self.insert_metadata(cursor, extractor, file_id)
-            self.insert_links(cursor, extractor, file_id)
+        Raises:
+            Error: The database error of a failed insert or commit, after rolling back, so the
+                document is reported as failed. Documents buffered before it are rolled back too
+                and recorded as lost (see take_lost_documents).
+        """
+        if self.cursor is None:
+            return
+        self.run_insert(self.insert_metadata, extractor.extract_metadata())
+        try:
+            if self.failed:
+                raise self.error
+            self.pending_documents += 1
+            if self.pending_documents >= self.commit_every:
+                self.commit(self.cursor)
+            else:
+                self.pending_paths.append(extractor.file_loader.file_path)  # Committed with a later document
+        except self.database_error as e:
+            self.discard_pending(f"{type(e).__name__}: {e}")  # Rollback changes in case of an error
+            raise
+        finally:
+            self.cursor.close()  # Close the cursor
+            self.cursor = None
 
+    def abort_document(self):
+        """
+        Roll back the document being stored after extraction or another storage failed, so its file
+        record and buffered rows are never committed with the next document. As with a failed insert,
+        documents still buffered in the open transaction (commit_every above 1) are rolled back too,
+        and recorded as lost.
+        """
+        if self.cursor is None:
+            return  # No document in progress
+        try:
+            self.discard_pending("Rolled back with a document that failed to store")
+        except self.database_error as e:
+            print(f"Error rolling back document: {e}")
+        finally:
+            self.cursor.close()
+            self.cursor = None
+            self.file_id = None
+
+    def discard_pending(self, error):
+        """
+        Drop the buffered rows and roll back the open transaction, recording the finished documents
+        it held as lost.
+
+        Args:
+            error (str): Why the documents were rolled back, reported with each of them.
+        """
+        self.lost_documents.extend((file_path, error) for file_path in self.pending_paths)
+        self.pending_paths = []
+        self.pending_rows.clear()
+        self.pending_documents = 0
+        self.connection.rollback()
+
+    def take_lost_documents(self):
+        """Collect the finished documents rolled back before their commit (see Storage.take_lost_documents)."""
+        lost, self.lost_documents = self.lost_documents, []
+        return lost
+
+    def add_rows(self, cursor, statement, rows):
+        """
+        Buffer rows for an INSERT statement and write them once the batch is full.
+
+        Args:
+            cursor: Database cursor to execute SQL commands.
+            statement (str): The parameterized INSERT statement.
+            rows (list): The parameter tuples to insert.
+        """
+        if not rows:
+            return
+        pending = self.pending_rows.setdefault(statement, [])
+        pending.extend(rows)
+        if len(pending) >= self.batch_size:
+            self.flush_rows(cursor)
+
+    def flush_rows(self, cursor):
+        """
+        Write every buffered row, one executemany call per statement and batch.
+
+        Args:
+            cursor: Database cursor to execute SQL commands.
+        """
+        for statement, rows in self.pending_rows.items():
+            for start in range(0, len(rows), self.batch_size):
+                with measure(self.stage_metrics, 'sql.executemany') as counts:
+                    batch = rows[start:start + self.batch_size]
+                    cursor.executemany(self.format_query(statement), batch)
+                    counts['items'] = len(batch)
+        self.pending_rows.clear()
+
+    def commit(self, cursor):
+        """
+        Write the buffered rows and commit the open transaction.
+
+        Args:
+            cursor: Database cursor to execute SQL commands.
+        """
+        self.flush_rows(cursor)
+        with measure(self.stage_metrics, 'sql.commit'):
             self.connection.commit()  # Commit the transaction
-            print("Data stored successfully.")
+        print(f"Data stored successfully ({self.pending_documents} document(s)).")
+        self.pending_documents = 0
+        self.pending_paths = []
 
-        except Error as e:
-            # Handle any errors during data insertion
-            print(f"Error storing data: {e}")
-            self.connection.rollback()  # Rollback changes in case of an error
+    def flush(self):
+        """
+        Commit documents still buffered when commit_every is above 1.
+
+        Raises:
+            Error: The database error of a failed commit, after rolling back the buffered documents
+                and recording them as lost.
+        """
+        if self.connection is None or not (self.pending_documents or self.pending_rows):
+            return
+        cursor = self.connection.cursor()
+        try:
+            self.commit(cursor)
+        except self.database_error as e:
+            self.discard_pending(f"{type(e).__name__}: {e}")
+            raise
         finally:
-            cursor.close()  # Close the cursor
+            cursor.close()
+
+    def format_query(self, statement):
+        """
+        Adapt a statement written with %s parameter markers to the driver's placeholder.
+
+        Args:
+            statement (str): The SQL statement.
+
+        Returns:
+            str: The statement using this backend's placeholder.
+        """
+        if self.placeholder == '%s':
+            return statement
+        return statement.replace('%s', self.placeholder)
+
+    def run_insert(self, insert, *args):
+        """
+        Run one insert_* method for the current document, recording failures for end_document to raise.
+
+        Args:
+            insert (callable): The insert method to run.
+            *args: The data passed to the insert method after the cursor and file ID.
+        """
+        if self.failed:
+            return  # The document is already being rolled back
+        try:
+            insert(self.cursor, self.file_id, *args)
+        except self.database_error as e:
+            # Handle any errors during data insertion; end_document rolls back and raises the error
+            print(f"Error storing data: {e}")
+            self.failed = True
+            self.error = e
 
-    def insert_file(self, cursor, file_name, file_type):
+    def insert_file(self, cursor, file_name, file_type, content_hash=None, extractor_version=EXTRACTOR_VERSION):
         """
         Insert the file record into the database and return the generated file_id.
 
@@ -142,102 +446,104 @@ class SQLStorage:
             cursor: Database cursor to execute SQL commands.
             file_name (str): The name of the file.
             file_type (str): The type of the file.
+            content_hash (str, optional): The SHA-256 hash of the file contents.
+            extractor_version (str, optional): The extractor and engine version of the extracted data.
 
         Returns:
             int: The ID of the inserted file.
         """
         cursor.execute(
-            "INSERT INTO extracted_files (file_name, file_type) VALUES (%s, %s)",
-            (file_name, file_type)
+            self.format_query("INSERT INTO extracted_files (file_name, file_type, content_hash, extractor_version) VALUES (%s, %s, %s, %s)"),
+            (file_name, file_type, content_hash, extractor_version)
         )
         return cursor.lastrowid  # Return the ID of the inserted file
 
-    def insert_text(self, cursor, extractor, file_id):
+    def insert_text(self, cursor, file_id, page_number, text):
         """
-        Insert extracted text into the database.
+        Insert extracted text of a page into the database, one row per page or slide.
 
         Args:
             cursor: Database cursor to execute SQL commands.
-            extractor: The extractor object containing extracted data.
             file_id (int): The ID of the file.
+            page_number (int): The 1-based page or slide number.
+            text (str): The extracted text.
         """
-        text = extractor.extract_text()  # Get extracted text from the extractor
         if text:
-            cursor.execute(
-                "INSERT INTO extracted_texts (file_id, text) VALUES (%s, %s)",
-                (file_id, text)
-            )
+            self.add_rows(cursor, "INSERT INTO extracted_texts (file_id, page_number, text) VALUES (%s, %s, %s)",
+                          [(file_id, page_number, text)])
 
-    def insert_tables(self, cursor, extractor, file_id):
+    def insert_tables(self, cursor, file_id, page_number, tables, table_boxes=None):
         """
-        Insert extracted tables into the database.
+        Insert extracted tables of a page into the database.
 
         Args:
             cursor: Database cursor to execute SQL commands.
-            extractor: The extractor object containing extracted data.
             file_id (int): The ID of the file.
+            page_number (int): The 1-based page or slide number.
+            tables (list): The extracted tables, each a list of rows.
+            table_boxes (list, optional): The (x0, top, x1, bottom) bounding box of each table, if known.
         """
-        tables = extractor.extract_tables()  # Get extracted tables from the extractor
-        for table in tables:
+        table_boxes = table_boxes or []
+        rows = []
+        for table_index, table in enumerate(tables):
             # Convert the table data to a comma-separated string
-            table_data = '\n'.join([','.join(row) for row in table])
-            cursor.execute(
-                "INSERT INTO extracted_tables (file_id, table_data) VALUES (%s, %s)",
-                (file_id, table_data)
-            )
+            table_data = '\n'.join([','.join(cell or '' for cell in row) for row in table])
+            bbox = table_boxes[table_index] if table_index < len(table_boxes) else None
+            rows.append((file_id, page_number, table_index + 1) + bbox_values(bbox) + (table_data,))
+        self.add_rows(cursor, "INSERT INTO extracted_tables (file_id, page_number, table_index, bbox_x0, bbox_top, "
+                              "bbox_x1, bbox_bottom, table_data) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)", rows)
 
-    def insert_images(self, cursor, extractor, file_id):
+    def insert_images(self, cursor, file_id, page_number, images):
         """
-        Insert extracted images into the database.
+        Insert extracted images of a page into the database.
 
         Args:
             cursor: Database cursor to execute SQL commands.
-            extractor: The extractor object containing extracted data.
             file_id (int): The ID of the file.
+            page_number (int): The 1-based page or slide number.
+            images (list): The saved images as dicts with their 'index', 'width', 'height', 'bbox',
+                content 'hash' and stored 'path'.
         """
-        images = extractor.extract_images()  # Get extracted images from the extractor
-        for image_path in images:
-            cursor.execute(
-                "INSERT INTO extracted_images (file_id, image_path) VALUES (%s, %s)",
-                (file_id, image_path)
-            )
+        rows = [(file_id, page_number, image['index'], image['width'], image['height']) + bbox_values(image['bbox'])
+                + (image['hash'], image['path']) for image in images]
+        self.add_rows(cursor, "INSERT INTO extracted_images (file_id, page_number, image_index, width, height, bbox_x0, "
+                              "bbox_top, bbox_x1, bbox_bottom, image_hash, image_path) "
+                              "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)", rows)
 
-    def insert_metadata(self, cursor, extractor, file_id):
+    def insert_metadata(self, cursor, file_id, metadata):
         """
         Insert extracted metadata into the database.
 
         Args:
             cursor: Database cursor to execute SQL commands.
-            extractor: The extractor object containing extracted data.
             file_id (int): The ID of the file.
+            metadata: The extracted metadata (dict or DOCX/PPTX core properties).
         """
-        metadata = extractor.extract_metadata()  # Get extracted metadata from the extractor
-        if isinstance(metadata, dict):
-            for key, value in metadata.items():
-                if value:  # Only insert non-empty metadata
-                    cursor.execute(
-                        "INSERT INTO extracted_metadata (file_id, metadata_key, metadata_value) VALUES (%s, %s, %s)",
-                        (file_id, key, value)
-                    )
+        rows = [(file_id, key, str(value)) for key, value in metadata_to_dict(metadata).items()]
+        self.add_rows(cursor, "INSERT INTO extracted_metadata (file_id, metadata_key, metadata_value) VALUES (%s, %s, %s)", rows)
 
-    def insert_links(self, cursor, extractor, file_id):
+    def insert_links(self, cursor, file_id, page_number, links):
         """
-        Insert extracted links into the database.
+        Insert extracted links of a page into the database.
 
         Args:
             cursor: Database cursor to execute SQL commands.
-            extractor: The extractor object containing extracted data.
             file_id (int): The ID of the file.
+            page_number (int): The 1-based page or slide number.
+            links (list): The extracted links.
         """
-        links = extractor.extract_links()  # Get extracted links from the extractor
-        for link in links:
-            cursor.execute(
-                "INSERT INTO extracted_links (file_id, link) VALUES (%s, %s)",
-                (file_id, link)
-            )
+        rows = [(file_id, page_number, link) for link in links]
+        self.add_rows(cursor, "INSERT INTO extracted_links (file_id, page_number, link) VALUES (%s, %s, %s)", rows)
+
+    def close(self):
+        """Commit buffered rows and close the database connection."""
+        self.close_connection()
 
     def close_connection(self):
         """Close the database connection."""
-        if self.connection and self.connection.is_connected():
-            self.connection.close()  # Close the connection if it is open
-            print("Database connection closed.")
+        try:
+            self.flush()  # Commit any documents still buffered
+        finally:
+            if self.connection and self.connection.is_connected():
+                self.connection.close()  # Close the connection if it is open
+                print("Database connection closed.")
@@ -0,0 +1,260 @@
+import os  # For creating the database folder
+import sqlite3  # Embedded SQL database
+from instrumentation.stage_metrics import measure  # Times the database round-trips
+from storage.sql_storage import PAGE_COLUMNS, SQLStorage, page_index_name  # Base SQL storage with the inserts and batching
+
+# Documents written per transaction by default; SQLite commits are expensive, so batch them
+DEFAULT_SQLITE_COMMIT_EVERY = 50
+
+# Buffered rows that trigger a commit before commit_every documents are reached, bounding memory
+DEFAULT_SQLITE_MAX_PENDING_ROWS = 50000
+
+# SQL storage backed by an embedded SQLite database with the same schema as SQLStorage.
+# SQLite allows one writer per database, so rows are buffered in memory and each batch is written in a
+# short BEGIN IMMEDIATE ... COMMIT: the write lock is never held while documents are being extracted,
+# and several batch workers can share the database file.
+class SQLiteStorage(SQLStorage):
+    placeholder = '?'  # sqlite3 uses qmark parameters
+    database_error = sqlite3.Error  # Base exception raised by sqlite3
+
+    def __init__(self, database_path, commit_every=DEFAULT_SQLITE_COMMIT_EVERY,
+                 max_pending_rows=DEFAULT_SQLITE_MAX_PENDING_ROWS, **kwargs):
+        """
+        Initialize the SQLiteStorage and open the database file.
+
+        Args:
+            database_path (str): Path of the SQLite database file (':memory:' for an in-memory database).
+            commit_every (int, optional): Number of documents written per transaction.
+            max_pending_rows (int, optional): Buffered rows after which the finished documents are written
+                even if fewer than commit_every are buffered.
+            **kwargs: batch_size, see SQLStorage.
+        """
+        self.max_pending_rows = max_pending_rows
+        self.pending_files = []  # File records of the buffered documents; their rows refer to them by index
+        self.document_start = None  # Buffered rows per statement when the current document began
+        super().__init__({'database': database_path}, commit_every=commit_every, **kwargs)
+
+    def create_connection(self):
+        """Open the SQLite database in WAL mode so readers do not block the writer."""
+        database_path = self.db_config['database']
+        try:
+            if database_path != ':memory:' and os.path.dirname(database_path):
+                os.makedirs(os.path.dirname(database_path), exist_ok=True)
+            # Wait for other writers instead of failing; the connection may be used by a pipeline writer thread
+            connection = sqlite3.connect(database_path, timeout=30, check_same_thread=False)
+            connection.isolation_level = None  # No implicit transactions; commit() opens a short explicit one
+            connection.execute("PRAGMA journal_mode=WAL")  # Write-ahead log for fast appends
+            connection.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL and far fewer fsyncs
+            connection.execute("PRAGMA foreign_keys=ON")
+            self.connection = connection
+            print(f"Connection to SQLite database {database_path} established")
+        except sqlite3.Error as e:
+            print(f"Error opening SQLite database: {e}")
+            self.connection = None
+
+    def create_statements(self):
+        """
+        Get the SQLite statements that create the tables and their file_id or (file_id, page_number) indexes.
+
+        Returns:
+            list: The CREATE TABLE and CREATE INDEX statements.
+        """
+        return [
+            """
+            CREATE TABLE IF NOT EXISTS extracted_files (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                file_name TEXT NOT NULL,
+                file_type TEXT,
+                content_hash TEXT,
+                extractor_version TEXT,
+                extracted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_content_hash ON extracted_files (content_hash, extractor_version)",
+            """
+            CREATE TABLE IF NOT EXISTS extracted_texts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                file_id INTEGER REFERENCES extracted_files(id),
+                page_number INTEGER,
+                text TEXT
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_texts_file_id ON extracted_texts (file_id, page_number)",
+            """
+            CREATE TABLE IF NOT EXISTS extracted_tables (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                file_id INTEGER REFERENCES extracted_files(id),
+                page_number INTEGER,
+                table_index INTEGER,
+                bbox_x0 REAL,
+                bbox_top REAL,
+                bbox_x1 REAL,
+                bbox_bottom REAL,
+                table_data TEXT
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_tables_file_id ON extracted_tables (file_id, page_number)",
+            """
+            CREATE TABLE IF NOT EXISTS extracted_images (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                file_id INTEGER REFERENCES extracted_files(id),
+                page_number INTEGER,
+                image_index INTEGER,
+                width INTEGER,
+                height INTEGER,
+                bbox_x0 REAL,
+                bbox_top REAL,
+                bbox_x1 REAL,
+                bbox_bottom REAL,
+                image_hash TEXT,
+                image_path TEXT
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_images_file_id ON extracted_images (file_id, page_number)",
+            "CREATE INDEX IF NOT EXISTS idx_image_hash ON extracted_images (image_hash)",
+            """
+            CREATE TABLE IF NOT EXISTS extracted_metadata (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                file_id INTEGER REFERENCES extracted_files(id),
+                metadata_key TEXT,
+                metadata_value TEXT
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_metadata_file_id ON extracted_metadata (file_id)",
+            """
+            CREATE TABLE IF NOT EXISTS extracted_links (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                file_id INTEGER REFERENCES extracted_files(id),
+                page_number INTEGER,
+                link TEXT
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_links_file_id ON extracted_links (file_id, page_number)",
+        ]
+
+    def migrate_tables(self, cursor):
+        """
+        Add the page columns to tables created before they existed and widen their file_id indexes
+        to (file_id, page_number).
+
+        Args:
+            cursor: Database cursor to execute SQL commands.
+        """
+        for table, columns in PAGE_COLUMNS.items():
+            existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+            for column, column_type in columns:
+                if column not in existing:
+                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+            index = page_index_name(table)
+            if [row[2] for row in cursor.execute(f"PRAGMA index_info({index})")] != ['file_id', 'page_number']:
+                cursor.execute(f"DROP INDEX IF EXISTS {index}")
+                cursor.execute(f"CREATE INDEX {index} ON {table} (file_id, page_number)")
+        self.connection.commit()
+
+    def is_processed(self, file_name, content_hash, extractor_version, file_path=None):
+        """Check the buffered documents, then the database (see SQLStorage.is_processed)."""
+        if any(file[2:] == (content_hash, extractor_version) for file in self.pending_files):
+            return True
+        return super().is_processed(file_name, content_hash, extractor_version, file_path)
+
+    def begin_document(self, extractor):
+        """
+        Buffer the file record of a new document. Nothing is written, so no lock is taken, until commit.
+
+        Args:
+            extractor: The extractor object containing extracted data.
+        """
+        self.cursor = None
+        self.file_id = None
+        self.failed = False
+        if self.connection is None:
+            print("No database connection. Cannot store data.")
+            return
+        self.document_start = {statement: len(rows) for statement, rows in self.pending_rows.items()}
+        self.pending_files.append((extractor.get_file_name(), extractor.__class__.__name__,
+                                   extractor.file_loader.content_hash(), extractor.version))
+        self.file_id = len(self.pending_files) - 1  # Replaced by the generated ID when the batch is written
+        self.cursor = self.connection.cursor()
+
+    def add_rows(self, cursor, statement, rows):
+        """Buffer rows for an INSERT statement; they are written by commit."""
+        if rows:
+            self.pending_rows.setdefault(statement, []).extend(rows)
+
+    def end_document(self, extractor):
+        """
+        Buffer the document metadata and write the batch once commit_every documents or
+        max_pending_rows rows are buffered.
+
+        Args:
+            extractor: The extractor object containing extracted data.
+
+        Raises:
+            sqlite3.Error: If writing the batch fails (see SQLStorage.flush).
+        """
+        if self.cursor is None:
+            return
+        self.run_insert(self.insert_metadata, extractor.extract_metadata())
+        self.cursor.close()
+        self.cursor = None
+        self.document_start = None
+        self.pending_documents += 1
+        buffered = sum(len(rows) for rows in self.pending_rows.values())
+        if self.pending_documents >= self.commit_every or buffered >= self.max_pending_rows:
+            self.flush()  # Raises for this document; the documents buffered before it are recorded as lost
+        else:
+            self.pending_paths.append(extractor.file_loader.file_path)
+
+    def abort_document(self):
+        """Drop the file record and rows of the current document, keeping the documents buffered before it."""
+        if self.cursor is None:
+            return  # No document in progress
+        for statement in list(self.pending_rows):
+            del self.pending_rows[statement][self.document_start.get(statement, 0):]
+            if not self.pending_rows[statement]:
+                del self.pending_rows[statement]
+        self.pending_files.pop()
+        self.cursor.close()
+        self.cursor = None
+        self.file_id = None
+        self.document_start = None
+
+    def commit(self, cursor):
+        """
+        Write the buffered documents in one short write transaction: insert their file records,
+        then their rows with the generated file IDs.
+
+        Args:
+            cursor: Database cursor to execute SQL commands.
+        """
+        with measure(self.stage_metrics, 'sql.commit'):
+            cursor.execute("BEGIN IMMEDIATE")  # Take the write lock now rather than fail halfway
+            file_ids = [self.insert_file(cursor, *file) for file in self.pending_files]
+            for statement, rows in self.pending_rows.items():
+                rows = [(file_ids[row[0]],) + row[1:] for row in rows]
+                for start in range(0, len(rows), self.batch_size):
+                    with measure(self.stage_metrics, 'sql.executemany') as counts:
+                        batch = rows[start:start + self.batch_size]
+                        cursor.executemany(self.format_query(statement), batch)
+                        counts['items'] = len(batch)
+            cursor.execute("COMMIT")
+        print(f"Data stored successfully ({self.pending_documents} document(s)).")
+        self.pending_files = []
+        self.pending_rows.clear()
+        self.pending_documents = 0
+        self.pending_paths = []
+
+    def discard_pending(self, error):
+        """Drop the buffered documents, recording them as lost, and roll back the write transaction if it is open."""
+        self.pending_files = []
+        super().discard_pending(error)
+
+    def close_connection(self):
+        """Commit buffered documents and close the database."""
+        try:
+            self.flush()  # Commit any documents still buffered
+        finally:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+                print("Database connection closed.")
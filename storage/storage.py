@@ -1,7 +1,120 @@
 # storage/storage.py
 from abc import ABC, abstractmethod
+from instrumentation.stage_metrics import measure  # Per-stage timing
 
 class Storage(ABC):
+    stream = False  # Streams receive every document another storage stores instead of tracking their own
+    stage_metrics = None  # StageMetrics of the document being stored, set by store_document
+    writer_threads = 1  # Pipeline writer threads storing documents concurrently, each keeping its own state
+
+    def store_data(self, extractor):
+        """
+        Stream the pages of the extractor into this storage, one page at a time.
+
+        Args:
+            extractor (UniversalDataExtractor): The data extractor that provides the extracted data.
+        """
+        store_document(extractor, [self])
+
+    def is_processed(self, file_name, content_hash, extractor_version, file_path=None):
+        """
+        Check whether this storage already holds the document at this content hash and extractor version.
+
+        Args:
+            file_name (str): The name of the file.
+            content_hash (str): The SHA-256 hash of the file contents.
+            extractor_version (str): The version of the extraction logic.
+            file_path (str, optional): The path of the file, for storages that key documents by path.
+
+        Returns:
+            bool: True if the document can be skipped for this storage.
+        """
+        return False
+
+    @abstractmethod
+    def begin_document(self, extractor):
+        """Prepare the storage for a new document (create folders, insert the file record)."""
+        pass
+
+    @abstractmethod
+    def store_page(self, page):
+        """Store the text, tables, images and links of a single PageRecord."""
+        pass
+
+    @abstractmethod
+    def end_document(self, extractor):
+        """Store document-level data (metadata) and finish the document."""
+        pass
+
     @abstractmethod
-    def store_data(self):
+    def abort_document(self):
+        """Drop the document being stored after a failure, so none of it is kept or marked as processed."""
         pass
+
+    def flush(self):
+        """Write anything still buffered, keeping the storage open."""
+        pass
+
+    def take_lost_documents(self):
+        """
+        Collect the documents this storage finished but then failed to write, because the batch
+        they were buffered in failed to commit or was rolled back with a later document.
+
+        Returns:
+            list: (file path, error) of every such document since the last call.
+        """
+        return []
+
+    def close(self):
+        """Write anything still buffered and release the storage's resources."""
+        pass
+
+
+def store_document(extractor, storages):
+    """
+    Walk the document once and hand every page to each storage as it arrives,
+    so memory stays bounded by a single page however long the document is.
+    If extraction or a storage fails partway, every storage that has not finished the document aborts it.
+
+    Args:
+        extractor (UniversalDataExtractor): The data extractor that provides the pages.
+        storages (list): The Storage objects that should receive the document.
+    """
+    unfinished = list(storages)  # Storages that have begun or will begin the document but not ended it
+    try:
+        for storage in storages:
+            storage.stage_metrics = extractor.metrics
+            with measure(extractor.metrics, storage_stage(storage, 'begin_document')):
+                storage.begin_document(extractor)
+        for page in extractor.iter_pages():
+            for storage in storages:
+                with measure(extractor.metrics, storage_stage(storage, 'store_page')) as counts:
+                    storage.store_page(page)
+                    counts['items'] = 1
+        for storage in storages:
+            with measure(extractor.metrics, storage_stage(storage, 'end_document')):
+                storage.end_document(extractor)
+            unfinished.remove(storage)
+    except Exception:
+        for storage in unfinished:
+            abort_document(storage)
+        raise
+
+
+def abort_document(storage):
+    """
+    Abort the current document of a storage, reporting instead of raising a second failure,
+    so the error that stopped the document is the one that propagates.
+
+    Args:
+        storage (Storage): The storage whose document failed.
+    """
+    try:
+        storage.abort_document()
+    except Exception as e:
+        print(f"Error aborting document in {type(storage).__name__}: {type(e).__name__}: {e}")
+
+
+def storage_stage(storage, step):
+    """Name the stage metric of a storage step, e.g. 'storage.FileStorage.store_page'."""
+    return f"storage.{type(storage).__name__}.{step}"
@@ -0,0 +1,36 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from data_extractor.data_extractor import UniversalDataExtractor
+from file_loader.concrete_file_loader import Loader
+
+TEST_FILES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test_files")
+
+# What the stubbed UniversalDataExtractor.save_image returns for every image
+STUB_IMAGE = ("0" * 64, "image.png")
+
+
+def load_extractor(file_path, file_type, image_dir, **options):
+    loader = Loader(os.path.join(TEST_FILES, file_path), file_type)
+    loader.load_file()
+    return UniversalDataExtractor(loader, image_dir=image_dir, **options)
+
+
+class ExtractorTestCase(unittest.TestCase):
+    """Test case giving each test its own image store, removed when the test ends."""
+
+    # Replace UniversalDataExtractor.save_image with a stub returning STUB_IMAGE for every test
+    stub_save_image = False
+
+    def setUp(self):
+        self.image_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.image_dir.cleanup)
+        if self.stub_save_image:
+            patcher = patch.object(UniversalDataExtractor, "save_image", return_value=STUB_IMAGE)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def load_extractor(self, file_path, file_type, **options):
+        return load_extractor(file_path, file_type, self.image_dir.name, **options)
@@ -0,0 +1,119 @@
+import os
+import csv
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from batch import runner
+from batch.discovery import collect_files
+from batch.runner import BatchRunner
+from batch.scheduler import DocumentScheduler, estimate_cost, max_workers_for_memory, order_largest_first
+from benchmarks.synthetic_corpus import generate_document
+from storage.sqlite_storage import SQLiteStorage
+
+from extractor_helpers import TEST_FILES
+
+
+class TestDiscovery(unittest.TestCase):
+
+    def test_directory_is_walked_recursively(self):
+        files = collect_files([TEST_FILES])
+        self.assertEqual(sorted(os.path.basename(path) for path in files), ["sample.docx", "sample.pdf", "sample.pptx"])
+
+    def test_glob_and_manifest_are_deduplicated(self):
+        with tempfile.NamedTemporaryFile('w', suffix=".txt", delete=False) as manifest:
+            manifest.write("# nightly run\n\n")
+            manifest.write(os.path.join(TEST_FILES, "PDF", "sample.pdf") + "\n")
+        self.addCleanup(os.remove, manifest.name)
+        files = collect_files([os.path.join(TEST_FILES, "**", "*.pdf")], manifest.name)
+        self.assertEqual(files, [os.path.join(TEST_FILES, "PDF", "sample.pdf")])
+
+
+class TestScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.corpus_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.corpus_dir.cleanup)
+
+    def test_largest_documents_come_first(self):
+        files = collect_files([TEST_FILES])
+        ordered = order_largest_first(files)
+        costs = [estimate_cost(path) for path in ordered]
+        self.assertEqual(costs, sorted(costs, reverse=True))
+
+    def test_cost_follows_pages_rather_than_bytes(self):
+        long_pdf = generate_document(self.corpus_dir.name, "pdf", 12, tables=0, images=0, links=0)
+        slides = os.path.join(TEST_FILES, "PPT", "sample.pptx")  # Larger file, two slides
+        self.assertLess(os.path.getsize(long_pdf), os.path.getsize(slides))
+        self.assertEqual(order_largest_first([slides, long_pdf]), [long_pdf, slides])
+
+    def test_oversized_documents_are_skipped_without_processing(self):
+        long_pdf = generate_document(self.corpus_dir.name, "pdf", 12, tables=0, images=0, links=0)
+        [result] = DocumentScheduler(max_pages=5).run([long_pdf])
+        self.assertEqual(result["status"], "oversized")
+        self.assertEqual(result["error"], "12 pages, over the limit of 5")
+
+    def test_workers_are_capped_by_memory_budget(self):
+        self.assertEqual(max_workers_for_memory(8), 8)
+        self.assertEqual(max_workers_for_memory(8, memory_budget_mb=2048, worker_memory_mb=512), 4)
+        self.assertEqual(max_workers_for_memory(8, memory_budget_mb=100, worker_memory_mb=512), 1)
+
+
+class TestBatchRunner(unittest.TestCase):
+
+    def test_storage_failures_reach_the_error_report(self):
+        output_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(output_dir.cleanup)
+        error_report = os.path.join(output_dir.name, "errors.csv")
+        results = [
+            {'file_path': "a.pdf", 'status': 'ok', 'seconds': 0.1, 'bytes': 10, 'error': '', 'stages': {},
+             'storage_errors': []},
+            {'file_path': "b.pdf", 'status': 'ok', 'seconds': 0.1, 'bytes': 10, 'error': '', 'stages': {},
+             'storage_errors': [("a.pdf", "SQLiteStorage", "OperationalError: database is locked")]},
+        ]
+        with patch.object(DocumentScheduler, "run", return_value=iter(results)):
+            reported = BatchRunner(error_report=error_report).run(["a.pdf", "b.pdf"])
+        self.assertEqual([result['status'] for result in reported], ['failed', 'ok'])
+        with open(error_report, newline='', encoding='utf-8') as report:
+            rows = list(csv.reader(report))
+        self.assertEqual(rows[1], ["a.pdf", "SQLiteStorage: OperationalError: database is locked"])
+
+    def test_failed_batch_commit_fails_every_document_in_it(self):
+        for commit_every in ["2", "50"]:  # Committed with the second document, or by the final flush
+            with self.subTest(commit_every=commit_every):
+                work_dir = tempfile.TemporaryDirectory()
+                self.addCleanup(work_dir.cleanup)
+                database_path = os.path.join(work_dir.name, "extracted.db")
+                storage = SQLiteStorage(database_path)
+                storage.create_tables()
+                storage.connection.execute(
+                    "CREATE TRIGGER reject_text BEFORE INSERT ON extracted_texts BEGIN SELECT RAISE(ABORT, 'rejected'); END")
+                storage.close_connection()
+                error_report = os.path.join(work_dir.name, "errors.csv")
+                files = [os.path.join(TEST_FILES, "PDF", "sample.pdf"), os.path.join(TEST_FILES, "DOCX", "sample.docx")]
+                settings = {"STORAGE_BACKEND": "sqlite", "SQLITE_PATH": database_path, "SQL_COMMIT_EVERY": commit_every,
+                            "IMAGE_DIR": os.path.join(work_dir.name, "images")}
+                cwd = os.getcwd()
+                os.chdir(work_dir.name)  # FileStorage writes to ./output
+                try:
+                    with patch.dict(os.environ, settings):
+                        results = BatchRunner(error_report=error_report).run(files)
+                finally:
+                    runner.worker_main.close()
+                    runner.worker_main = None
+                    os.chdir(cwd)
+                self.assertEqual([result['status'] for result in results], ['failed', 'failed'])
+                with open(error_report, newline='', encoding='utf-8') as report:
+                    rows = list(csv.reader(report))[1:]
+                self.assertEqual(sorted(row[0] for row in rows), sorted(files))
+                self.assertTrue(all("rejected" in row[1] for row in rows))
+
+    def test_stdout_records_need_a_single_process(self):
+        with patch.dict(os.environ, {"JSONL_OUTPUT": "-"}):
+            with self.assertRaisesRegex(ValueError, "JSONL_OUTPUT"):
+                BatchRunner(concurrency=2)
+            self.assertEqual(BatchRunner(concurrency=1).concurrency, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+
+from benchmarks.corpus_benchmark import find_regressions, percentile
+from benchmarks.synthetic_corpus import generate_document
+from data_extractor.page_walker import PageWalker
+from file_loader.concrete_file_loader import Loader
+
+
+class TestSyntheticCorpus(unittest.TestCase):
+
+    def setUp(self):
+        self.corpus_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.corpus_dir.cleanup)
+
+    def test_generated_documents_contain_the_requested_content(self):
+        for file_format, expected_records in [("pdf", 3), ("docx", 1), ("pptx", 3)]:
+            with self.subTest(file_format=file_format):
+                path = generate_document(self.corpus_dir.name, file_format, 3, tables=1, images=2, links=2)
+                loader = Loader(path, file_format)
+                records = list(PageWalker(loader.load_file(), "." + file_format).walk())
+                self.assertEqual(len(records), expected_records)
+                self.assertEqual(sum(len(record.links) for record in records), 6)
+                if file_format != "pptx":  # Slide tables are not extracted
+                    self.assertEqual(sum(len(record.tables) for record in records), 3)
+                loader.close()
+
+    def test_generation_is_reproducible(self):
+        first = generate_document(os.path.join(self.corpus_dir.name, "a"), "pdf", 2)
+        second = generate_document(os.path.join(self.corpus_dir.name, "b"), "pdf", 2)
+        with open(first, "rb") as a, open(second, "rb") as b:
+            self.assertEqual(a.read(), b.read())
+
+
+class TestRegressionCheck(unittest.TestCase):
+
+    def test_slower_cases_are_reported(self):
+        baseline = {"results": [{"case": "pdf-10p-extract", "p50_seconds": 1.0, "peak_rss_mb": 10.0}]}
+        results = [{"case": "pdf-10p-extract", "p50_seconds": 1.5, "peak_rss_mb": 10.0},
+                   {"case": "pdf-100p-extract", "p50_seconds": 9.0, "peak_rss_mb": 10.0}]
+        regressions = find_regressions(results, baseline, tolerance=0.25)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("pdf-10p-extract: p50_seconds"))
+
+    def test_baselines_without_rss_are_compared_by_latency(self):
+        baseline = {"results": [{"case": "pdf-10p-extract", "p50_seconds": 1.0, "peak_memory_mb": 10.0}]}
+        results = [{"case": "pdf-10p-extract", "p50_seconds": 1.0, "peak_rss_mb": 90.0}]
+        self.assertEqual(find_regressions(results, baseline), [])
+
+    def test_percentile_uses_nearest_rank(self):
+        self.assertEqual(percentile([3, 1, 2, 4], 0.5), 2)
+        self.assertEqual(percentile([3, 1, 2, 4], 0.99), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,213 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from benchmarks.synthetic_corpus import add_docx_hyperlink
+from data_extractor.data_extractor import EXTRACTOR_VERSION, UniversalDataExtractor
+from data_extractor.extraction_cache import ExtractionCache
+from data_extractor.image_utils import RAW_STREAM_EXTENSION, sniff_image_format
+from data_extractor.page_walker import PageWalker
+from docx import Document
+from file_loader.concrete_file_loader import Loader
+
+from extractor_helpers import STUB_IMAGE, TEST_FILES, ExtractorTestCase
+
+
+class TestExtractionCache(ExtractorTestCase):
+
+    def test_results_are_computed_once(self):
+        extractor = self.load_extractor("PDF/sample.pdf", "pdf")
+        with patch.object(UniversalDataExtractor, "save_image", return_value=STUB_IMAGE) as save_image:
+            images = extractor.extract_images()
+            self.assertIs(extractor.extract_images(), images)
+            self.assertEqual(save_image.call_count, len(images))
+        self.assertIs(extractor.extract_links(), extractor.extract_links())
+        extractor.close()
+
+    def test_clear_cache(self):
+        extractor = self.load_extractor("DOCX/sample.docx", "docx")
+        text = extractor.extract_text()
+        extractor.clear_cache()
+        self.assertEqual(extractor.extract_text(), text)
+        extractor.close()
+
+
+class TestPageWalker(ExtractorTestCase):
+
+    def test_document_is_walked_once(self):
+        extractor = self.load_extractor("PPT/sample.pptx", "pptx")
+        with patch.object(PageWalker, "walk", autospec=True, side_effect=PageWalker.walk) as walk, \
+                patch.object(UniversalDataExtractor, "save_image", return_value=STUB_IMAGE):
+            extractor.extract_text()
+            extractor.extract_tables()
+            extractor.extract_images()
+            extractor.extract_links()
+        self.assertEqual(walk.call_count, 1)
+        extractor.close()
+
+    def test_pdf_records_follow_page_order(self):
+        extractor = self.load_extractor("PDF/sample.pdf", "pdf")
+        records = list(PageWalker(extractor.content, ".pdf").walk())
+        self.assertEqual([record.page_number for record in records], list(range(1, len(extractor.pdf.pages) + 1)))
+        self.assertTrue(records[0].text)
+        extractor.close()
+
+    def test_parallel_pdf_matches_serial(self):
+        extractor = self.load_extractor("PDF/sample.pdf", "pdf")
+        serial = list(PageWalker(extractor.content, ".pdf").walk())
+        parallel = list(PageWalker(extractor.content, ".pdf", extractor.file_loader.file_path, workers=2).walk())
+        without_timings = lambda records: [{**record.__dict__, 'stages': None} for record in records]
+        self.assertEqual(without_timings(parallel), without_timings(serial))
+        extractor.close()
+
+    def test_docx_links_to_images_are_links(self):
+        document = Document()
+        add_docx_hyperlink(document.add_paragraph(), "https://example.com/images/logo.png")
+        [record] = PageWalker(document, ".docx").walk()
+        self.assertEqual(record.links, ["https://example.com/images/logo.png"])
+        self.assertEqual(record.images, [])
+
+
+class TestImageSaving(ExtractorTestCase):
+
+    def test_sniff_image_format(self):
+        self.assertEqual(sniff_image_format(b"\xff\xd8\xff\xe0rest"), ".jpg")
+        self.assertEqual(sniff_image_format(b"\x89PNG\r\n\x1a\nrest"), ".png")
+        self.assertEqual(sniff_image_format(b"RIFF\x00\x00\x00\x00WEBPVP8"), ".webp")
+        self.assertIsNone(sniff_image_format(b"\x78\x9c compressed pixels"))
+
+    def test_raw_mode_writes_original_bytes(self):
+        extractor = self.load_extractor("PDF/sample.pdf", "pdf")
+        record = next(PageWalker(extractor.content, ".pdf").walk())
+        image = record.images[0]
+        content_hash, path = extractor.save_image(image['data'])
+        self.assertEqual(path, os.path.join(self.image_dir.name, content_hash[:2], content_hash[2:4], content_hash + ".jpg"))
+        with open(path, "rb") as image_file:
+            self.assertEqual(image_file.read(), image['data'])
+        self.assertEqual(extractor.save_image(image['data']), (content_hash, path))
+        self.assertEqual((extractor.image_store.written, extractor.image_store.deduplicated), (1, 1))
+        extractor.close()
+
+    def test_png_mode_keeps_undecodable_images_raw(self):
+        extractor = self.load_extractor("PDF/sample.pdf", "pdf", image_mode="png")
+        content_hash, path = extractor.save_image(b"\x78\x9c compressed pixels")
+        self.assertTrue(path.endswith(content_hash + RAW_STREAM_EXTENSION))
+        with open(path, "rb") as image_file:
+            self.assertEqual(image_file.read(), b"\x78\x9c compressed pixels")
+        extractor.close()
+
+    def test_metadata_only_mode_does_not_save_images(self):
+        extractor = self.load_extractor("PPT/sample.pptx", "pptx")
+        with patch.object(UniversalDataExtractor, "save_image") as save_image:
+            images = extractor.extract_images(metadata_only=True)
+        save_image.assert_not_called()
+        self.assertEqual(images[0]['format'], "jpg")
+        self.assertEqual((images[0]['width'], images[0]['height']), (2048, 2048))
+        self.assertEqual(images[0]['page_number'], 1)
+        self.assertEqual(len(extractor.get_image_bytes(1, images[0]['index'])), images[0]['byte_size'])
+        extractor.close()
+
+    def test_thumbnails_are_generated_on_request(self):
+        extractor = self.load_extractor("PDF/sample.pdf", "pdf")
+        thumbnails = extractor.generate_thumbnails(size=(32, 32), workers=2)
+        self.assertEqual(len(thumbnails), 1)
+        self.assertTrue(os.path.exists(thumbnails[0]['thumbnail_path']))
+        extractor.close()
+
+
+class TestPersistentCache(ExtractorTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        self.cache = ExtractionCache(self.cache_dir.name)
+
+    def test_cached_document_is_not_parsed_again(self):
+        first = self.load_extractor("PDF/sample.pdf", "pdf", cache=self.cache)
+        pages = [(record.page_number, record.text, record.tables, record.links) for record in first.iter_pages()]
+        metadata = first.extract_metadata()
+        first.close()
+
+        loader = Loader(os.path.join(TEST_FILES, "PDF/sample.pdf"), "pdf")
+        second = UniversalDataExtractor(loader, image_dir=self.image_dir.name, cache=self.cache)
+        cached_pages = [(record.page_number, record.text, record.tables, record.links) for record in second.iter_pages()]
+        self.assertEqual(cached_pages, pages)
+        self.assertEqual(second.extract_metadata(), {key: value for key, value in metadata.items() if value})
+        self.assertIsNone(loader.session)  # The PDF was never opened
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+        second.close()
+
+    def test_engines_are_cached_separately(self):
+        extractor = self.load_extractor("PDF/sample.pdf", "pdf", cache=self.cache)
+        extractor.extract_text()
+        extractor.close()
+        fast = self.load_extractor("PDF/sample.pdf", "pdf", cache=self.cache, engine="fast")
+        self.assertFalse(fast.cached)
+        fast.close()
+
+    def test_image_modes_and_stores_are_cached_separately(self):
+        extractor = self.load_extractor("PDF/sample.pdf", "pdf", cache=self.cache)
+        extractor.extract_text()
+        extractor.close()
+        png = self.load_extractor("PDF/sample.pdf", "pdf", cache=self.cache, image_mode="png")
+        self.assertFalse(png.cached)
+        png.close()
+        loader = Loader(os.path.join(TEST_FILES, "PDF/sample.pdf"), "pdf")
+        other_store = UniversalDataExtractor(loader, image_dir=os.path.join(self.cache_dir.name, "images"), cache=self.cache)
+        self.assertFalse(other_store.cached)
+        other_store.close()
+
+    def test_evicted_entries_count_as_misses(self):
+        extractor = self.load_extractor("PDF/sample.pdf", "pdf", cache=self.cache)
+        extractor.extract_text()
+        extractor.close()
+        cached = self.load_extractor("PDF/sample.pdf", "pdf", cache=self.cache)
+        self.assertTrue(cached.cached)
+        for path in self.cache.entry_paths():
+            os.remove(path)
+        self.assertTrue(cached.extract_text())
+        self.assertEqual(self.cache.stats()["hits"], 0)
+        self.assertEqual(self.cache.stats()["misses"], 2)
+        cached.close()
+
+    def test_partial_walks_are_not_cached(self):
+        extractor = self.load_extractor("PDF/sample.pdf", "pdf", cache=self.cache)
+        pages = extractor.iter_pages()
+        next(pages)
+        pages.close()
+        self.assertEqual(self.cache.entry_paths(), [])
+        extractor.close()
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = ExtractionCache(self.cache_dir.name, max_bytes=1)
+        for file_path, file_type in [("PDF/sample.pdf", "pdf"), ("DOCX/sample.docx", "docx")]:
+            extractor = self.load_extractor(file_path, file_type, cache=cache)
+            extractor.extract_text()
+            extractor.close()
+        self.assertEqual(cache.stats()["evictions"], 2)
+        self.assertEqual(cache.entry_paths(), [])
+
+
+class TestTextEngines(ExtractorTestCase):
+
+    def test_fast_engine_extracts_text_and_links_only(self):
+        layout = self.load_extractor("PDF/sample.pdf", "pdf")
+        fast = self.load_extractor("PDF/sample.pdf", "pdf", engine="fast")
+        self.assertEqual(sorted(fast.extract_text().split()), sorted(layout.extract_text().split()))  # Reading order may differ
+        self.assertEqual(fast.extract_links(), layout.extract_links())
+        self.assertEqual(fast.extract_tables(), [])
+        self.assertEqual(fast.version, EXTRACTOR_VERSION + "+fast")
+        self.assertEqual(layout.version, EXTRACTOR_VERSION)
+        layout.close()
+        fast.close()
+
+    def test_engine_must_exist_for_the_file_type(self):
+        with self.assertRaises(ValueError):
+            self.load_extractor("DOCX/sample.docx", "docx", engine="fast")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+import os
+import unittest
+
+from data_extractor.data_extractor import UniversalDataExtractor
+from file_loader.concrete_file_loader import Loader
+
+from extractor_helpers import TEST_FILES, ExtractorTestCase
+
+
+class TestDocumentSession(ExtractorTestCase):
+
+    def test_file_is_parsed_once(self):
+        for file_path, file_type in [("PDF/sample.pdf", "pdf"), ("DOCX/sample.docx", "docx"), ("PPT/sample.pptx", "pptx")]:
+            loader = Loader(os.path.join(TEST_FILES, file_path), file_type)
+            loader.load_file()
+            extractor = UniversalDataExtractor(loader, image_dir=self.image_dir.name)
+            extractor.extract_text()
+            extractor.extract_links()
+            self.assertEqual(loader.session.parse_count, 1)
+            self.assertIs(extractor.content, loader.file)
+            extractor.close()
+            self.assertIsNone(loader.session.document)
+
+    def test_missing_file(self):
+        loader = Loader(os.path.join(TEST_FILES, "missing.pdf"), "pdf")
+        with self.assertRaises(FileNotFoundError):
+            loader.load_file()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from data_extractor.data_extractor import UniversalDataExtractor
+from file_loader.concrete_file_loader import Loader
+from file_loader.document_probe import count_pdf_images
+from file_loader.file_sniffer import sniff_file_type
+
+from extractor_helpers import TEST_FILES
+
+
+class TestFileSniffing(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.work_dir.cleanup)
+
+    def copy(self, source, name, truncate=None):
+        path = os.path.join(self.work_dir.name, name)
+        shutil.copyfile(os.path.join(TEST_FILES, source), path)
+        if truncate is not None:
+            with open(path, "r+b") as file:
+                file.truncate(truncate)
+        return path
+
+    def test_types_are_detected_from_contents(self):
+        for file_path, file_type in [("PDF/sample.pdf", "pdf"), ("DOCX/sample.docx", "docx"), ("PPT/sample.pptx", "pptx")]:
+            with self.subTest(file_type=file_type):
+                self.assertEqual(sniff_file_type(os.path.join(TEST_FILES, file_path)), file_type)
+
+    def test_misnamed_file_is_read_with_the_right_reader(self):
+        path = self.copy("DOCX/sample.docx", "report.pdf")
+        loader = Loader(path, "pdf")
+        document = loader.load_file()
+        self.assertEqual(loader.file_type, "docx")
+        self.assertTrue(hasattr(document, "paragraphs"))
+        loader.close()
+
+    def test_extractor_validates_misnamed_files(self):
+        extractor = UniversalDataExtractor(Loader(self.copy("DOCX/sample.docx", "report.pdf"), "pdf"),
+                                           image_dir=os.path.join(self.work_dir.name, "images"))
+        self.assertEqual(extractor.file_type, ".docx")
+        self.assertTrue(extractor.extract_text())
+        extractor.close()
+
+    def test_corrupt_files_are_rejected_before_parsing(self):
+        for source, name in [("PDF/sample.pdf", "truncated.pdf"), ("PPT/sample.pptx", "truncated.pptx")]:
+            with self.subTest(name=name):
+                loader = Loader(self.copy(source, name, truncate=4096), name.split(".")[1])
+                with patch.dict(Loader.file_reader, {"pdf": None, "pptx": None}):  # A parser call would fail differently
+                    with self.assertRaisesRegex(ValueError, "Corrupt"):
+                        loader.load_file()
+
+    def test_pdf_with_trailing_data_is_accepted(self):
+        path = self.copy("PDF/sample.pdf", "padded.pdf")
+        with open(path, "ab") as file:
+            file.write(b"\0" * 2048)
+        loader = Loader(path, "pdf")
+        self.assertEqual(len(loader.load_file().pages), 3)
+        loader.close()
+
+    def test_unknown_contents_are_rejected(self):
+        path = os.path.join(self.work_dir.name, "notes.pdf")
+        with open(path, "w") as file:
+            file.write("plain text")
+        with self.assertRaisesRegex(ValueError, "Invalid PDF file"):
+            Loader(path, "pdf").load_file()
+
+
+class TestProbe(unittest.TestCase):
+
+    def test_counts_are_read_without_parsing(self):
+        expected = [("PDF/sample.pdf", "pdf", 3, 1), ("DOCX/sample.docx", "docx", None, 1), ("PPT/sample.pptx", "pptx", 2, 2)]
+        for file_path, file_type, pages, images in expected:
+            with self.subTest(file_type=file_type):
+                loader = Loader(os.path.join(TEST_FILES, file_path), file_type)
+                with patch.dict(Loader.file_reader, {file_type: None}):  # A parser call would fail
+                    probe = loader.probe()
+                self.assertEqual((probe["pages"], probe["images"], probe["encrypted"]), (pages, images, False))
+                self.assertIsNone(loader.session)
+
+    def test_pdf_images_are_only_scanned_on_request(self):
+        loader = Loader(os.path.join(TEST_FILES, "PDF/sample.pdf"), "pdf")
+        with patch("file_loader.document_probe.count_pdf_images") as count_images:
+            probe = loader.probe(count_images=False)
+        count_images.assert_not_called()
+        self.assertEqual((probe["pages"], probe["images"]), (3, None))
+
+    def test_soft_masks_are_not_counted_as_images(self):
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as pdf:
+            pdf.write(b"%PDF-1.7\n4 0 obj << /Type /XObject /Subtype /Image /SMask 5 0 R >>\n"
+                      b"5 0 obj << /Type /XObject /Subtype /Image >>\n%%EOF\n")
+        self.addCleanup(os.remove, pdf.name)
+        self.assertEqual(count_pdf_images(pdf.name), 1)
+
+    def test_probe_matches_the_extracted_pages(self):
+        loader = Loader(os.path.join(TEST_FILES, "PPT/sample.pptx"), "pptx")
+        self.assertEqual(loader.probe()["pages"], len(loader.load_file().slides))
+        loader.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import json
+import tempfile
+import unittest
+
+from instrumentation.stage_metrics import StageMetrics, document_profiler, start_timer, write_json, write_prometheus
+from storage.sqlite_storage import SQLiteStorage
+
+from extractor_helpers import ExtractorTestCase
+
+
+class TestStageMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.output_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.output_dir.cleanup)
+
+    def test_records_are_summed_per_stage(self):
+        metrics = StageMetrics()
+        metrics.record("pdf.tables", start_timer(), items=2)
+        metrics.merge({"pdf.tables": {"calls": 1, "wall_seconds": 0.5, "cpu_seconds": 0.25, "bytes": 0, "items": 3}})
+        stages = metrics.to_dict()
+        self.assertEqual(stages["pdf.tables"]["calls"], 2)
+        self.assertEqual(stages["pdf.tables"]["items"], 5)
+        self.assertGreaterEqual(stages["pdf.tables"]["wall_seconds"], 0.5)
+
+    def test_exports(self):
+        metrics = StageMetrics()
+        metrics.record("file.open", start_timer(), size=10)
+        json_path = os.path.join(self.output_dir.name, "metrics.json")
+        prom_path = os.path.join(self.output_dir.name, "metrics.prom")
+        write_json(json_path, metrics, {"a.pdf": metrics.to_dict()})
+        write_prometheus(prom_path, metrics)
+        with open(json_path, encoding="utf-8") as report:
+            self.assertEqual(json.load(report)["documents"]["a.pdf"]["file.open"]["bytes"], 10)
+        with open(prom_path, encoding="utf-8") as report:
+            self.assertIn('extractor_stage_bytes_total{stage="file.open"} 10\n', report.read())
+
+    def test_cprofile_writes_one_profile_per_document(self):
+        with document_profiler(self.output_dir.name, "sample.pdf"):
+            sum(range(1000))
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir.name, "sample.pdf.prof")))
+
+
+class TestExtractionStages(ExtractorTestCase):
+
+    stub_save_image = True
+
+
+    def test_pdf_pages_and_storage_writes_are_timed(self):
+        storage = SQLiteStorage(":memory:", commit_every=1)
+        storage.create_tables()
+        self.addCleanup(storage.close_connection)
+        extractor = self.load_extractor("PDF/sample.pdf", "pdf")
+        storage.store_data(extractor)
+        stages = extractor.metrics.to_dict()
+        page_count = len(extractor.pdf.pages)
+        self.assertEqual(stages["extract.page"]["calls"], page_count)
+        self.assertEqual(stages["pdf.tables"]["calls"], page_count)
+        self.assertEqual(stages["storage.SQLiteStorage.store_page"]["items"], page_count)
+        self.assertIn("sql.executemany", stages)
+        self.assertIn("sql.commit", stages)
+        extractor.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
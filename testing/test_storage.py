@@ -0,0 +1,551 @@
+import os
+import json
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from data_extractor.data_extractor import EXTRACTOR_VERSION, UniversalDataExtractor
+from batch.pipeline import StoragePipeline
+from file_loader.concrete_file_loader import Loader
+from mysql.connector.errors import PoolError
+from storage.columnar_storage import ColumnarStorage, pa
+from storage.file_storage import FileStorage
+from storage.jsonl_storage import JSONLStorage
+from storage.pooled_sql_storage import PooledSQLStorage
+from storage.search_index import SearchIndex, chunk_text
+from storage.sql_storage import SQLStorage
+from storage.sqlite_storage import SQLiteStorage
+from storage.storage import store_document
+
+from extractor_helpers import TEST_FILES, ExtractorTestCase
+
+
+class TestStreamingStorage(ExtractorTestCase):
+
+    stub_save_image = True
+
+    def setUp(self):
+        super().setUp()
+        self.output_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.output_dir.cleanup)
+
+    def test_file_storage_writes_streamed_pages(self):
+        extractor = self.load_extractor("PDF/sample.pdf", "pdf")
+        FileStorage(self.output_dir.name, TEST_FILES).store_data(extractor)
+        base_folder = os.path.join(self.output_dir.name, "PDF", "sample.pdf")
+        with open(os.path.join(base_folder, "extracted_text.txt"), encoding="utf-8") as text_file:
+            self.assertEqual(text_file.read().strip(), extractor.extract_text())
+        self.assertTrue(os.path.exists(os.path.join(base_folder, "tables", "table_1.csv")))
+        self.assertTrue(os.path.exists(os.path.join(base_folder, "metadata.txt")))
+        extractor.close()
+
+    def test_file_storage_detects_unchanged_documents(self):
+        extractor = self.load_extractor("DOCX/sample.docx", "docx")
+        file_storage = FileStorage(self.output_dir.name, TEST_FILES)
+        content_hash = extractor.file_loader.content_hash()
+        file_path = extractor.file_loader.file_path
+        self.assertFalse(file_storage.is_processed("sample.docx", content_hash, EXTRACTOR_VERSION, file_path))
+        file_storage.store_data(extractor)
+        self.assertTrue(file_storage.is_processed("sample.docx", content_hash, EXTRACTOR_VERSION, file_path))
+        self.assertFalse(file_storage.is_processed("sample.docx", content_hash, "0.0", file_path))
+        self.assertFalse(file_storage.is_processed("sample.docx", "0" * 64, EXTRACTOR_VERSION, file_path))
+        extractor.close()
+
+    def test_file_storage_keys_documents_by_relative_path(self):
+        with open(os.path.join(TEST_FILES, "DOCX", "sample.docx"), "rb") as source:
+            contents = source.read()
+        input_root = tempfile.TemporaryDirectory()
+        self.addCleanup(input_root.cleanup)
+        file_storage = FileStorage(self.output_dir.name, input_root.name)
+        for folder in ["a", "b"]:
+            os.makedirs(os.path.join(input_root.name, folder))
+            file_path = os.path.join(input_root.name, folder, "report.docx")
+            with open(file_path, "wb") as copy:
+                copy.write(contents)
+            loader = Loader(file_path, "docx")
+            loader.load_file()
+            extractor = UniversalDataExtractor(loader, image_dir=self.image_dir.name)
+            file_storage.store_data(extractor)
+            self.assertTrue(file_storage.is_processed("report.docx", loader.content_hash(), extractor.version, file_path))
+            extractor.close()
+        for folder in ["a", "b"]:
+            self.assertTrue(os.path.exists(os.path.join(self.output_dir.name, folder, "report.docx", "extracted_text.txt")))
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir.name, "report.docx")))
+
+    def test_file_storage_aborts_failed_documents(self):
+        extractor = self.load_extractor("PDF/sample.pdf", "pdf")
+        file_storage = FileStorage(self.output_dir.name, TEST_FILES)
+        with patch.object(extractor, "iter_pages", side_effect=RuntimeError("damaged page")):
+            with self.assertRaises(RuntimeError):
+                store_document(extractor, [file_storage])
+        self.assertIsNone(file_storage.text_file)
+        self.assertFalse(file_storage.is_processed("sample.pdf", extractor.file_loader.content_hash(), EXTRACTOR_VERSION,
+                                                   extractor.file_loader.file_path))
+        extractor.close()
+
+    def test_sql_storage_inserts_rows_per_page(self):
+        with patch.object(SQLStorage, "create_connection"):
+            sql_storage = SQLStorage({})
+        sql_storage.connection = MagicMock()
+        cursor = sql_storage.connection.cursor.return_value
+        extractor = self.load_extractor("PPT/sample.pptx", "pptx")
+        store_document(extractor, [sql_storage])
+        statements = [call.args[0] for call in cursor.execute.call_args_list]
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith("INSERT INTO extracted_files"))
+        self.assertIn(extractor.file_loader.content_hash(), cursor.execute.call_args_list[0].args[1])
+        batches = {call.args[0].split()[2]: call.args[1] for call in cursor.executemany.call_args_list}
+        self.assertEqual(len(batches["extracted_texts"]), len(extractor.content.slides))
+        sql_storage.connection.commit.assert_called_once()
+        extractor.close()
+
+    def test_sql_storage_commits_every_n_documents(self):
+        with patch.object(SQLStorage, "create_connection"):
+            sql_storage = SQLStorage({}, batch_size=2, commit_every=2)
+        sql_storage.connection = MagicMock()
+        extractor = self.load_extractor("DOCX/sample.docx", "docx")
+        store_document(extractor, [sql_storage])
+        sql_storage.connection.commit.assert_not_called()
+        store_document(extractor, [sql_storage])
+        sql_storage.connection.commit.assert_called_once()
+        cursor = sql_storage.connection.cursor.return_value
+        self.assertTrue(all(len(call.args[1]) <= 2 for call in cursor.executemany.call_args_list))
+        extractor.close()
+
+
+class TestSQLiteStorage(ExtractorTestCase):
+
+    stub_save_image = True
+
+    def setUp(self):
+        super().setUp()
+        self.storage = SQLiteStorage(":memory:", commit_every=1)
+        self.storage.create_tables()
+        self.addCleanup(self.storage.close_connection)
+
+    def test_document_is_stored_and_recognized(self):
+        extractor = self.load_extractor("PDF/sample.pdf", "pdf")
+        content_hash = extractor.file_loader.content_hash()
+        self.assertFalse(self.storage.is_processed("sample.pdf", content_hash, EXTRACTOR_VERSION))
+        self.storage.store_data(extractor)
+        connection = self.storage.connection
+        self.assertEqual(connection.execute("SELECT file_name FROM extracted_files").fetchall(), [("sample.pdf",)])
+        links = connection.execute("SELECT COUNT(*) FROM extracted_links").fetchone()[0]
+        self.assertEqual(links, len(extractor.extract_links()))
+        self.assertTrue(self.storage.is_processed("sample.pdf", content_hash, EXTRACTOR_VERSION))
+        extractor.close()
+
+    def test_failed_document_is_rolled_back(self):
+        storage = SQLiteStorage(":memory:", commit_every=2)
+        storage.create_tables()
+        self.addCleanup(storage.close_connection)
+        extractor = self.load_extractor("PDF/sample.pdf", "pdf")
+        first_page = next(extractor.iter_pages())
+
+        def fail_on_second_page():
+            yield first_page
+            raise RuntimeError("damaged page")
+
+        with patch.object(extractor, "iter_pages", fail_on_second_page):
+            with self.assertRaises(RuntimeError):
+                store_document(extractor, [storage])
+        docx_extractor = self.load_extractor("DOCX/sample.docx", "docx")
+        store_document(docx_extractor, [storage])
+        storage.flush()
+        files = storage.connection.execute("SELECT file_name FROM extracted_files").fetchall()
+        self.assertEqual(files, [("sample.docx",)])
+        self.assertFalse(storage.is_processed("sample.pdf", extractor.file_loader.content_hash(), EXTRACTOR_VERSION))
+        extractor.close()
+        docx_extractor.close()
+
+    def test_database_errors_fail_the_document(self):
+        self.storage.connection.execute(
+            "CREATE TRIGGER reject_text BEFORE INSERT ON extracted_texts BEGIN SELECT RAISE(ABORT, 'rejected'); END")
+        extractor = self.load_extractor("PDF/sample.pdf", "pdf")
+        with self.assertRaisesRegex(sqlite3.Error, "rejected"):
+            self.storage.store_data(extractor)
+        self.assertEqual(self.storage.connection.execute("SELECT COUNT(*) FROM extracted_files").fetchone()[0], 0)
+        self.assertFalse(self.storage.is_processed("sample.pdf", extractor.file_loader.content_hash(), EXTRACTOR_VERSION))
+        extractor.close()
+
+    def test_buffered_documents_do_not_lock_other_writers(self):
+        database_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(database_dir.cleanup)
+        database_path = os.path.join(database_dir.name, "extracted.db")
+        first, second = SQLiteStorage(database_path, commit_every=2), SQLiteStorage(database_path, commit_every=1)
+        first.create_tables()
+        pdf_extractor = self.load_extractor("PDF/sample.pdf", "pdf")
+        docx_extractor = self.load_extractor("DOCX/sample.docx", "docx")
+        first.store_data(pdf_extractor)  # Buffered, so the database is not locked
+        self.assertTrue(first.is_processed("sample.pdf", pdf_extractor.file_loader.content_hash(), EXTRACTOR_VERSION))
+        second.store_data(docx_extractor)
+        first.close_connection()
+        second.close_connection()
+        connection = sqlite3.connect(database_path)
+        self.addCleanup(connection.close)
+        files = connection.execute("SELECT id, file_name FROM extracted_files ORDER BY id").fetchall()
+        self.assertEqual(files, [(1, "sample.docx"), (2, "sample.pdf")])
+        links = connection.execute("SELECT COUNT(*) FROM extracted_links WHERE file_id = 2").fetchone()[0]
+        self.assertEqual(links, len(pdf_extractor.extract_links()))
+        pdf_extractor.close()
+        docx_extractor.close()
+
+    def test_file_id_columns_are_indexed(self):
+        indexes = [row[0] for row in self.storage.connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")]
+        self.assertIn("idx_links_file_id", indexes)
+        self.assertIn("idx_content_hash", indexes)
+
+    def test_rows_are_stored_per_page_with_positions(self):
+        extractor = self.load_extractor("PDF/sample.pdf", "pdf")
+        self.storage.store_data(extractor)
+        connection = self.storage.connection
+        pages = connection.execute("SELECT page_number FROM extracted_texts ORDER BY page_number").fetchall()
+        self.assertEqual([page for (page,) in pages], list(range(1, len(pages) + 1)))
+        tables = connection.execute("SELECT page_number, bbox_x0, bbox_bottom FROM extracted_tables").fetchall()
+        self.assertTrue(tables and all(page and x0 is not None and bottom > x0 for page, x0, bottom in tables))
+        plan = connection.execute("EXPLAIN QUERY PLAN SELECT text FROM extracted_texts WHERE file_id = 1 AND page_number = 2").fetchall()
+        self.assertIn("idx_texts_file_id", str(plan))
+        extractor.close()
+
+    def test_tables_without_page_columns_are_migrated(self):
+        storage = SQLiteStorage(":memory:")
+        storage.connection.execute("CREATE TABLE extracted_links (id INTEGER PRIMARY KEY, file_id INTEGER, link TEXT)")
+        storage.connection.execute("CREATE INDEX idx_links_file_id ON extracted_links (file_id)")
+        storage.create_tables()
+        columns = [row[1] for row in storage.connection.execute("PRAGMA table_info(extracted_links)")]
+        self.assertIn("page_number", columns)
+        index = [row[2] for row in storage.connection.execute("PRAGMA index_info(idx_links_file_id)")]
+        self.assertEqual(index, ["file_id", "page_number"])
+        storage.close_connection()
+
+
+class TestPooledSQLStorage(ExtractorTestCase):
+
+    stub_save_image = True
+
+    def setUp(self):
+        super().setUp()
+        with patch.object(PooledSQLStorage, "create_connection"):
+            self.storage = PooledSQLStorage({}, pool_size=2, pool_timeout=1)
+        self.storage.pool = MagicMock()
+
+    def test_connection_is_borrowed_per_document(self):
+        connection = MagicMock()
+        self.storage.pool.get_connection.side_effect = [PoolError("exhausted"), connection]
+        extractor = self.load_extractor("DOCX/sample.docx", "docx")
+        store_document(extractor, [self.storage])
+        connection.ping.assert_called_once()
+        connection.commit.assert_called_once()
+        connection.close.assert_called_once()  # Returned to the pool
+        self.assertIsNone(self.storage.connection)
+        metrics = self.storage.pool_metrics()
+        self.assertEqual(metrics['borrowed'], 1)
+        self.assertGreater(metrics['wait_seconds'], 0)
+        extractor.close()
+
+    def test_close_releases_the_pool(self):
+        self.storage.close_connection()
+        self.assertIsNone(self.storage.pool)
+        self.assertIsNone(self.storage.borrow_connection())
+        self.storage.db_config = {"user": "user", "password": "", "host": "localhost", "database": "extraction"}
+        with patch("storage.pooled_sql_storage.pooling.MySQLConnectionPool") as pool_class:
+            self.storage.create_connection()  # Reopened with a new pool
+        connection = self.storage.borrow_connection()
+        self.assertIs(connection, pool_class.return_value.get_connection.return_value)
+
+    def test_threads_keep_separate_state(self):
+        self.storage.pool.get_connection.side_effect = lambda: MagicMock()
+        seen = []
+
+        def borrow():
+            self.storage.connection = self.storage.borrow_connection()
+            seen.append(self.storage.connection)
+
+        threads = [threading.Thread(target=borrow) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertIsNot(seen[0], seen[1])
+        self.assertIsNone(self.storage.connection)
+
+
+class TestStoragePipeline(ExtractorTestCase):
+
+    stub_save_image = True
+
+    def setUp(self):
+        super().setUp()
+        self.output_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.output_dir.cleanup)
+
+    def test_documents_are_written_by_background_threads(self):
+        file_storage = FileStorage(self.output_dir.name, TEST_FILES)
+        sql_storage = SQLiteStorage(":memory:", commit_every=1)
+        sql_storage.create_tables()
+        self.addCleanup(sql_storage.close_connection)
+        pipeline = StoragePipeline([file_storage, sql_storage], queue_size=1)
+        for file_path, file_type in [("PDF/sample.pdf", "pdf"), ("DOCX/sample.docx", "docx")]:
+            pipeline.submit(self.load_extractor(file_path, file_type), [file_storage, sql_storage])
+        self.assertEqual(pipeline.close(), [])
+        files = sql_storage.connection.execute("SELECT file_name FROM extracted_files ORDER BY id").fetchall()
+        self.assertEqual(files, [("sample.pdf",), ("sample.docx",)])
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir.name, "DOCX", "sample.docx", "extracted_text.txt")))
+
+    def test_storage_errors_are_collected(self):
+        storage = MagicMock(writer_threads=1)
+        storage.store_page.side_effect = RuntimeError("disk full")
+        pipeline = StoragePipeline([storage])
+        extractor = self.load_extractor("PDF/sample.pdf", "pdf")
+        with patch.object(extractor, "close") as close:
+            pipeline.submit(extractor, [storage])
+            errors = pipeline.close()
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(storage.store_page.call_count, 1)  # The rest of the document is skipped
+        storage.end_document.assert_not_called()
+        storage.abort_document.assert_called_once()
+        close.assert_called_once()  # Closed even though the storage failed
+
+    def test_failed_extraction_aborts_the_document(self):
+        storage = MagicMock(writer_threads=1)
+        pipeline = StoragePipeline([storage])
+        extractor = self.load_extractor("PDF/sample.pdf", "pdf")
+        first_page = next(extractor.iter_pages())
+
+        def fail_on_second_page():
+            yield first_page
+            raise RuntimeError("damaged page")
+
+        with patch.object(extractor, "iter_pages", fail_on_second_page), patch.object(extractor, "close") as close:
+            with self.assertRaises(RuntimeError):
+                pipeline.submit(extractor, [storage])
+            self.assertEqual(pipeline.close(), [])
+        storage.abort_document.assert_called_once()
+        storage.end_document.assert_not_called()
+        close.assert_called_once()
+
+    def test_writer_thread_commits_pooled_storage(self):
+        with patch.object(PooledSQLStorage, "create_connection"):
+            storage = PooledSQLStorage({}, pool_size=1, commit_every=2)
+        storage.pool = MagicMock()
+        connection = storage.pool.get_connection.return_value
+        pipeline = StoragePipeline([storage])
+        ticket = pipeline.submit(self.load_extractor("DOCX/sample.docx", "docx"), [storage])
+        self.assertEqual(pipeline.close(), [])
+        self.assertTrue(ticket.done.is_set())
+        self.assertTrue(connection.cursor.return_value.executemany.called)
+        connection.commit.assert_called_once()
+        connection.close.assert_called_once()  # Returned to the pool by the writer thread
+
+    def test_pooled_storage_writes_on_every_connection(self):
+        with patch.object(PooledSQLStorage, "create_connection"):
+            storage = PooledSQLStorage({}, pool_size=2, pool_timeout=1)
+        storage.pool = MagicMock()
+        both_borrowed = threading.Barrier(2, timeout=5)
+
+        def get_connection():
+            both_borrowed.wait()  # Only returns once both writers hold a connection at the same time
+            return MagicMock()
+
+        storage.pool.get_connection.side_effect = get_connection
+        pipeline = StoragePipeline([storage])
+        self.assertEqual(len(pipeline.threads), 2)
+        tickets = [pipeline.submit(self.load_extractor("DOCX/sample.docx", "docx"), [storage]) for _ in range(2)]
+        self.assertEqual(pipeline.close(), [])
+        self.assertTrue(all(ticket.done.is_set() for ticket in tickets))
+        self.assertEqual(storage.pool_metrics()['borrowed'], 2)
+
+    def test_is_processed_waits_for_the_writer(self):
+        storage = MagicMock(writer_threads=1)
+        storage.is_processed.return_value = True
+        pipeline = StoragePipeline([storage])
+        self.assertTrue(pipeline.is_processed(storage, "sample.pdf", "0" * 64, EXTRACTOR_VERSION))
+        storage.is_processed.assert_called_once_with("sample.pdf", "0" * 64, EXTRACTOR_VERSION, None)
+        self.assertEqual(pipeline.close(), [])
+
+
+@unittest.skipIf(pa is None, "pyarrow is not installed")
+class TestColumnarStorage(ExtractorTestCase):
+
+    stub_save_image = True
+
+    def setUp(self):
+        super().setUp()
+        self.output_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.output_dir.cleanup)
+
+    def read_dataset(self, name, file_format):
+        import pyarrow.dataset as ds
+        dataset = ds.dataset(os.path.join(self.output_dir.name, name), partitioning="hive",
+                             format="parquet" if file_format == "parquet" else "ipc")
+        return dataset.to_table().to_pydict()
+
+    def test_tables_are_written_cell_by_cell(self):
+        for file_format in ["parquet", "arrow"]:
+            with self.subTest(file_format=file_format):
+                self.output_dir.cleanup()
+                storage = ColumnarStorage(self.output_dir.name, file_format)
+                extractor = self.load_extractor("PDF/sample.pdf", "pdf")
+                storage.store_data(extractor)
+                storage.close()
+                tables = self.read_dataset("tables", file_format)
+                first_table = extractor.extract_tables()[0]
+                cells = [value for row, column, value in zip(tables["row_index"], tables["column_index"], tables["value"])
+                         if row == 0]
+                self.assertEqual(cells[:len(first_table[0])], [None if cell is None else str(cell) for cell in first_table[0]])
+                self.assertEqual(set(tables["file_type"]), {"pdf"})
+                documents = self.read_dataset("documents", file_format)
+                self.assertEqual(documents["file_name"], ["sample.pdf"])
+                extractor.close()
+
+    def test_written_documents_are_recognized_by_later_runs(self):
+        extractor = self.load_extractor("DOCX/sample.docx", "docx")
+        content_hash = extractor.file_loader.content_hash()
+        storage = ColumnarStorage(self.output_dir.name)
+        storage.store_data(extractor)
+        storage.close()
+        extractor.close()
+        storage = ColumnarStorage(self.output_dir.name)
+        self.assertTrue(storage.is_processed("sample.docx", content_hash, EXTRACTOR_VERSION))
+        self.assertFalse(storage.is_processed("sample.docx", content_hash, "0.0"))
+
+
+class TestJSONLStorage(ExtractorTestCase):
+
+    stub_save_image = True
+
+    def setUp(self):
+        super().setUp()
+        self.output_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.output_dir.cleanup)
+        self.output_path = os.path.join(self.output_dir.name, "records.jsonl")
+
+    def read_records(self, path):
+        with open(path, encoding="utf-8") as records:
+            return [json.loads(line) for line in records]
+
+    def test_one_record_per_document(self):
+        storage = JSONLStorage(self.output_path)
+        extractor = self.load_extractor("PDF/sample.pdf", "pdf")
+        storage.store_data(extractor)
+        storage.close()
+        [record] = self.read_records(self.output_path)
+        self.assertEqual(record["file_name"], "sample.pdf")
+        self.assertEqual(record["document_id"], extractor.file_loader.content_hash())
+        self.assertEqual(len(record["pages"]), record["page_count"])
+        self.assertEqual(sum(len(page["tables"]) for page in record["pages"]), len(extractor.extract_tables()))
+        extractor.close()
+
+    def test_page_records_and_rotation(self):
+        storage = JSONLStorage(self.output_path, record_mode="page", max_bytes=1)
+        extractor = self.load_extractor("PDF/sample.pdf", "pdf")
+        storage.store_data(extractor)
+        storage.close()
+        extractor.close()
+        paths = sorted(os.path.join(self.output_dir.name, name) for name in os.listdir(self.output_dir.name))
+        records = [record for path in paths for record in self.read_records(path)]
+        self.assertEqual(len(paths), len(records))  # Every record went to a new file
+        self.assertEqual([record["record"] for record in records].count("document"), 1)
+
+    def test_rotation_by_another_process_during_rename(self):
+        storage = JSONLStorage(self.output_path, max_bytes=1)
+        storage.write_record({"record": "first"})
+        rename = os.rename
+
+        def rotated_by_another_process(source, destination):
+            rename(source, self.output_path + ".other")  # The other process wins the race
+            raise FileNotFoundError(source)
+
+        with patch("storage.jsonl_storage.os.rename", side_effect=rotated_by_another_process):
+            storage.write_record({"record": "second"})
+        storage.close()
+        self.assertEqual(self.read_records(self.output_path), [{"record": "second"}])
+        self.assertEqual(self.read_records(self.output_path + ".other"), [{"record": "first"}])
+
+
+class TestSearchIndex(ExtractorTestCase):
+
+    stub_save_image = True
+
+    def setUp(self):
+        super().setUp()
+        self.index = SearchIndex(":memory:")
+        self.addCleanup(self.index.close)
+
+    def test_hits_are_ranked_with_page_and_snippet(self):
+        extractor = self.load_extractor("PDF/sample.pdf", "pdf")
+        self.index.store_data(extractor)
+        hits = self.index.search("interdisciplinary field")
+        self.assertEqual(hits[0]["file_name"], "sample.pdf")
+        self.assertEqual(hits[0]["file_path"], os.path.abspath(extractor.file_loader.file_path))
+        self.assertEqual(hits[0]["page_number"], 1)
+        self.assertIn("[interdisciplinary]", hits[0]["snippet"])
+        self.assertEqual(self.index.search("no-such-word-anywhere"), [])
+        self.assertTrue(self.index.is_processed("sample.pdf", extractor.file_loader.content_hash(), extractor.version))
+        extractor.close()
+
+    def test_reindexing_replaces_the_document(self):
+        extractor = self.load_extractor("PDF/sample.pdf", "pdf")
+        self.index.store_data(extractor)
+        first = self.index.search("interdisciplinary")
+        self.index.store_data(extractor)
+        self.assertEqual(self.index.search("interdisciplinary"), first)
+        extractor.close()
+
+    def test_documents_with_the_same_name_are_kept_apart(self):
+        folders = tempfile.TemporaryDirectory()
+        self.addCleanup(folders.cleanup)
+        extractors = []
+        for team in ["teamA", "teamB"]:
+            os.makedirs(os.path.join(folders.name, team))
+            file_path = os.path.join(folders.name, team, "sample.pdf")
+            with open(os.path.join(TEST_FILES, "PDF", "sample.pdf"), "rb") as source, open(file_path, "wb") as copy:
+                copy.write(source.read() + team.encode())  # Different contents, same name
+            extractors.append(self.load_extractor(file_path, "pdf"))
+        for extractor in extractors:
+            self.index.store_data(extractor)
+        paths = {hit["file_path"] for hit in self.index.search("interdisciplinary")}
+        self.assertEqual(paths, {os.path.abspath(extractor.file_loader.file_path) for extractor in extractors})
+        for extractor in extractors:
+            self.assertTrue(self.index.is_processed("sample.pdf", extractor.file_loader.content_hash(), extractor.version))
+            extractor.close()
+
+    def test_reindexing_deletes_chunks_by_rowid_range(self):
+        extractor = self.load_extractor("PDF/sample.pdf", "pdf")
+        self.index.store_data(extractor)
+        self.index.store_data(extractor)
+        self.index.flush()
+        chunks = self.index.connection.execute("SELECT COUNT(*) FROM page_chunks").fetchone()[0]
+        first_chunk, last_chunk = self.index.connection.execute(
+            "SELECT first_chunk, last_chunk FROM indexed_documents").fetchone()
+        self.assertEqual(last_chunk - first_chunk + 1, chunks)
+        extractor.close()
+
+    def test_failed_commit_is_raised_and_reports_buffered_documents(self):
+        index = SearchIndex(":memory:", commit_every=2)
+        index.connection.execute(
+            "CREATE TRIGGER reject BEFORE INSERT ON indexed_documents BEGIN SELECT RAISE(ABORT, 'rejected'); END")
+        pdf_extractor = self.load_extractor("PDF/sample.pdf", "pdf")
+        docx_extractor = self.load_extractor("DOCX/sample.docx", "docx")
+        index.store_data(pdf_extractor)  # Buffered
+        with self.assertRaisesRegex(sqlite3.Error, "rejected"):
+            index.store_data(docx_extractor)
+        self.assertEqual(index.take_lost_documents(), [(pdf_extractor.file_loader.file_path, "IntegrityError: rejected")])
+        self.assertEqual(index.connection.execute("SELECT COUNT(*) FROM page_chunks").fetchone()[0], 0)
+        index.close()
+        pdf_extractor.close()
+        docx_extractor.close()
+
+    def test_chunks_break_at_whitespace(self):
+        text = " ".join(["word"] * 500)
+        chunks = chunk_text(text, chunk_chars=100)
+        self.assertTrue(all(len(chunk) <= 100 and not chunk.startswith("ord") for _, chunk in chunks))
+        self.assertEqual(sum(chunk.count("word") for _, chunk in chunks), 500)
+        for offset, chunk in chunks:
+            self.assertEqual(text[offset:offset + len(chunk)], chunk)
+
+
+if __name__ == "__main__":
+    unittest.main()